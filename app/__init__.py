@@ -13,8 +13,14 @@ from app.models import db, bcrypt
 from app.core.browsable_api import BrowsableAPI
 from .api.v1.endpoints.auth import auth_bp
 from .api.v1 import api_v1_bp  # Correctly import the blueprint
+from .api import register_routes
 from .core.error_handlers import register_error_handlers
 from .core.event_listeners import register_event_listeners
+from .core.rollups import register_rollup_listeners
+from .core.instrumentation import register_instrumentation
+from .core.database import configure_database, register_sqlite_pragmas
+from .core.prometheus import register_metrics
+from .core.profiling import register_profiling
 
 def create_app(config=None):
     app = Flask(__name__)
@@ -37,8 +43,15 @@ def create_app(config=None):
     # Setup CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
+    # Engine and pool options from the environment
+    configure_database(app)
+
+    # Prometheus metrics (sets the pool class, so before the engine is created)
+    register_metrics(app)
+    
     # Initialize extensions
     db.init_app(app)
+    register_sqlite_pragmas(app)
     bcrypt.init_app(app)
     jwt = JWTManager(app)
     migrate = Migrate(app, db)
@@ -46,12 +59,21 @@ def create_app(config=None):
     # Register event listeners for automatic indexing
     register_event_listeners(app)
 
+    # Keep the dashboard rollups in step with anomaly writes
+    register_rollup_listeners()
+
     # Initialize Swagger
     Swagger(app)
     
     # Register error handlers
     register_error_handlers(app)
 
+    # Per-request timing and SQL query instrumentation
+    register_instrumentation(app)
+
+    # Admin-triggered request profiling
+    register_profiling(app)
+
     # Create a flask-restful API object for the browsable API only
     # We'll use this for documentation, but not for registering resources
     docs_api = Api(app)
@@ -62,8 +84,23 @@ def create_app(config=None):
     # Register only the main API v1 Blueprint (which includes all sub-blueprints)
     app.register_blueprint(api_v1_bp, url_prefix='/api')
 
+    # Register the /api/v1 resources (dashboard, import, predictions, status, ...)
+    register_routes(app, Api(app, prefix='/api/v1'))
+
     # Register CLI commands
     from scripts.index_database import index_database_command
     app.cli.add_command(index_database_command)
+    from scripts.export_anomalies import export_anomalies_command
+    app.cli.add_command(export_anomalies_command)
+    from scripts.inference_server import inference_server_command
+    app.cli.add_command(inference_server_command)
+    from scripts.compile_model import compile_model_command
+    app.cli.add_command(compile_model_command)
+    from scripts.train_model import train_model_command
+    app.cli.add_command(train_model_command)
+    from scripts.generate_data import generate_data_command
+    app.cli.add_command(generate_data_command)
+    from scripts.refresh_rollups import refresh_rollups_command
+    app.cli.add_command(refresh_rollups_command)
 
     return app
@@ -6,7 +6,7 @@ from app.api.v1.endpoints.anomalies import (
     AnomalyAPI, BatchAnomalyAPI, FileAnomalyAPI, 
     AnomalyApprovalAPI, AnomalyPredictionEditAPI
 )
-from app.api.v1.endpoints.status import AnomalyStatusAPI, AnomalyBulkStatusAPI
+from app.api.v1.endpoints.status import AnomalyStatusAPI, AnomalyBulkStatusAPI, AnomalyStatusTimelineAPI
 from app.api.v1.endpoints.maintenance import MaintenanceWindowAPI, ScheduleAnomalyAPI
 from app.api.v1.endpoints.action_plans import ActionPlanAPI, ActionItemAPI
 from app.api.v1.endpoints.dashboard import (
@@ -14,10 +14,17 @@ from app.api.v1.endpoints.dashboard import (
     AnomaliesByCriticalityAPI, MaintenanceWindowChartAPI
 )
 from app.api.v1.endpoints.import_data import ImportAnomaliesAPI
+from app.api.v1.endpoints.metrics import RequestMetricsAPI
+from app.api.v1.endpoints.profiling import ProfileReportListAPI, ProfileReportAPI, SamplingProfilerAPI
+from app.api.v1.endpoints.export import AnomalyExportAPI
 from app.api.v1.endpoints.predictions import (
     EquipmentReliabilityPredictorAPI as PredictAPI,
     BatchEquipmentPredictorAPI as BatchPredictAPI,
-    FileEquipmentPredictorAPI as FilePredictAPI
+    FileEquipmentPredictorAPI as FilePredictAPI,
+    PredictionBatchingStatsAPI,
+    ModelStatusAPI,
+    ModelReloadAPI,
+    ShadowModelSummaryAPI
 )
 
 def register_routes(app, api):
@@ -37,6 +44,7 @@ def register_routes(app, api):
     api.add_resource(AnomalyPredictionEditAPI, '/anomalies/<int:anomaly_id>/predictions')
     api.add_resource(AnomalyStatusAPI, '/anomalies/<int:anomaly_id>/status')
     api.add_resource(AnomalyBulkStatusAPI, '/anomalies/bulk/status')
+    api.add_resource(AnomalyStatusTimelineAPI, '/anomalies/<int:anomaly_id>/timeline')
     
     # Register maintenance window endpoints
     api.add_resource(MaintenanceWindowAPI, '/maintenance-windows', '/maintenance-windows/<int:window_id>')
@@ -57,9 +65,22 @@ def register_routes(app, api):
     # Register data import endpoints
     api.add_resource(ImportAnomaliesAPI, '/import/anomalies')
     
+    # Register data export endpoints
+    api.add_resource(AnomalyExportAPI, '/export/anomalies')
+    
     # Register prediction endpoints
     api.add_resource(PredictAPI, '/predict')
     api.add_resource(BatchPredictAPI, '/predict-batch')
     api.add_resource(FilePredictAPI, '/predict-file')
+    api.add_resource(PredictionBatchingStatsAPI, '/predict/batching')
+    api.add_resource(ModelStatusAPI, '/model')
+    api.add_resource(ModelReloadAPI, '/model/reload')
+    api.add_resource(ShadowModelSummaryAPI, '/model/shadow')
+
+    # Register instrumentation endpoints
+    api.add_resource(RequestMetricsAPI, '/_metrics')
+    api.add_resource(ProfileReportListAPI, '/_profiles')
+    api.add_resource(SamplingProfilerAPI, '/_profiles/sampler')
+    api.add_resource(ProfileReportAPI, '/_profiles/<string:name>')
     
     return api
@@ -3,8 +3,10 @@ from flask import Blueprint, request
 from flask_restful import Resource, Api
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flasgger import swag_from
-from app.models import db, Anomaly, User
-from app.core.predictor import EquipmentReliabilityPredictor
+from app.models import db, Anomaly, AnomalyStatusEvent, User
+from app.core.database import read_replica, serialized_writes
+from app.core.predictor import get_predictor
+from app.core.shadow import shadowed_predict_single
 from datetime import datetime
 import pandas as pd
 import io
@@ -37,6 +39,7 @@ class AnomalyListAPI(Resource):
 
 class AnomalyAPI(Resource):
     @jwt_required()
+    @read_replica
     def get(self, anomaly_id=None):
         """Get a specific anomaly or all anomalies (accessible to all users)"""
         try:
@@ -106,13 +109,13 @@ class AnomalyAPI(Resource):
             
             # Make prediction using the correct features: Num_equipement, Systeme, Description
             try:
-                predictor = EquipmentReliabilityPredictor()
+                predictor = get_predictor()
                 prediction_input = {
                     "Num_equipement": data['num_equipement'],
                     "Systeme": data['systeme'],
                     "Description": data['description']
                 }
-                predictions = predictor.predict_single(prediction_input)
+                predictions = shadowed_predict_single(predictor, prediction_input)
                 anomaly.update_predictions(predictions)
             except Exception as e:
                 print(f"Prediction error: {str(e)}")
@@ -149,6 +152,7 @@ class AnomalyAPI(Resource):
                 rex_file = None
 
             # Update fields
+            previous_status = anomaly.status
             updatable_fields = ['description', 'description_equipement', 'section_proprietaire', 'status']
             for field in updatable_fields:
                 if field in data:
@@ -173,16 +177,25 @@ class AnomalyAPI(Resource):
             # Track who updated
             anomaly.updated_by_user_id = current_user_id
 
+            # Record status changes in the status history
+            if anomaly.status != previous_status:
+                db.session.add(AnomalyStatusEvent(
+                    anomaly_id=anomaly.id,
+                    from_status=previous_status,
+                    to_status=anomaly.status,
+                    user_id=current_user_id
+                ))
+
             # Re-predict if relevant fields changed
             if any(field in data for field in ['description', 'description_equipement', 'section_proprietaire']):
                 try:
-                    predictor = EquipmentReliabilityPredictor()
+                    predictor = get_predictor()
                     prediction_input = {
                         "Num_equipement": anomaly.num_equipement,
                         "Systeme": anomaly.systeme,
                         "Description": anomaly.description
                     }
-                    predictions = predictor.predict_single(prediction_input)
+                    predictions = shadowed_predict_single(predictor, prediction_input)
                     anomaly.update_predictions(predictions)
                 except Exception as e:
                     print(f"Prediction error: {str(e)}")
@@ -232,7 +245,7 @@ class BatchAnomalyAPI(Resource):
                 return {"error": "Anomalies must be a list"}, 400
             
             created_anomalies = []
-            predictor = EquipmentReliabilityPredictor()
+            predictor = get_predictor()
             
             for anomaly_data in anomalies_data:
                 # Validate required fields
@@ -268,7 +281,7 @@ class BatchAnomalyAPI(Resource):
                         "Systeme": anomaly_data['systeme'],
                         "Description": anomaly_data['description']
                     }
-                    predictions = predictor.predict_single(prediction_input)
+                    predictions = shadowed_predict_single(predictor, prediction_input)
                     anomaly.update_predictions(predictions)
                 except Exception as e:
                     print(f"Prediction error for anomaly: {str(e)}")
@@ -276,7 +289,8 @@ class BatchAnomalyAPI(Resource):
                 db.session.add(anomaly)
                 created_anomalies.append(anomaly)
             
-            db.session.commit()
+            with serialized_writes(db.engine):
+                db.session.commit()
             
             return {
                 "message": f"Created {len(created_anomalies)} anomalies successfully",
@@ -320,7 +334,7 @@ class FileAnomalyAPI(Resource):
                 return {"error": f"Missing required columns: {missing_columns}"}, 400
             
             created_anomalies = []
-            predictor = EquipmentReliabilityPredictor()
+            predictor = get_predictor()
             
             for _, row in df.iterrows():
                 try:
@@ -345,7 +359,7 @@ class FileAnomalyAPI(Resource):
                             "Systeme": str(row["Systeme"]),
                             "Description": str(row["Description"])
                         }
-                        predictions = predictor.predict_single(prediction_input)
+                        predictions = shadowed_predict_single(predictor, prediction_input)
                         anomaly.update_predictions(predictions)
                     except Exception as e:
                         print(f"Prediction error for row: {str(e)}")
@@ -357,7 +371,8 @@ class FileAnomalyAPI(Resource):
                     print(f"Error processing row: {str(e)}")
                     continue
             
-            db.session.commit()
+            with serialized_writes(db.engine):
+                db.session.commit()
             
             return {
                 "message": f"Processed {len(created_anomalies)} anomalies from file",
@@ -3,56 +3,89 @@ from flask import request, jsonify
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, Anomaly, MaintenanceWindow, ActionPlan, ActionItem
-from datetime import datetime, timedelta
-from sqlalchemy import func, extract, case, desc
+from app.models.rollup import AnomalyRollup, NO_LEVEL, NO_SERVICE
+from app.models.status_event import AnomalyStatusEvent
+from app.core.criticality import get_policy
+from app.core.database import read_replica
+from app.core.sql import GRANULARITIES, as_date, date_bucket, next_period, truncate_date
+from app.core.rollups import criticality_bucket, current_rollups
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, desc
 import json
 
+
+MAX_CHART_PERIODS = 1000
+DEFAULT_CHART_PERIODS = {'day': 30, 'week': 26, 'month': 12, 'quarter': 8}
+
+
+def rollup_count():
+    """Number of anomalies summed over rollup rows"""
+    return func.coalesce(func.sum(AnomalyRollup.count), 0)
+
+
+def parse_date_arg(name):
+    """ISO 8601 date or datetime query parameter as a naive UTC datetime, or None"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' date {value!r}, expected YYYY-MM-DD or an ISO 8601 datetime")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def chart_periods(start, end, granularity):
+    """Starts of the periods overlapping the half-open range [start, end)"""
+    periods = []
+    period = truncate_date(start, granularity)
+    while datetime.combine(period, datetime.min.time()) < end:
+        periods.append(period)
+        if len(periods) > MAX_CHART_PERIODS:
+            raise ValueError(f"Range spans more than {MAX_CHART_PERIODS} {granularity} periods")
+        period = next_period(period, granularity)
+    return periods
+
 class DashboardMetricsAPI(Resource):
     @jwt_required()
+    @read_replica
+    @current_rollups
     def get(self):
         """Get dashboard metrics and KPIs"""
         try:
             # Get current date
             now = datetime.utcnow()
             
-            # Total anomalies
-            total_anomalies = db.session.query(func.count(Anomaly.id)).scalar()
-            
-            # Anomalies by status
+            # Anomalies by status, from the rollups
             status_counts = db.session.query(
-                Anomaly.status, 
-                func.count(Anomaly.id)
-            ).group_by(Anomaly.status).all()
+                AnomalyRollup.status, 
+                rollup_count()
+            ).group_by(AnomalyRollup.status).all()
+            
+            status_data = {status: count for status, count in status_counts if count}
             
-            status_data = {status: count for status, count in status_counts}
+            # Total anomalies
+            total_anomalies = sum(status_data.values())
             
             # Open anomalies (not resolved or closed)
-            open_anomalies = db.session.query(func.count(Anomaly.id))\
-                .filter(Anomaly.status.in_(['open', 'in_progress']))\
-                .scalar()
+            open_anomalies = status_data.get('open', 0) + status_data.get('in_progress', 0)
             
             # Anomalies created in last 30 days
             recent_anomalies = db.session.query(func.count(Anomaly.id))\
                 .filter(Anomaly.created_at >= now - timedelta(days=30))\
                 .scalar()
             
-            # Average resolution time (for closed/resolved anomalies)
-            # This is an approximation as we don't explicitly track resolution date
-            avg_resolution_days = db.session.query(
-                func.avg(func.julianday(Anomaly.updated_at) - func.julianday(Anomaly.created_at))
-            ).filter(
-                Anomaly.status.in_(['resolved', 'closed'])
-            ).scalar()
+            # Average resolution time (for closed/resolved anomalies), from the status history
+            avg_resolution_days = AnomalyStatusEvent.average_resolution_days()
             
             # Convert to days if not None
             avg_resolution_time = round(avg_resolution_days, 2) if avg_resolution_days else None
             
-            # Critical anomalies (high criticality)
-            critical_anomalies = db.session.query(func.count(Anomaly.id))\
-                .filter(
-                    ((Anomaly.use_user_scores == True) & (Anomaly.user_criticality_level >= 2.0)) |
-                    ((Anomaly.use_user_scores == False) & (Anomaly.criticality_level >= 2.0))
-                )\
+            # Critical anomalies (High level or above in the criticality policy)
+            critical_anomalies = db.session.query(rollup_count())\
+                .filter(AnomalyRollup.criticality_bucket >= criticality_bucket(get_policy().min_score('High')))\
                 .scalar()
             
             # Maintenance windows
@@ -103,22 +136,34 @@ class DashboardMetricsAPI(Resource):
 
 class AnomaliesByMonthAPI(Resource):
     @jwt_required()
+    @read_replica
+    @current_rollups
     def get(self):
-        """Get anomalies by month for charting"""
+        """
+        Get anomalies by month for charting
+        
+        Query parameters:
+        - year: calendar year, by month (default: current year)
+        - from, to, granularity: counts per day, week, month or quarter over the
+          half-open range [from, to) (ISO 8601 dates; default: the last periods up to now)
+        """
         try:
+            if any(name in request.args for name in ('from', 'to', 'granularity')):
+                return self.range_chart()
+            
             # Get year from query params, default to current year
             year = request.args.get('year', datetime.utcnow().year, type=int)
             
-            # Query anomalies by month
+            # Query anomalies by month from the rollups
             results = db.session.query(
-                extract('month', Anomaly.date_detection).label('month'),
-                func.count(Anomaly.id).label('count')
+                AnomalyRollup.month,
+                rollup_count()
             ).filter(
-                extract('year', Anomaly.date_detection) == year
+                AnomalyRollup.year == year
             ).group_by(
-                extract('month', Anomaly.date_detection)
+                AnomalyRollup.month
             ).order_by(
-                'month'
+                AnomalyRollup.month
             ).all()
             
             # Format results
@@ -153,21 +198,76 @@ class AnomaliesByMonthAPI(Resource):
             
         except Exception as e:
             return {"error": str(e)}, 500
+    
+    def range_chart(self):
+        """Anomaly counts per period of a date range"""
+        granularity = request.args.get('granularity', 'month')
+        if granularity not in GRANULARITIES:
+            return {"error": f"Invalid granularity, expected one of {', '.join(GRANULARITIES)}"}, 400
+        try:
+            start = parse_date_arg('from')
+            end = parse_date_arg('to')
+            if end is None:
+                end = datetime.combine(next_period(truncate_date(datetime.utcnow(), granularity), granularity),
+                                       datetime.min.time())
+            if start is None:
+                period = truncate_date(end - timedelta(microseconds=1), granularity)
+                for _ in range(DEFAULT_CHART_PERIODS[granularity] - 1):
+                    period = truncate_date(period - timedelta(days=1), granularity)
+                start = datetime.combine(period, datetime.min.time())
+            if start >= end:
+                return {"error": "'from' must be before 'to'"}, 400
+            periods = chart_periods(start, end, granularity)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        
+        month_aligned = all(bound == datetime(bound.year, bound.month, 1) for bound in (start, end))
+        counts = dict.fromkeys(periods, 0)
+        if granularity in ('month', 'quarter') and month_aligned:
+            # Whole months: sum the rollups
+            month_index = AnomalyRollup.year * 12 + AnomalyRollup.month
+            results = db.session.query(AnomalyRollup.year, AnomalyRollup.month, rollup_count())\
+                .filter(month_index >= start.year * 12 + start.month, month_index < end.year * 12 + end.month)\
+                .group_by(AnomalyRollup.year, AnomalyRollup.month)\
+                .all()
+            for year, month, count in results:
+                counts[truncate_date(datetime(year, month, 1), granularity)] += count
+        else:
+            # Range predicate on the indexed column, bucketed by the database
+            bucket = date_bucket(granularity, Anomaly.date_detection)
+            results = db.session.query(bucket, func.count(Anomaly.id))\
+                .filter(Anomaly.date_detection >= start, Anomaly.date_detection < end)\
+                .group_by(bucket)\
+                .all()
+            for period, count in results:
+                counts[as_date(period)] += count
+        
+        chart_data = [{"period": period.isoformat(), "count": count} for period, count in counts.items()]
+        return {
+            "chart_data": chart_data,
+            "granularity": granularity,
+            "from": start.isoformat(),
+            "to": end.isoformat()
+        }, 200
 
 
 class AnomaliesByServiceAPI(Resource):
     @jwt_required()
+    @read_replica
+    @current_rollups
     def get(self):
         """Get anomalies grouped by service for charting"""
         try:
-            # Query anomalies by service
+            # Query anomalies by service from the rollups
             results = db.session.query(
-                Anomaly.service,
-                func.count(Anomaly.id).label('count')
+                AnomalyRollup.service,
+                rollup_count().label('count')
             ).filter(
-                Anomaly.service.isnot(None)
+                AnomalyRollup.service != NO_SERVICE
             ).group_by(
-                Anomaly.service
+                AnomalyRollup.service
+            ).having(
+                func.sum(AnomalyRollup.count) > 0
             ).order_by(
                 desc('count')
             ).all()
@@ -189,41 +289,31 @@ class AnomaliesByServiceAPI(Resource):
 
 class AnomaliesByCriticalityAPI(Resource):
     @jwt_required()
+    @read_replica
+    @current_rollups
     def get(self):
         """Get anomalies grouped by criticality level for charting"""
         try:
-            # Define criticality levels
-            criticality_ranges = [
-                {"min": 0, "max": 1, "label": "Low"},
-                {"min": 1, "max": 2, "label": "Medium"},
-                {"min": 2, "max": 3, "label": "High"},
-                {"min": 3, "max": 100, "label": "Critical"}
-            ]
+            policy = get_policy()
             
-            # Query data for each range
-            chart_data = []
+            # Anomaly counts per criticality level, from the rollups
+            counts = dict(
+                db.session.query(AnomalyRollup.criticality_bucket, rollup_count())
+                .filter(AnomalyRollup.criticality_bucket != NO_LEVEL)
+                .group_by(AnomalyRollup.criticality_bucket)
+                .all()
+            )
             
-            for range_def in criticality_ranges:
-                # Query count using conditional logic for user vs AI scores
-                count = db.session.query(func.count(Anomaly.id)).filter(
-                    (
-                        (Anomaly.use_user_scores == True) &
-                        (Anomaly.user_criticality_level >= range_def["min"]) &
-                        (Anomaly.user_criticality_level < range_def["max"])
-                    ) | (
-                        (Anomaly.use_user_scores == False) &
-                        (Anomaly.criticality_level >= range_def["min"]) &
-                        (Anomaly.criticality_level < range_def["max"])
-                    )
-                ).scalar()
-                
+            chart_data = []
+            for index, bucket in enumerate(policy.buckets()):
+                low = bucket['min'] if bucket['min'] is not None else 0
                 chart_data.append({
-                    "criticality": range_def["label"],
-                    "range": f"{range_def['min']}-{range_def['max']}",
-                    "count": count
+                    "criticality": bucket['name'],
+                    "range": f"{low:g}-{bucket['max']:g}" if bucket['max'] is not None else f"{low:g}+",
+                    "count": counts.get(index, 0)
                 })
             
-            return {"chart_data": chart_data}, 200
+            return {"chart_data": chart_data, "policy_version": policy.version}, 200
             
         except Exception as e:
             return {"error": str(e)}, 500
@@ -231,6 +321,7 @@ class AnomaliesByCriticalityAPI(Resource):
 
 class MaintenanceWindowChartAPI(Resource):
     @jwt_required()
+    @read_replica
     def get(self):
         """Get maintenance windows for timeline/calendar view"""
         try:
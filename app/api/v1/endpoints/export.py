@@ -0,0 +1,79 @@
+# app/api/v1/endpoints/export.py
+from flask import request, Response, stream_with_context, after_this_request, send_file
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from app.core.export import (
+    export_anomalies, stream_anomalies_arrow, available_columns,
+    EXPORT_FORMATS, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE
+)
+from datetime import datetime
+import os
+import tempfile
+
+
+class AnomalyExportAPI(Resource):
+    @jwt_required()
+    def get(self):
+        """
+        Export anomalies as Parquet or an Arrow IPC stream.
+
+        Query params: format (parquet|arrow), columns (comma-separated), chunk_size,
+        status, service, systeme, num_equipement, date_from, date_to,
+        min_criticality, max_criticality, is_approved
+        """
+        try:
+            fmt = request.args.get('format', 'parquet')
+            if fmt not in EXPORT_FORMATS:
+                return {"error": f"Invalid format, must be one of {list(EXPORT_FORMATS)}"}, 400
+
+            columns = request.args.get('columns')
+            column_list = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+            if column_list:
+                unknown = [c for c in column_list if c not in available_columns()]
+                if unknown:
+                    return {"error": f"Unknown columns: {unknown}", "available_columns": available_columns()}, 400
+
+            chunk_size = request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int)
+            if chunk_size < 1:
+                return {"error": "chunk_size must be a positive integer"}, 400
+            # Bound the rows held in memory per batch
+            chunk_size = min(chunk_size, MAX_CHUNK_SIZE)
+            filter_keys = ['status', 'service', 'systeme', 'num_equipement', 'date_from', 'date_to',
+                           'min_criticality', 'max_criticality', 'is_approved']
+            filters = {key: request.args.get(key) for key in filter_keys if request.args.get(key) is not None}
+
+            filename = f"anomalies_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+
+            if fmt == 'arrow':
+                # Arrow IPC stream: sent record batch by record batch, no temporary file
+                return Response(
+                    stream_with_context(stream_anomalies_arrow(column_list, filters, chunk_size)),
+                    mimetype='application/vnd.apache.arrow.stream',
+                    headers={'Content-Disposition': f'attachment; filename={filename}.arrows'}
+                )
+
+            # Parquet needs its footer written last, so spool to a temporary file
+            temp_file = tempfile.NamedTemporaryFile(suffix='.parquet', delete=False)
+            temp_file.close()
+            try:
+                export_anomalies(temp_file.name, fmt='parquet', columns=column_list,
+                                 filters=filters, chunk_size=chunk_size)
+            except Exception:
+                os.unlink(temp_file.name)
+                raise
+
+            @after_this_request
+            def cleanup(response):
+                try:
+                    os.unlink(temp_file.name)
+                except OSError:
+                    pass
+                return response
+
+            return send_file(temp_file.name, mimetype='application/vnd.apache.parquet',
+                             as_attachment=True, download_name=f"{filename}.parquet")
+
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except Exception as e:
+            return {"error": str(e)}, 500
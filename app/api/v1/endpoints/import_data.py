@@ -3,12 +3,16 @@ from flask import request, jsonify
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, Anomaly
-from app.core.predictor import EquipmentReliabilityPredictor
+from app.core.predictor import get_predictor
+from app.core.shadow import shadowed_predict_single
+from app.core.prometheus import observe_import
+from app.core.database import serialized_writes
 from datetime import datetime
 import pandas as pd
 import io
 import os
 import tempfile
+import time
 
 class ImportAnomaliesAPI(Resource):
     @jwt_required()
@@ -78,7 +82,8 @@ class ImportAnomaliesAPI(Resource):
             df = df.fillna("unknown")
             
             # Initialize predictor
-            predictor = EquipmentReliabilityPredictor()
+            predictor = get_predictor()
+            start = time.perf_counter()
             
             # Process records
             results = {
@@ -103,10 +108,12 @@ class ImportAnomaliesAPI(Resource):
                         continue
                     
                     # Create anomaly record
+                    description = str(row[field_mapping["Description"]])
                     anomaly = Anomaly(
+                        title=description[:200],
                         num_equipement=str(row[field_mapping["Num_equipement"]]),
                         systeme=str(row[field_mapping["Systeme"]]),
-                        description=str(row[field_mapping["Description"]]),
+                        description=description,
                         date_detection=date_detection,
                         description_equipement=str(row[field_mapping["Description de l'équipement"]]),
                         section_proprietaire=str(row[field_mapping["Section propriétaire"]]),
@@ -120,7 +127,7 @@ class ImportAnomaliesAPI(Resource):
                             "Systeme": str(row[field_mapping["Systeme"]]),
                             "Description": str(row[field_mapping["Description"]])
                         }
-                        predictions = predictor.predict_single(prediction_input)
+                        predictions = shadowed_predict_single(predictor, prediction_input)
                         anomaly.update_predictions(predictions)
                     except Exception as e:
                         # Log prediction error but continue with import
@@ -135,7 +142,9 @@ class ImportAnomaliesAPI(Resource):
                     results["failed"] += 1
             
             # Commit all valid records
-            db.session.commit()
+            with serialized_writes(db.engine):
+                db.session.commit()
+            observe_import(results["successful"], results["failed"], time.perf_counter() - start)
             
             # Add sample of imported anomalies to the results
             sample_size = min(10, len(created_anomalies))
@@ -3,10 +3,12 @@ from flask import request, jsonify
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, MaintenanceWindow, Anomaly, ActionPlan, ActionItem
+from app.core.database import read_replica
 from datetime import datetime, timedelta
 
 class MaintenanceWindowAPI(Resource):
     @jwt_required()
+    @read_replica
     def get(self, window_id=None):
         """Get a specific maintenance window or all maintenance windows"""
         try:
@@ -0,0 +1,19 @@
+# metrics.py
+from flask_restful import Resource
+from app.core.instrumentation import get_endpoint_metrics, instrumentation_enabled
+from app.utils.admin import admin_required
+
+
+class RequestMetricsAPI(Resource):
+    @admin_required
+    def get(self):
+        """Get per-endpoint wall/CPU time, SQL query counts and flagged N+1 statements for this worker"""
+        if not instrumentation_enabled():
+            return {"enabled": False}, 200
+        return dict(get_endpoint_metrics().snapshot(), enabled=True), 200
+
+    @admin_required
+    def delete(self):
+        """Reset this worker's aggregates"""
+        get_endpoint_metrics().reset()
+        return {"message": "Request metrics reset"}, 200
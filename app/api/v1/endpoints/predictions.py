@@ -1,7 +1,20 @@
 from flask import request, jsonify
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.core.predictor import EquipmentReliabilityPredictor
+from app.core.predictor import get_predictor
+from app.core.criticality import get_policy
+from app.core.batcher import get_batcher, batching_enabled
+from app.core.model_holder import get_model_holder
+from app.core.instrumentation import span
+from app.core.prometheus import observe_prediction
+from app.core.shadow import (
+    shadowed, shadowed_predict_single, shadowed_predict_batch, get_shadow_evaluator
+)
+from app.models.shadow import ShadowPredictionMetric
+from app.utils.admin import admin_required
+import os
+import time
+from datetime import datetime
 import pandas as pd
 import numpy as np
 
@@ -32,11 +45,11 @@ class EquipmentReliabilityPredictorAPI(Resource):
         """Lazy initialization of predictor only when needed for predictions"""
         if not self._predictor_initialized:
             try:
-                self.predictor = EquipmentReliabilityPredictor()
-                print("EquipmentReliabilityPredictor initialized successfully")
+                self.predictor = get_predictor()
+                print("Predictor initialized successfully")
                 self._predictor_initialized = True
             except Exception as e:
-                print(f"Error initializing EquipmentReliabilityPredictor: {str(e)}")
+                print(f"Error initializing predictor: {str(e)}")
                 import traceback
                 traceback.print_exc()
                 self.predictor = None
@@ -49,7 +62,8 @@ class EquipmentReliabilityPredictorAPI(Resource):
             "endpoints": {
                 "POST /api/v1/predict": "Predict single equipment reliability",
                 "POST /api/v1/predict-batch": "Predict batch of equipment reliability",
-                "POST /api/v1/predict-file": "Predict from uploaded file"
+                "POST /api/v1/predict-file": "Predict from uploaded file",
+                "GET /api/v1/predict/batching": "Micro-batching statistics"
             }
         })
     
@@ -78,11 +92,20 @@ class EquipmentReliabilityPredictorAPI(Resource):
             print(f"Making prediction for: {data}")  # Debug logging
             # Single prediction
             # Get prediction from the updated predictor (returns a dictionary)
-            prediction = self.predictor.predict_single(data)
+            if batching_enabled():
+                # Concurrent single-row calls share one vectorized predict; the batch may run
+                # on a model reloaded since this request started, so report that one
+                prediction, predictor = shadowed('single', [data],
+                                                 lambda: get_batcher().predict_single_with_predictor(data))
+            else:
+                predictor = self.predictor
+                prediction = shadowed_predict_single(predictor, data)
             print(f"Prediction result: {prediction}")  # Debug logging
             
             result = {
                 "prediction": prediction,  # prediction is already a properly formatted dictionary
+                "model_version": predictor.model_version,
+                "criticality_policy_version": get_policy().version,
                 "user_id": int(get_jwt_identity())
             }
             
@@ -95,9 +118,79 @@ class EquipmentReliabilityPredictorAPI(Resource):
             return {"error": str(e)}, 500
 
 
+class PredictionBatchingStatsAPI(Resource):
+    @jwt_required()
+    def get(self):
+        """Get micro-batching settings and latency/batch-size histograms for this worker"""
+        if not batching_enabled():
+            return {"enabled": False}, 200
+        return {"enabled": True, "stats": get_batcher().stats()}, 200
+
+
+class ModelStatusAPI(Resource):
+    @jwt_required()
+    def get(self):
+        """Get the model version loaded in this worker and the last reload result"""
+        if os.environ.get('INFERENCE_SERVER_SOCKET'):
+            return {"inference_server": True, "version": get_predictor().model_version}, 200
+        return get_model_holder().status(), 200
+
+
+class ModelReloadAPI(Resource):
+    @admin_required
+    def post(self):
+        """
+        Reload, validate and swap in the MODEL_PATH artifact in this worker without a restart
+        
+        Only the worker handling the request reloads; other workers pick up the artifact
+        through their MODEL_WATCH_INTERVAL watcher.
+        
+        Body (optional): {"background": false}
+        """
+        if os.environ.get('INFERENCE_SERVER_SOCKET'):
+            return {"error": "Models are served by the inference server; set MODEL_WATCH_INTERVAL there"}, 400
+        
+        data = request.get_json(silent=True) or {}
+        holder = get_model_holder()
+        if data.get('model_path') and os.path.realpath(str(data['model_path'])) != os.path.realpath(holder.model_path):
+            # Loading another artifact in one worker would leave the workers serving different models
+            return {"error": "Only the configured MODEL_PATH can be reloaded; replace the artifact there",
+                    "model_path": holder.model_path}, 400
+        
+        result = holder.reload(background=bool(data.get('background', False)))
+        result = dict(result, worker_pid=os.getpid())
+        if result.get("status") == "failed":
+            return result, 422
+        if result.get("status") == "in_progress":
+            return result, 409
+        return result, 200 if result.get("status") == "success" else 202
+
+
+class ShadowModelSummaryAPI(Resource):
+    @jwt_required()
+    def get(self):
+        """
+        Get shadow model divergence and latency compared with the primary model
+        
+        Query params: since (ISO datetime, optional)
+        """
+        since = request.args.get('since')
+        try:
+            since = datetime.fromisoformat(since) if since else None
+        except ValueError:
+            return {"error": "Invalid since, expected an ISO datetime"}, 400
+        
+        evaluator = get_shadow_evaluator()
+        return {
+            "enabled": evaluator is not None,
+            "worker": evaluator.stats() if evaluator is not None else None,
+            "summary": ShadowPredictionMetric.summary(since)
+        }, 200
+
+
 class BatchEquipmentPredictorAPI(Resource):
     def __init__(self):
-        self.predictor = EquipmentReliabilityPredictor()
+        self.predictor = get_predictor()
     
     @jwt_required()
     def post(self):
@@ -113,7 +206,7 @@ class BatchEquipmentPredictorAPI(Resource):
                 return {"error": "Equipments must be a list"}, 400
             
             # Get predictions from the updated predictor (returns list of dictionaries)
-            predictions = self.predictor.predict_batch(equipments)
+            predictions = shadowed_predict_batch(self.predictor, equipments)
             
             results = []
             for i, prediction in enumerate(predictions):
@@ -124,6 +217,8 @@ class BatchEquipmentPredictorAPI(Resource):
             
             return {
                 "predictions": results,
+                "model_version": self.predictor.model_version,
+                "criticality_policy_version": get_policy().version,
                 "user_id": int(get_jwt_identity())
             }, 200
             
@@ -133,7 +228,7 @@ class BatchEquipmentPredictorAPI(Resource):
 
 class FileEquipmentPredictorAPI(Resource):
     def __init__(self):
-        self.predictor = EquipmentReliabilityPredictor()
+        self.predictor = get_predictor()
     
     @jwt_required()
     def post(self):
@@ -147,43 +242,32 @@ class FileEquipmentPredictorAPI(Resource):
             file_path = data['file_path']
             output_path = data.get('output_path', None)
             
-            # Predict from file
-            results_df = self.predictor.predict_from_file(file_path, output_path)
-            
-            # Calculate criticality for each row and update the DataFrame
-            for i, row in results_df.iterrows():
-                fiabilite = int(results_df.at[i, 'Fiabilité Intégrité_predicted'])
-                disponibilite = int(results_df.at[i, 'Disponibilté_predicted'])
-                process_safety = int(results_df.at[i, 'Process Safety_predicted'])
-                criticity = fiabilite + disponibilite + process_safety
-                results_df.at[i, 'Criticité_predicted'] = criticity
-            
-            # Save updated DataFrame with calculated criticality if output path provided
-            if output_path:
-                if output_path.endswith('.csv'):
-                    results_df.to_csv(output_path, index=False)
-                elif output_path.endswith(('.xlsx', '.xls')):
-                    results_df.to_excel(output_path, index=False)
-                else:
-                    raise ValueError("Output file must be CSV or Excel format")
+            # Predict from file (vectorized over the whole DataFrame); criticality score and
+            # level come from the shared criticality policy
+            start = time.perf_counter()
+            with span('predict'):
+                results_df = self.predictor.predict_from_file(file_path, output_path)
+            observe_prediction('file', len(results_df), time.perf_counter() - start)
             
-            # Convert DataFrame to dict, handling datetime and other non-serializable types
-            results_dict = results_df.to_dict('records')
+            total_records = len(results_df)
             
-            # Convert any non-serializable objects to JSON-safe types
+            # Only the preview rows need converting to JSON-safe types
+            results_dict = results_df.head(10).to_dict('records')
             for record in results_dict:
                 for key, value in record.items():
                     record[key] = make_json_serializable(value)
             
             response = {
-                "message": f"Processed {len(results_dict)} records",
-                "results": results_dict[:10] if len(results_dict) > 10 else results_dict,  # Show first 10 for preview
-                "total_records": len(results_dict),
+                "message": f"Processed {total_records} records",
+                "results": results_dict,  # Show first 10 for preview
+                "total_records": total_records,
                 "user_id": int(get_jwt_identity())
             }
             
             if output_path:
                 response["output_saved_to"] = output_path
+            response["model_version"] = self.predictor.model_version
+            response["criticality_policy_version"] = get_policy().version
             
             return response, 200
             
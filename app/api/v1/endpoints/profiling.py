@@ -0,0 +1,47 @@
+# profiling.py
+from flask import request, send_file
+from flask_restful import Resource
+from app.core.profiling import get_sampling_profiler, list_reports, report_path, DEFAULT_INTERVAL_MS
+from app.utils.admin import admin_required
+
+
+class ProfileReportListAPI(Resource):
+    @admin_required
+    def get(self):
+        """List saved request profiles and sampling reports"""
+        return {"reports": list_reports()}, 200
+
+
+class ProfileReportAPI(Resource):
+    @admin_required
+    def get(self, name):
+        """Download a saved report"""
+        path = report_path(name)
+        if path is None:
+            return {"error": "Report not found"}, 404
+        return send_file(path, as_attachment=True, download_name=name)
+
+
+class SamplingProfilerAPI(Resource):
+    @admin_required
+    def get(self):
+        """Get the sampling profiler status of the worker serving this call"""
+        return get_sampling_profiler().status(), 200
+
+    @admin_required
+    def post(self):
+        """
+        Start sampling the worker serving this call
+        
+        Body: {"seconds": 30, "interval_ms": 10}
+        """
+        data = request.get_json(silent=True) or {}
+        try:
+            seconds = float(data.get('seconds', 30))
+            interval_ms = float(data.get('interval_ms', DEFAULT_INTERVAL_MS))
+            status = get_sampling_profiler().start(seconds, interval_ms, label=request.host)
+        except (TypeError, ValueError) as e:
+            return {"error": str(e)}, 400
+        if status.get("status") == "already_running":
+            return status, 409
+        return status, 202
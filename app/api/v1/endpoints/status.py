@@ -1,9 +1,26 @@
 # anomaly_status_api.py
-from flask import request, jsonify
+from flask import current_app, request, jsonify
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import db, Anomaly
+from app.models import db, Anomaly, AnomalyStatusEvent
+from app.models.status_event import RESOLVED_STATUSES
+from app.core.database import read_replica, serialized_writes
+from app.core.embedding_store import EMBEDDING_SERVICE_URL, index_records
+from app.core.rollups import KEY_ATTRIBUTES, apply_deltas, rollup_deltas
+from collections import Counter
 from datetime import datetime
+from sqlalchemy import select, update
+
+# Valid status transitions
+VALID_TRANSITIONS = {
+    'open': ['in_progress', 'closed'],  # Can go from open to in_progress or directly to closed
+    'in_progress': ['resolved', 'closed'],  # From in_progress, can resolve or close
+    'resolved': ['closed', 'in_progress'],  # From resolved, can close or reopen as in_progress
+    'closed': ['open']  # Can reopen a closed anomaly
+}
+
+# Ids per statement of a bulk transition, below SQLite's bound parameter limit
+BULK_CHUNK_SIZE = 5000
 
 class AnomalyStatusAPI(Resource):
     @jwt_required()
@@ -23,39 +40,30 @@ class AnomalyStatusAPI(Resource):
             new_status = data['status']
             current_status = anomaly.status
             
-            # Define valid status transitions
-            valid_transitions = {
-                'open': ['in_progress', 'closed'],  # Can go from open to in_progress or directly to closed
-                'in_progress': ['resolved', 'closed'],  # From in_progress, can resolve or close
-                'resolved': ['closed', 'in_progress'],  # From resolved, can close or reopen as in_progress
-                'closed': ['open']  # Can reopen a closed anomaly
-            }
-            
             # Check if the transition is valid
-            if new_status not in valid_transitions.get(current_status, []):
+            if new_status not in VALID_TRANSITIONS.get(current_status, []):
                 return {
                     "error": f"Invalid status transition from '{current_status}' to '{new_status}'",
-                    "valid_transitions": valid_transitions.get(current_status, [])
+                    "valid_transitions": VALID_TRANSITIONS.get(current_status, [])
                 }, 400
             
             # Update status
+            now = datetime.utcnow()
             anomaly.status = new_status
-            anomaly.updated_at = datetime.utcnow()
+            anomaly.updated_at = now
             anomaly.updated_by_user_id = current_user_id
             anomaly.last_modified_by = current_user_id
-            anomaly.last_modified_at = datetime.utcnow()
-            
-            # Add comments if provided
-            if 'comments' in data:
-                # We could add a new table for status change comments/history
-                # For now, we'll just update the description with a timestamp
-                timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M")
-                status_note = f"\n[{timestamp}] Status changed from {current_status} to {new_status}: {data['comments']}"
-                
-                if anomaly.description:
-                    anomaly.description += status_note
-                else:
-                    anomaly.description = status_note
+            anomaly.last_modified_at = now
+            
+            # Record the change, with its comments, in the status history
+            db.session.add(AnomalyStatusEvent(
+                anomaly_id=anomaly.id,
+                from_status=current_status,
+                to_status=new_status,
+                comments=data.get('comments'),
+                user_id=current_user_id,
+                created_at=now
+            ))
             
             db.session.commit()
             
@@ -72,7 +80,12 @@ class AnomalyStatusAPI(Resource):
 class AnomalyBulkStatusAPI(Resource):
     @jwt_required()
     def put(self):
-        """Update multiple anomalies' statuses at once"""
+        """
+        Update multiple anomalies' statuses at once
+        
+        Runs one UPDATE per allowed source status (per chunk of ids) instead of loading
+        the anomalies, and indexes the updated anomalies with a single embedding call.
+        """
         try:
             current_user_id = int(get_jwt_identity())
             data = request.get_json()
@@ -83,59 +96,65 @@ class AnomalyBulkStatusAPI(Resource):
             anomaly_ids = data['anomalies']
             if not isinstance(anomaly_ids, list) or not anomaly_ids:
                 return {"error": "Anomaly IDs must be a non-empty list"}, 400
+            try:
+                requested = list(dict.fromkeys(int(anomaly_id) for anomaly_id in anomaly_ids))
+            except (TypeError, ValueError):
+                return {"error": "Anomaly IDs must be integers"}, 400
                 
             new_status = data['status']
-            if new_status not in ['open', 'in_progress', 'resolved', 'closed']:
+            if new_status not in VALID_TRANSITIONS:
                 return {"error": "Invalid status value"}, 400
             
-            # Get all anomalies in one query
-            anomalies = Anomaly.query.filter(Anomaly.id.in_(anomaly_ids)).all()
-            found_ids = [a.id for a in anomalies]
-            missing_ids = [aid for aid in anomaly_ids if aid not in found_ids]
+            predecessors = [status for status, targets in VALID_TRANSITIONS.items() if new_status in targets]
+            chunks = [requested[i:i + BULK_CHUNK_SIZE] for i in range(0, len(requested), BULK_CHUNK_SIZE)]
+            
+            with serialized_writes(db.engine):
+                # Move the anomalies in each allowed source status; returns what the rollups need
+                updated = {}
+                deltas = Counter()
+                now = datetime.utcnow()
+                for from_status in predecessors:
+                    for chunk in chunks:
+                        rows = self.transition(chunk, from_status, new_status, current_user_id, now)
+                        for row in rows:
+                            updated[row['id']] = from_status
+                        deltas.update(rollup_deltas([dict(row, status=from_status) for row in rows], sign=-1))
+                        deltas.update(rollup_deltas([dict(row, status=new_status) for row in rows]))
+                        AnomalyStatusEvent.insert_many([
+                            {"anomaly_id": row['id'], "from_status": from_status, "to_status": new_status,
+                             "comments": data.get('comments'), "user_id": current_user_id, "created_at": now}
+                            for row in rows
+                        ])
+                apply_deltas(db.session.connection(), deltas)
+                
+                # Current status of the requested anomalies that were not moved
+                current = {}
+                remaining = [anomaly_id for anomaly_id in requested if anomaly_id not in updated]
+                for i in range(0, len(remaining), BULK_CHUNK_SIZE):
+                    current.update(db.session.execute(
+                        select(Anomaly.id, Anomaly.status).where(Anomaly.id.in_(remaining[i:i + BULK_CHUNK_SIZE]))
+                    ).all())
+                
+                # Commit changes for all valid updates
+                db.session.commit()
             
             results = {
-                "updated": [],
-                "skipped": [],
-                "not_found": missing_ids
+                "updated": [
+                    {"id": anomaly_id, "from_status": updated[anomaly_id], "to_status": new_status}
+                    for anomaly_id in requested if anomaly_id in updated
+                ],
+                "skipped": [
+                    {
+                        "id": anomaly_id,
+                        "current_status": current[anomaly_id],
+                        "valid_transitions": VALID_TRANSITIONS.get(current[anomaly_id], [])
+                    }
+                    for anomaly_id in requested if anomaly_id in current
+                ],
+                "not_found": [anomaly_id for anomaly_id in requested if anomaly_id not in updated and anomaly_id not in current]
             }
             
-            # Define valid status transitions
-            valid_transitions = {
-                'open': ['in_progress', 'closed'],
-                'in_progress': ['resolved', 'closed'],
-                'resolved': ['closed', 'in_progress'],
-                'closed': ['open']
-            }
-            
-            # Update each anomaly
-            for anomaly in anomalies:
-                current_status = anomaly.status
-                
-                # Check if transition is valid
-                if new_status in valid_transitions.get(current_status, []):
-                    # Update status
-                    anomaly.status = new_status
-                    anomaly.updated_at = datetime.utcnow()
-                    anomaly.updated_by_user_id = current_user_id
-                    anomaly.last_modified_by = current_user_id
-                    anomaly.last_modified_at = datetime.utcnow()
-                    
-                    # Add to results
-                    results["updated"].append({
-                        "id": anomaly.id,
-                        "from_status": current_status,
-                        "to_status": new_status
-                    })
-                else:
-                    # Skip invalid transitions
-                    results["skipped"].append({
-                        "id": anomaly.id,
-                        "current_status": current_status,
-                        "valid_transitions": valid_transitions.get(current_status, [])
-                    })
-            
-            # Commit changes for all valid updates
-            db.session.commit()
+            self.reindex(list(updated))
             
             return {
                 "message": f"Updated {len(results['updated'])} anomalies to '{new_status}' status",
@@ -145,3 +164,78 @@ class AnomalyBulkStatusAPI(Resource):
         except Exception as e:
             db.session.rollback()
             return {"error": str(e)}, 500
+    
+    @staticmethod
+    def transition(anomaly_ids, from_status, to_status, user_id, now):
+        """
+        Move the given anomalies that are in from_status to to_status
+        
+        Returns:
+            list: Rollup key attributes (and id) of each updated anomaly
+        """
+        columns = [Anomaly.id] + [getattr(Anomaly, name) for name in KEY_ATTRIBUTES if name != 'status']
+        condition = [Anomaly.id.in_(anomaly_ids), Anomaly.status == from_status]
+        values = dict(status=to_status, updated_at=now, updated_by_user_id=user_id,
+                      last_modified_by=user_id, last_modified_at=now)
+        
+        if db.engine.dialect.update_returning:
+            stmt = update(Anomaly.__table__).where(*condition).values(**values).returning(*columns)
+            return [dict(row._mapping) for row in db.session.execute(stmt)]
+        
+        # No UPDATE ... RETURNING (MySQL): read the matching rows, locked, then update them
+        rows = [dict(row._mapping) for row in db.session.execute(select(*columns).where(*condition).with_for_update())]
+        if rows:
+            db.session.execute(update(Anomaly.__table__).where(
+                Anomaly.id.in_([row['id'] for row in rows])).values(**values))
+        return rows
+    
+    @staticmethod
+    def reindex(anomaly_ids):
+        """Send the updated anomalies to the embedding service in one batch"""
+        if not anomaly_ids or not EMBEDDING_SERVICE_URL:
+            return
+        try:
+            anomalies = []
+            for i in range(0, len(anomaly_ids), BULK_CHUNK_SIZE):
+                anomalies.extend(Anomaly.query.filter(Anomaly.id.in_(anomaly_ids[i:i + BULK_CHUNK_SIZE])).all())
+            index_records(anomalies)
+        except Exception as e:
+            # The status change is committed; the index catches up on the next `flask index-db`
+            current_app.logger.error("Could not index %d anomalies after a bulk status change: %s",
+                                     len(anomaly_ids), e)
+
+
+class AnomalyStatusTimelineAPI(Resource):
+    @jwt_required()
+    @read_replica
+    def get(self, anomaly_id):
+        """Get the status history of an anomaly, oldest first"""
+        try:
+            anomaly = Anomaly.query.get(anomaly_id)
+            if not anomaly:
+                return {"error": "Anomaly not found"}, 404
+            
+            events = AnomalyStatusEvent.query\
+                .filter(AnomalyStatusEvent.anomaly_id == anomaly_id)\
+                .order_by(AnomalyStatusEvent.created_at, AnomalyStatusEvent.id)\
+                .all()
+            
+            # Resolved at the last move from an unresolved to a resolved status
+            resolved_at = None
+            if anomaly.status in RESOLVED_STATUSES:
+                resolved_at = next((event.created_at for event in reversed(events)
+                                    if event.to_status in RESOLVED_STATUSES
+                                    and event.from_status not in RESOLVED_STATUSES), None)
+            
+            return {
+                "anomaly_id": anomaly.id,
+                "status": anomaly.status,
+                "created_at": anomaly.created_at.isoformat() if anomaly.created_at else None,
+                "resolved_at": resolved_at.isoformat() if resolved_at else None,
+                "resolution_days": round((resolved_at - anomaly.created_at).total_seconds() / 86400.0, 2)
+                                   if resolved_at and anomaly.created_at else None,
+                "events": [event.to_dict() for event in events]
+            }, 200
+            
+        except Exception as e:
+            return {"error": str(e)}, 500
@@ -0,0 +1,199 @@
+"""
+Dynamic micro-batching of single-row predictions.
+
+Concurrent predict_single calls are queued; a background thread collects the
+requests arriving within PREDICT_BATCH_MAX_WAIT_MS (or until
+PREDICT_BATCH_MAX_SIZE rows), runs one vectorized predict_frame over them and
+hands each caller its own row. The wait adapts to load: when recent batches
+hold a single request, requests are dispatched immediately so an idle server
+adds no latency.
+
+Configuration (environment):
+
+    PREDICT_BATCHING_ENABLED     'true' to route /predict through the batcher (default: false)
+    PREDICT_BATCH_MAX_SIZE       maximum rows per batch (default: 64)
+    PREDICT_BATCH_MAX_WAIT_MS    maximum time to wait for more rows (default: 5)
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+from app.core.metrics import Histogram, LATENCY_BUCKETS
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class MicroBatcher:
+    def __init__(self, predictor, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 timeout=30.0):
+        """
+        Args:
+            predictor: Object with predict_frame(df) and predict_single(dict), or a zero-argument
+                callable returning it (resolved per batch, so reloaded models are picked up)
+            max_batch_size: Maximum rows per predict_frame call
+            max_wait_ms: Maximum time the first request of a batch waits for company
+            timeout: Seconds a caller waits for its result
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self._avg_batch = 1.0
+
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Threads do not survive a fork (e.g. gunicorn --preload), so restart per process
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name="predict-micro-batcher", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def submit(self, input_dict):
+        """
+        Queue one prediction, returning a Future resolving to (prediction dictionary, predictor)
+
+        The predictor is the one resolved when the batch ran, so after a hot reload its
+        model_version is that of the model that made the prediction.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((input_dict, future, time.perf_counter()))
+        return future
+
+    def predict_single(self, input_dict):
+        """Drop-in replacement for EquipmentReliabilityPredictor.predict_single"""
+        return self.predict_single_with_predictor(input_dict)[0]
+
+    def predict_single_with_predictor(self, input_dict):
+        """predict_single, also returning the predictor that made the prediction"""
+        start = time.perf_counter()
+        try:
+            return self.submit(input_dict).result(timeout=self.timeout)
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+
+        # Under low load (recent batches of ~1 request) do not hold the request back
+        wait = self.max_wait if self._avg_batch >= 1.5 else 0.0
+        deadline = time.perf_counter() + wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            size = len(batch)
+            self.batch_size.observe(size)
+            self._avg_batch = 0.8 * self._avg_batch + 0.2 * size
+
+            dispatched = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.queue_wait.observe(dispatched - enqueued)
+
+            try:
+                self._predict(batch)
+            except Exception as e:
+                # Keep the thread alive: callers queued behind this batch still need it
+                self._fail(batch, e)
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _resolve_predictor(self):
+        return self.predictor() if callable(self.predictor) else self.predictor
+
+    def _predict(self, batch):
+        inputs = [item[0] for item in batch]
+        try:
+            predictor = self._resolve_predictor()
+        except Exception as e:
+            print(f"Micro-batch of {len(batch)} failed, no predictor available: {str(e)}")
+            self._fail(batch, e)
+            return
+        try:
+            predictions = predictor.predict_frame(pd.DataFrame(inputs))
+            columns = ["Fiabilité Intégrité", "Disponibilité", "Process Safety", "Criticité"]
+            for (_, future, _), row in zip(batch, predictions[columns].itertuples(index=False)):
+                future.set_result(({
+                    "Fiabilité Intégrité": float(row[0]),
+                    "Disponibilité": float(row[1]),
+                    "Process Safety": float(row[2]),
+                    "Criticité": row[3]
+                }, predictor))
+        except Exception as e:
+            print(f"Micro-batch of {len(batch)} failed, predicting rows individually: {str(e)}")
+            # Isolate the failing rows so one bad input does not fail the whole batch
+            for input_dict, future, _ in batch:
+                if future.done():
+                    continue
+                try:
+                    future.set_result((predictor.predict_single(input_dict), predictor))
+                except Exception as row_error:
+                    future.set_exception(row_error)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "latency_seconds": self.latency.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+            "batch_size": self.batch_size.snapshot()
+        }
+
+
+def batching_enabled():
+    return os.environ.get('PREDICT_BATCHING_ENABLED', 'False').lower() in ('true', '1', 't')
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """The process-wide micro-batcher in front of get_predictor()"""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                from app.core.predictor import get_predictor
+                _batcher = MicroBatcher(
+                    get_predictor,
+                    max_batch_size=int(os.environ.get('PREDICT_BATCH_MAX_SIZE', DEFAULT_MAX_BATCH_SIZE)),
+                    max_wait_ms=float(os.environ.get('PREDICT_BATCH_MAX_WAIT_MS', DEFAULT_MAX_WAIT_MS))
+                )
+    return _batcher
@@ -207,7 +207,16 @@ def get_endpoints_info():
             'requires_auth': True,
             'parameters': [
                 {'name': 'id', 'type': 'integer', 'required': True, 'location': 'path'},
-                {'name': 'status', 'type': 'string', 'required': True}
+                {'name': 'status', 'type': 'string', 'required': True},
+                {'name': 'comments', 'type': 'string', 'required': False}
+            ]
+        },
+        '/api/v1/anomalies/<id>/timeline': {
+            'methods': ['GET'],
+            'description': 'Get the status history of an anomaly and its resolution time',
+            'requires_auth': True,
+            'parameters': [
+                {'name': 'id', 'type': 'integer', 'required': True, 'location': 'path'}
             ]
         },
         '/api/v1/anomalies/batch': {
@@ -324,10 +333,13 @@ def get_endpoints_info():
         },
         '/api/v1/dashboard/charts/anomalies-by-month': {
             'methods': ['GET'],
-            'description': 'Get anomalies count by month',
+            'description': 'Get anomalies count by month, or per day/week/month/quarter over a from/to range',
             'requires_auth': True,
             'parameters': [
-                {'name': 'year', 'type': 'integer', 'required': False, 'location': 'query'}
+                {'name': 'year', 'type': 'integer', 'required': False, 'location': 'query'},
+                {'name': 'from', 'type': 'string', 'required': False, 'location': 'query'},
+                {'name': 'to', 'type': 'string', 'required': False, 'location': 'query'},
+                {'name': 'granularity', 'type': 'string', 'required': False, 'location': 'query'}
             ]
         },
         '/api/v1/dashboard/charts/anomalies-by-service': {
@@ -385,6 +397,67 @@ def get_endpoints_info():
             'parameters': [
                 {'name': 'file', 'type': 'file', 'required': True}
             ]
+        },
+        
+        # Export endpoints
+        '/api/v1/export/anomalies': {
+            'methods': ['GET'],
+            'description': 'Export anomalies as Parquet or Arrow IPC for analytics',
+            'requires_auth': True,
+            'parameters': [
+                {'name': 'format', 'type': 'string', 'required': False},
+                {'name': 'columns', 'type': 'string', 'required': False},
+                {'name': 'status', 'type': 'string', 'required': False},
+                {'name': 'date_from', 'type': 'string', 'required': False},
+                {'name': 'date_to', 'type': 'string', 'required': False}
+            ]
+        },
+        
+        # Model management endpoints
+        '/api/v1/model': {
+            'methods': ['GET'],
+            'description': 'Version of the loaded model and last reload result',
+            'requires_auth': True,
+            'parameters': []
+        },
+        '/api/v1/model/reload': {
+            'methods': ['POST'],
+            'description': 'Reload, validate and swap in the MODEL_PATH artifact in the worker handling the request (admin only)',
+            'requires_auth': True,
+            'parameters': [
+                {'name': 'background', 'type': 'boolean', 'required': False}
+            ]
+        },
+        '/api/v1/model/shadow': {
+            'methods': ['GET'],
+            'description': 'Divergence and latency of the shadow model against the primary model',
+            'requires_auth': True,
+            'parameters': [
+                {'name': 'since', 'type': 'string', 'required': False}
+            ]
+        },
+        
+        # Instrumentation endpoints
+        '/api/v1/_metrics': {
+            'methods': ['GET', 'DELETE'],
+            'description': 'Per-endpoint wall/CPU time, SQL query counts and N+1 statements for this worker (admin only)',
+            'requires_auth': True,
+            'parameters': []
+        },
+        '/api/v1/_profiles': {
+            'methods': ['GET'],
+            'description': 'Saved request profiles and sampling reports (admin only)',
+            'requires_auth': True,
+            'parameters': []
+        },
+        '/api/v1/_profiles/sampler': {
+            'methods': ['GET', 'POST'],
+            'description': 'Start or check the sampling profiler of the worker serving the call (admin only)',
+            'requires_auth': True,
+            'parameters': [
+                {'name': 'seconds', 'type': 'number', 'required': False},
+                {'name': 'interval_ms', 'type': 'number', 'required': False}
+            ]
         }
     }
     
@@ -0,0 +1,161 @@
+"""
+Criticality policy shared by the predictor, the models, the dashboard and file scoring.
+
+The criticality score is a weighted sum of the three predicted scores
+(Fiabilité Intégrité, Disponibilité, Process Safety) and the criticality level
+is the bucket the score falls in, found with ``numpy.digitize`` so that a whole
+batch is classified in one array operation.
+
+The policy is configured from the environment:
+
+    CRITICALITY_WEIGHTS=1,1,1          weights of the three scores
+    CRITICALITY_THRESHOLDS=1,2,3       lower bounds of the Medium, High and Critical levels
+    CRITICALITY_POLICY_VERSION=...     version string reported with predictions
+"""
+import os
+import numpy as np
+from sqlalchemy import case
+
+# (name used by the dashboard, label used in predictions), from least to most critical
+DEFAULT_LEVELS = [
+    ("Low", "Faible"),
+    ("Medium", "Moyenne"),
+    ("High", "Élevée"),
+    ("Critical", "Critique"),
+]
+DEFAULT_WEIGHTS = (1.0, 1.0, 1.0)
+DEFAULT_THRESHOLDS = (1.0, 2.0, 3.0)
+DEFAULT_VERSION = "sum-v1"
+
+
+class CriticalityPolicy:
+    def __init__(self, weights=DEFAULT_WEIGHTS, thresholds=DEFAULT_THRESHOLDS,
+                 levels=DEFAULT_LEVELS, version=DEFAULT_VERSION):
+        """
+        Args:
+            weights: Weights of (fiabilite_integrite, disponibilite, process_safety) in the score
+            thresholds: Increasing lower bounds of every level but the first
+            levels: List of (name, label) pairs, one more than thresholds
+            version: Version string identifying this policy
+        """
+        self.weights = np.asarray(weights, dtype=float)
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.levels = list(levels)
+        self.version = str(version)
+
+        if self.weights.shape != (3,):
+            raise ValueError("Criticality policy needs exactly 3 weights")
+        if len(self.levels) != len(self.thresholds) + 1:
+            raise ValueError("Criticality policy needs one more level than thresholds")
+        if np.any(np.diff(self.thresholds) <= 0):
+            raise ValueError("Criticality thresholds must be strictly increasing")
+
+        self._labels = np.array([label for _, label in self.levels] + [None], dtype=object)
+        self._names = np.array([name for name, _ in self.levels] + [None], dtype=object)
+
+    @classmethod
+    def from_env(cls):
+        """Build the policy from CRITICALITY_* environment variables"""
+        def parse(name, default):
+            value = os.environ.get(name)
+            if not value:
+                return default
+            return tuple(float(v) for v in value.split(','))
+
+        return cls(
+            weights=parse('CRITICALITY_WEIGHTS', DEFAULT_WEIGHTS),
+            thresholds=parse('CRITICALITY_THRESHOLDS', DEFAULT_THRESHOLDS),
+            version=os.environ.get('CRITICALITY_POLICY_VERSION', DEFAULT_VERSION)
+        )
+
+    def score(self, fiabilite_integrite, disponibilite, process_safety):
+        """
+        Weighted criticality score, for scalars or arrays of scores
+
+        Returns:
+            float for scalar inputs, numpy array otherwise (NaN where a score is missing)
+        """
+        scores = np.stack(np.broadcast_arrays(
+            np.asarray(fiabilite_integrite, dtype=float),
+            np.asarray(disponibilite, dtype=float),
+            np.asarray(process_safety, dtype=float)
+        ), axis=-1)
+        result = scores @ self.weights
+        return float(result) if result.ndim == 0 else result
+
+    def level_index(self, scores):
+        """Level index per score (len(levels) for missing scores)"""
+        scores = np.asarray(scores, dtype=float)
+        index = np.digitize(scores, self.thresholds)
+        return np.where(np.isnan(scores), len(self.levels), index)
+
+    def labels(self, scores):
+        """Level label per score, as an object array (None for missing scores)"""
+        return self._labels[self.level_index(scores)]
+
+    def names(self, scores):
+        """Level name per score, as an object array (None for missing scores)"""
+        return self._names[self.level_index(scores)]
+
+    def label(self, score):
+        """Level label of a single score"""
+        return self._labels[int(self.level_index(score))]
+
+    def classify(self, fiabilite_integrite, disponibilite, process_safety):
+        """Level labels straight from the three scores (scalars or arrays)"""
+        scores = self.score(fiabilite_integrite, disponibilite, process_safety)
+        if np.ndim(scores) == 0:
+            return self.label(scores)
+        return self.labels(scores)
+
+    def min_score(self, name):
+        """Lower bound of the level with the given name (None for the first level)"""
+        for i, (level_name, _) in enumerate(self.levels):
+            if level_name == name:
+                return float(self.thresholds[i - 1]) if i > 0 else None
+        raise ValueError(f"Unknown criticality level: {name}")
+
+    def buckets(self):
+        """List of {name, label, min, max} for every level, max is None for the last one"""
+        bounds = [None] + [float(t) for t in self.thresholds] + [None]
+        return [
+            {"name": name, "label": label, "min": bounds[i], "max": bounds[i + 1]}
+            for i, (name, label) in enumerate(self.levels)
+        ]
+
+    def sql_level_index(self, score_column):
+        """
+        SQL CASE expression giving the level index of a score column
+
+        Same buckets as level_index, so the database can group by level in one query.
+        """
+        whens = [
+            (score_column >= float(threshold), i + 1)
+            for i, threshold in reversed(list(enumerate(self.thresholds)))
+        ]
+        return case(*whens, else_=0)
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "weights": self.weights.tolist(),
+            "thresholds": self.thresholds.tolist(),
+            "levels": self.buckets()
+        }
+
+
+_policy = None
+
+
+def get_policy():
+    """The process-wide criticality policy (built from the environment on first use)"""
+    global _policy
+    if _policy is None:
+        _policy = CriticalityPolicy.from_env()
+    return _policy
+
+
+def set_policy(policy):
+    """Replace the process-wide criticality policy"""
+    global _policy
+    _policy = policy
@@ -0,0 +1,307 @@
+"""
+SQLAlchemy engine options from the environment.
+
+configure_database fills SQLALCHEMY_ENGINE_OPTIONS before db.init_app creates
+the engines. Each backend starts from its own defaults:
+
+- PostgreSQL: a pool of 10 connections plus 20 overflow, pre-ping, recycling
+  after 30 minutes, a 30 s statement timeout and psycopg2's
+  ``executemany_mode='values_plus_batch'`` so bulk inserts and updates are
+  sent as multi-row statements instead of one round trip per row
+- SQLite files: WAL journaling (readers no longer block the writer),
+  synchronous=NORMAL, a 64 MB page cache, 256 MB of memory-mapped I/O and a
+  15 s busy timeout, set on every new connection
+- in-memory SQLite: no pool options (it uses a single static connection)
+
+and any of them can be overridden from the environment. Options passed in the
+app config (create_app(config={'SQLALCHEMY_ENGINE_OPTIONS': ...})) take
+precedence over both.
+
+The statement timeout is set on every PostgreSQL connection, so it bounds
+each statement of a request; a runaway query fails instead of holding a pool
+connection. Pool checkout waits, exhaustion timeouts and capacity are exported
+as Prometheus metrics (see app.core.prometheus).
+
+SQLite still allows one writer at a time. With SQLITE_WRITE_QUEUE enabled,
+bulk writes (imports, batch creation, bulk status changes) run inside
+serialized_writes(), which queues them on a lock file next to the database so
+that gunicorn workers take turns instead of failing with "database is locked".
+
+Read replica: with DATABASE_REPLICA_URL set, a 'replica' bind is added to
+SQLALCHEMY_BINDS (with the same per-backend options) and db.session routes
+the reads of views decorated with @read_replica to it; writes and flushes
+always go to the primary. A client that must see its own writes immediately
+(replication lag) sends ``X-Read-Your-Writes: 1`` (or ``?read_your_writes=1``)
+and the request reads from the primary.
+
+Configuration (environment):
+
+    DB_POOL_SIZE                connections kept in each worker's pool
+    DB_MAX_OVERFLOW             connections opened beyond the pool under load
+    DB_POOL_TIMEOUT             seconds to wait for a connection before failing
+    DB_POOL_RECYCLE             seconds after which connections are replaced (-1: never)
+    DB_POOL_PRE_PING            'true' to test connections on checkout
+    DB_STATEMENT_TIMEOUT_MS     PostgreSQL statement timeout, 0 to disable
+    DB_EXECUTEMANY_MODE         psycopg2 executemany mode ('values_plus_batch', 'values_only')
+    DB_EXECUTEMANY_PAGE_SIZE    rows per multi-row INSERT and per UPDATE batch
+    DB_ECHO                     'true' to log every statement
+    SQLITE_JOURNAL_MODE         SQLite journal mode (default: WAL)
+    SQLITE_SYNCHRONOUS          SQLite synchronous pragma (default: NORMAL)
+    SQLITE_BUSY_TIMEOUT_MS      wait for a locked SQLite database before failing (default: 15000)
+    SQLITE_CACHE_SIZE_KB        SQLite page cache per connection (default: 65536)
+    SQLITE_MMAP_SIZE            bytes of the SQLite file memory-mapped (default: 268435456)
+    SQLITE_WRITE_QUEUE          'true' to serialize bulk writes across workers (default: false)
+    DATABASE_REPLICA_URL        read replica for @read_replica views (default: none, primary only)
+"""
+import os
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+try:
+    import fcntl
+except ImportError:  # Windows: bulk writes are only serialized within the process
+    fcntl = None
+
+REPLICA_BIND = 'replica'
+
+BACKEND_DEFAULTS = {
+    'postgresql': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'statement_timeout_ms': 30000,
+        'executemany_mode': 'values_plus_batch',
+        'executemany_page_size': 1000,
+    },
+    'mysql': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        # Below MySQL's default wait_timeout
+        'pool_recycle': 280,
+        'pool_pre_ping': True,
+    },
+    'sqlite': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout_ms': 15000,
+        'cache_size_kb': 65536,
+        'mmap_size': 256 * 1024 * 1024,
+    },
+}
+
+POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')
+
+_ENVIRONMENT = {
+    'pool_size': ('DB_POOL_SIZE', int),
+    'max_overflow': ('DB_MAX_OVERFLOW', int),
+    'pool_timeout': ('DB_POOL_TIMEOUT', float),
+    'pool_recycle': ('DB_POOL_RECYCLE', int),
+    'pool_pre_ping': ('DB_POOL_PRE_PING', lambda value: value.lower() in ('true', '1', 't')),
+    'statement_timeout_ms': ('DB_STATEMENT_TIMEOUT_MS', int),
+    'executemany_mode': ('DB_EXECUTEMANY_MODE', str),
+    'executemany_page_size': ('DB_EXECUTEMANY_PAGE_SIZE', int),
+    'echo': ('DB_ECHO', lambda value: value.lower() in ('true', '1', 't')),
+    'journal_mode': ('SQLITE_JOURNAL_MODE', str),
+    'synchronous': ('SQLITE_SYNCHRONOUS', str),
+    'busy_timeout_ms': ('SQLITE_BUSY_TIMEOUT_MS', int),
+    'cache_size_kb': ('SQLITE_CACHE_SIZE_KB', int),
+    'mmap_size': ('SQLITE_MMAP_SIZE', int),
+}
+SQLITE_PRAGMA_VALUES = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+}
+
+
+def is_memory_sqlite(uri):
+    return uri.startswith('sqlite') and (uri.rstrip('/') == 'sqlite:' or ':memory:' in uri or 'mode=memory' in uri)
+
+
+def database_settings(uri, environ=None):
+    """Backend defaults for `uri` overridden by the environment"""
+    environ = os.environ if environ is None else environ
+    settings = dict(BACKEND_DEFAULTS.get(make_url(uri).get_backend_name(), {}))
+    for name, (variable, parse) in _ENVIRONMENT.items():
+        if environ.get(variable) not in (None, ''):
+            try:
+                settings[name] = parse(environ[variable])
+            except ValueError:
+                raise ValueError(f"Invalid value for {variable}: {environ[variable]!r}")
+    return settings
+
+
+def engine_options(uri, environ=None):
+    """
+    create_engine keyword arguments for `uri`
+
+    Returns:
+        dict: Options for SQLALCHEMY_ENGINE_OPTIONS
+    """
+    settings = database_settings(uri, environ)
+    url = make_url(uri)
+    options = {}
+
+    if not is_memory_sqlite(uri):
+        options.update({name: settings[name] for name in POOL_OPTIONS if name in settings})
+    if 'echo' in settings:
+        options['echo'] = settings['echo']
+
+    if url.get_backend_name() == 'sqlite' and not is_memory_sqlite(uri) and settings.get('busy_timeout_ms'):
+        # sqlite3's own busy handler, in seconds
+        options['connect_args'] = {'timeout': settings['busy_timeout_ms'] / 1000.0}
+
+    if url.get_backend_name() == 'postgresql':
+        timeout = settings.get('statement_timeout_ms')
+        if timeout:
+            options['connect_args'] = {'options': f"-c statement_timeout={int(timeout)}"}
+        if url.get_driver_name() == 'psycopg2':
+            if settings.get('executemany_mode'):
+                options['executemany_mode'] = settings['executemany_mode']
+            if settings.get('executemany_page_size'):
+                # Multi-row INSERT ... VALUES pages, and execute_batch pages for UPDATE/DELETE
+                options['insertmanyvalues_page_size'] = settings['executemany_page_size']
+                options['executemany_batch_page_size'] = settings['executemany_page_size']
+    return options
+
+
+def configure_database(app):
+    """
+    Fill SQLALCHEMY_ENGINE_OPTIONS from the environment
+
+    Must run before db.init_app. Options already in the app config win.
+    """
+    options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    configured = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    if 'connect_args' in options and 'connect_args' in configured:
+        configured = dict(configured, connect_args=dict(options['connect_args'], **configured['connect_args']))
+    options.update(configured)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    if replica_url and REPLICA_BIND not in binds:
+        binds[REPLICA_BIND] = dict(engine_options(replica_url), url=replica_url)
+    return options
+
+
+def sqlite_pragmas(uri, environ=None):
+    """PRAGMA statements run on each new connection to the SQLite file `uri`"""
+    settings = database_settings(uri, environ)
+    pragmas = []
+    for name, allowed in SQLITE_PRAGMA_VALUES.items():
+        if settings.get(name):
+            value = settings[name].upper()
+            if value not in allowed:
+                raise ValueError(f"Invalid SQLite {name}: {settings[name]!r}, expected one of {', '.join(allowed)}")
+            pragmas.append(f"PRAGMA {name}={value}")
+    if settings.get('busy_timeout_ms') is not None:
+        pragmas.append(f"PRAGMA busy_timeout={int(settings['busy_timeout_ms'])}")
+    if settings.get('cache_size_kb'):
+        # Negative sizes are in KiB rather than pages
+        pragmas.append(f"PRAGMA cache_size=-{int(settings['cache_size_kb'])}")
+    if settings.get('mmap_size') is not None:
+        pragmas.append(f"PRAGMA mmap_size={int(settings['mmap_size'])}")
+    return pragmas
+
+
+def register_sqlite_pragmas(app):
+    """Tune every SQLite file engine of the app; must run after db.init_app"""
+    from app.models import db
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        uri = engine.url.render_as_string(hide_password=False)
+        if engine.dialect.name != 'sqlite' or is_memory_sqlite(uri):
+            continue
+        pragmas = sqlite_pragmas(uri)
+
+        def set_pragmas(dbapi_connection, connection_record, pragmas=pragmas):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+
+        event.listen(engine, 'connect', set_pragmas)
+
+
+def write_queue_enabled():
+    return os.environ.get('SQLITE_WRITE_QUEUE', 'False').lower() in ('true', '1', 't')
+
+
+_write_lock = threading.Lock()
+
+
+@contextmanager
+def serialized_writes(engine):
+    """
+    Run the block as the only bulk writer of a SQLite database
+
+    Threads of this process wait on a lock and other workers on an exclusive
+    lock of '<database>.write-lock'. A no-op unless SQLITE_WRITE_QUEUE is
+    enabled and `engine` is a SQLite file.
+    """
+    uri = engine.url.render_as_string(hide_password=False)
+    if not write_queue_enabled() or engine.dialect.name != 'sqlite' or is_memory_sqlite(uri):
+        yield
+        return
+    with _write_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{engine.url.database}.write-lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def wants_primary():
+    """Whether the client asked to read its own writes"""
+    flag = request.headers.get('X-Read-Your-Writes') or request.args.get('read_your_writes')
+    return flag is not None and flag.lower() in ('true', '1', 't', 'yes')
+
+
+def reading_from_replica():
+    return has_request_context() and g.get('_read_replica', False)
+
+
+def read_replica(f):
+    """Route the reads of the decorated view to the replica bind, when one is configured"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not has_request_context() or wants_primary():
+            return f(*args, **kwargs)
+        g._read_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g._read_replica = False
+    return decorated
+
+
+class RoutingSession(Session):
+    """db.session class sending reads of @read_replica views to the replica bind"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing or isinstance(clause, UpdateBase) or not reading_from_replica():
+            return engine
+        engines = self._db.engines
+        # Only the default bind is replicated
+        if REPLICA_BIND in engines and engine is engines.get(None):
+            return engines[REPLICA_BIND]
+        return engine
@@ -1,7 +1,11 @@
 import os
+import time
 import requests
 from dotenv import load_dotenv
 
+from app.core.instrumentation import span
+from app.core.prometheus import observe_embedding
+
 load_dotenv()
 
 # --- Configuration ---
@@ -37,6 +41,19 @@ def format_action_plan_document(action_plan):
 
 # --- Unified Indexing/Deletion Functions ---
 
+def _call_service(operation, payload):
+    """POST to the embedding service, timed for Server-Timing and the Prometheus metrics"""
+    start = time.perf_counter()
+    failed = True
+    try:
+        with span('embedding'):
+            response = requests.post(f"{EMBEDDING_SERVICE_URL}/{operation}", json=payload)
+        response.raise_for_status()
+        failed = False
+        return response
+    finally:
+        observe_embedding(operation, time.perf_counter() - start, failed)
+
 def index_record(record):
     """
     Determines the type of a database record, formats it, and indexes it.
@@ -61,12 +78,37 @@ def index_record(record):
     if doc and record_id:
         try:
             payload = {"texts": [doc], "metadatas": [metadata], "ids": [record_id]}
-            response = requests.post(f"{EMBEDDING_SERVICE_URL}/index", json=payload)
-            response.raise_for_status()
+            _call_service("index", payload)
             print(f"Successfully indexed record via service: {record_id}")
         except requests.RequestException as e:
             print(f"Error calling embedding service to index record {record_id}: {e}")
 
+def index_records(records):
+    """
+    Indexes a batch of records with a single call to the embedding service.
+    """
+    documents, metadatas, ids = [], [], []
+    for record in records:
+        if record.__tablename__ == 'anomalies':
+            documents.append(format_anomaly_document(record))
+            metadatas.append({'source': 'anomaly', 'id': record.id})
+            ids.append(f"anomaly_{record.id}")
+        elif record.__tablename__ == 'maintenance':
+            documents.append(format_maintenance_document(record))
+            metadatas.append({'source': 'maintenance', 'id': record.id})
+            ids.append(f"maintenance_{record.id}")
+        elif record.__tablename__ == 'action_plans':
+            documents.append(format_action_plan_document(record))
+            metadatas.append({'source': 'action_plan', 'id': record.id})
+            ids.append(f"action_plan_{record.id}")
+
+    if ids:
+        try:
+            _call_service("index", {"texts": documents, "metadatas": metadatas, "ids": ids})
+            print(f"Successfully indexed {len(ids)} records via service")
+        except requests.RequestException as e:
+            print(f"Error calling embedding service to index {len(ids)} records: {e}")
+
 def delete_record(record):
     """
     Deletes a record from the vector store based on its type and ID.
@@ -82,8 +124,7 @@ def delete_record(record):
     if record_id:
         try:
             payload = {"ids": [record_id]}
-            response = requests.post(f"{EMBEDDING_SERVICE_URL}/delete", json=payload)
-            response.raise_for_status()
+            _call_service("delete", payload)
             print(f"Successfully deleted record via service: {record_id}")
         except requests.RequestException as e:
             print(f"Error calling embedding service to delete record {record_id}: {e}")
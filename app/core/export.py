@@ -0,0 +1,291 @@
+"""
+Columnar export of the anomalies table to Parquet / Arrow IPC.
+
+Rows are read with keyset pagination on ``anomalies.id`` and written as one
+row group (Parquet) or record batch (Arrow) per chunk, so memory stays bounded
+by the chunk size whatever the size of the table.
+"""
+import io
+from datetime import datetime
+
+from sqlalchemy import select, func, case, and_
+
+from app.models import db, Anomaly, MaintenanceWindow, ActionPlan, ActionItem
+
+DEFAULT_CHUNK_SIZE = 50000
+MAX_CHUNK_SIZE = 200000
+EXPORT_FORMATS = ('parquet', 'arrow')
+
+
+def _require_pyarrow():
+    """Import pyarrow lazily so the API still starts without it"""
+    try:
+        import pyarrow as pa
+        return pa
+    except ImportError:
+        raise RuntimeError("pyarrow is required for columnar export. Install it with: pip install pyarrow")
+
+
+def _item_counts_subquery():
+    """Per action plan item totals, used for the plan summary columns"""
+    return select(
+        ActionItem.action_plan_id.label('action_plan_id'),
+        func.count(ActionItem.id).label('item_count'),
+        func.sum(case((ActionItem.statut == 'completed', 1), else_=0)).label('items_completed')
+    ).group_by(ActionItem.action_plan_id).subquery()
+
+
+def _active(user_col, ai_col):
+    """SQL expression for the active score (user override or AI prediction)"""
+    return case((Anomaly.use_user_scores == True, user_col), else_=ai_col)
+
+
+def _column_expressions(items):
+    """
+    Map of export column name -> (SQL expression, arrow type).
+
+    The order of this mapping is the column order of the exported file.
+    """
+    pa = _require_pyarrow()
+    return {
+        'id': (Anomaly.id, pa.int64()),
+        'title': (Anomaly.title, pa.string()),
+        'description': (Anomaly.description, pa.string()),
+        'num_equipement': (Anomaly.num_equipement, pa.string()),
+        'systeme': (Anomaly.systeme, pa.string()),
+        'equipment_id': (Anomaly.equipment_id, pa.string()),
+        'service': (Anomaly.service, pa.string()),
+        'responsible_person': (Anomaly.responsible_person, pa.string()),
+        'status': (Anomaly.status, pa.string()),
+        'origin_source': (Anomaly.origin_source, pa.string()),
+        'date_detection': (Anomaly.date_detection, pa.timestamp('us')),
+        'description_equipement': (Anomaly.description_equipement, pa.string()),
+        'section_proprietaire': (Anomaly.section_proprietaire, pa.string()),
+        # Active scores (user override or AI prediction)
+        'fiabilite_integrite': (_active(Anomaly.user_fiabilite_score, Anomaly.fiabilite_score), pa.float64()),
+        'disponibilite': (_active(Anomaly.user_disponibilite_score, Anomaly.disponibilite_score), pa.float64()),
+        'process_safety': (_active(Anomaly.user_process_safety_score, Anomaly.process_safety_score), pa.float64()),
+        'criticite': (_active(Anomaly.user_criticality_level, Anomaly.criticality_level), pa.float64()),
+        'use_user_scores': (Anomaly.use_user_scores, pa.bool_()),
+        'is_approved': (Anomaly.is_approved, pa.bool_()),
+        'priority': (Anomaly.priority, pa.string()),
+        'estimated_hours': (Anomaly.estimated_hours, pa.float64()),
+        # Maintenance window
+        'maintenance_window_id': (Anomaly.maintenance_window_id, pa.int64()),
+        'window_type': (MaintenanceWindow.type, pa.string()),
+        'window_status': (MaintenanceWindow.status, pa.string()),
+        'window_start_date': (MaintenanceWindow.start_date, pa.timestamp('us')),
+        'window_end_date': (MaintenanceWindow.end_date, pa.timestamp('us')),
+        # Action plan summary
+        'action_plan_id': (ActionPlan.id, pa.int64()),
+        'action_plan_status': (ActionPlan.status, pa.string()),
+        'action_plan_priority': (ActionPlan.priority, pa.string()),
+        'action_plan_needs_outage': (ActionPlan.needs_outage, pa.bool_()),
+        'action_plan_total_duration_hours': (ActionPlan.total_duration_hours, pa.float64()),
+        'action_plan_item_count': (func.coalesce(items.c.item_count, 0), pa.int64()),
+        'action_plan_items_completed': (func.coalesce(items.c.items_completed, 0), pa.int64()),
+        'created_at': (Anomaly.created_at, pa.timestamp('us')),
+        'updated_at': (Anomaly.updated_at, pa.timestamp('us')),
+    }
+
+
+def available_columns():
+    """Names of every column that can be exported"""
+    items = _item_counts_subquery()
+    return list(_column_expressions(items).keys())
+
+
+def _resolve_columns(columns, expressions):
+    """Validate a column projection and drop duplicates, keeping order"""
+    if not columns:
+        return list(expressions.keys())
+    unknown = [c for c in columns if c not in expressions]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {unknown}")
+    return list(dict.fromkeys(columns))
+
+
+def _parse_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def build_filter_clauses(filters, active_criticality):
+    """
+    Translate export filters into SQL predicates.
+
+    Supported keys: status, service, systeme, num_equipement (single value or list),
+    date_from, date_to (on date_detection, half-open), min_criticality,
+    max_criticality (on the active criticality), is_approved.
+    """
+    clauses = []
+    filters = filters or {}
+
+    for key in ('status', 'service', 'systeme', 'num_equipement'):
+        value = filters.get(key)
+        if value is None or value == '' or value == []:
+            continue
+        column = getattr(Anomaly, key)
+        if isinstance(value, (list, tuple)):
+            clauses.append(column.in_(list(value)))
+        elif isinstance(value, str) and ',' in value:
+            clauses.append(column.in_([v.strip() for v in value.split(',') if v.strip()]))
+        else:
+            clauses.append(column == value)
+
+    date_from = _parse_datetime(filters.get('date_from'))
+    if date_from is not None:
+        clauses.append(Anomaly.date_detection >= date_from)
+    date_to = _parse_datetime(filters.get('date_to'))
+    if date_to is not None:
+        clauses.append(Anomaly.date_detection < date_to)
+
+    if filters.get('min_criticality') is not None:
+        clauses.append(active_criticality >= float(filters['min_criticality']))
+    if filters.get('max_criticality') is not None:
+        clauses.append(active_criticality < float(filters['max_criticality']))
+
+    if filters.get('is_approved') is not None:
+        value = filters['is_approved']
+        if isinstance(value, str):
+            value = value.lower() in ('true', '1', 't', 'yes')
+        clauses.append(Anomaly.is_approved == bool(value))
+
+    return clauses
+
+
+def iter_anomaly_batches(columns=None, filters=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield pyarrow RecordBatches of anomalies, chunk_size rows at a time.
+
+    Args:
+        columns: Optional list of column names to project (default: all columns)
+        filters: Optional dict of predicate filters (see build_filter_clauses)
+        chunk_size: Rows per batch / row group
+
+    Yields:
+        pyarrow.RecordBatch
+    """
+    pa = _require_pyarrow()
+    items = _item_counts_subquery()
+    expressions = _column_expressions(items)
+
+    selected = _resolve_columns(columns, expressions)
+    schema = pa.schema([(name, expressions[name][1]) for name in selected])
+
+    # The id is always read for keyset pagination, even when it is not exported
+    stmt = select(
+        Anomaly.id.label('__cursor_id'),
+        *[expressions[name][0].label(name) for name in selected]
+    ).select_from(Anomaly)\
+        .outerjoin(MaintenanceWindow, Anomaly.maintenance_window_id == MaintenanceWindow.id)\
+        .outerjoin(ActionPlan, ActionPlan.anomaly_id == Anomaly.id)\
+        .outerjoin(items, items.c.action_plan_id == ActionPlan.id)
+
+    clauses = build_filter_clauses(filters, expressions['criticite'][0])
+    if clauses:
+        stmt = stmt.where(and_(*clauses))
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            stmt.where(Anomaly.id > last_id).order_by(Anomaly.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        # Transpose rows into columns once per chunk
+        data = list(zip(*rows))
+        last_id = data[0][-1]
+        arrays = [pa.array(data[i + 1], type=schema.field(i).type) for i in range(len(selected))]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+        if len(rows) < chunk_size:
+            break
+
+
+def _export_schema(columns=None):
+    """Arrow schema for the given projection (all columns by default)"""
+    pa = _require_pyarrow()
+    expressions = _column_expressions(_item_counts_subquery())
+    names = _resolve_columns(columns, expressions)
+    return pa.schema([(name, expressions[name][1]) for name in names])
+
+
+def export_anomalies(sink, fmt='parquet', columns=None, filters=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE, compression='zstd'):
+    """
+    Write anomalies to a Parquet or Arrow IPC file.
+
+    Args:
+        sink: Output path or writable binary file object
+        fmt: 'parquet' or 'arrow'
+        columns: Optional list of columns to project
+        filters: Optional dict of predicate filters
+        chunk_size: Rows per row group / record batch
+        compression: Parquet/IPC compression codec (None to disable)
+
+    Returns:
+        int: Number of rows written
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Export format must be one of {EXPORT_FORMATS}")
+
+    pa = _require_pyarrow()
+    batches = iter_anomaly_batches(columns=columns, filters=filters, chunk_size=chunk_size)
+    total_rows = 0
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        with pq.ParquetWriter(sink, _export_schema(columns), compression=compression) as writer:
+            for batch in batches:
+                writer.write_batch(batch, row_group_size=chunk_size)
+                total_rows += batch.num_rows
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression) if compression else None
+        with pa.ipc.new_file(sink, _export_schema(columns), options=options) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                total_rows += batch.num_rows
+
+    return total_rows
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_anomalies_arrow(columns=None, filters=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Generate an Arrow IPC *stream* chunk by chunk, for streaming HTTP responses.
+
+    Yields:
+        bytes: Serialized IPC stream fragments (schema, then one per record batch)
+    """
+    pa = _require_pyarrow()
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, _export_schema(columns))
+
+    for batch in iter_anomaly_batches(columns=columns, filters=filters, chunk_size=chunk_size):
+        writer.write_batch(batch)
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
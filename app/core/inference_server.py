@@ -0,0 +1,333 @@
+"""
+Optional inference sidecar: one model copy shared by every web worker.
+
+The server process loads EquipmentReliabilityPredictor once, then forks a pool
+of worker processes that inherit the model copy-on-write and accept predict
+calls from web workers over a unix socket. Web workers use RemotePredictor
+(returned by get_predictor() when INFERENCE_SERVER_SOCKET is set), which has
+the same predict_single / predict_batch / predict_frame / predict_from_file
+interface as the local predictor.
+
+Configuration (environment):
+
+    INFERENCE_SERVER_SOCKET      unix socket path; enables the remote predictor in web workers
+    INFERENCE_SERVER_AUTHKEY     shared secret for the socket (default: SECRET_KEY; one of them
+                                 must be set, payloads are unpickled)
+    INFERENCE_WORKERS            server worker processes (default: 2)
+    INFERENCE_MAX_CONCURRENCY    in-flight requests per server worker before replying busy (default: 4)
+    INFERENCE_MAX_IN_FLIGHT      in-flight requests per web process before failing fast (default: 8)
+    INFERENCE_TIMEOUT            seconds to wait for a prediction (default: 30)
+
+With PREDICT_BATCHING_ENABLED, single-row calls are micro-batched inside each
+server worker (see app/core/batcher.py). With MODEL_WATCH_INTERVAL set, every
+server worker watches MODEL_PATH and hot-reloads new versions (see
+app/core/model_holder.py).
+
+Protocol: the client connects (authenticated with the shared secret), sends
+the operation name as raw bytes and waits for 'ready' before sending the
+pickled payload, so a saturated worker answers 'busy' without reading or
+unpickling it. The socket is created with mode 0600: web workers must run as
+the same user as the server.
+"""
+import errno
+import gc
+import os
+import signal
+import threading
+import time
+from multiprocessing.connection import Listener, Client
+
+import pandas as pd
+
+from app.core.predictor import EquipmentReliabilityPredictor
+from app.core.model_holder import ModelHolder, DEFAULT_MODEL_PATH
+from app.core.batcher import MicroBatcher, batching_enabled, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_TIMEOUT = 30.0
+MAX_OP_LENGTH = 64
+HEADER_TIMEOUT = 1.0
+FEATURE_COLUMNS = ["Num_equipement", "Systeme", "Description"]
+
+
+class InferenceBusyError(RuntimeError):
+    """Raised when the inference server or the local in-flight limit is saturated"""
+
+
+def _authkey():
+    """Shared secret of the socket; refuses to fall back to a built-in key since payloads are unpickled"""
+    key = os.environ.get('INFERENCE_SERVER_AUTHKEY') or os.environ.get('SECRET_KEY')
+    if not key:
+        raise RuntimeError("Set INFERENCE_SERVER_AUTHKEY (or SECRET_KEY) to use the inference server")
+    return key.encode('utf-8')
+
+
+def _int_env(name, default):
+    return int(os.environ.get(name, default))
+
+
+class InferenceServer:
+    def __init__(self, socket_path, workers=DEFAULT_WORKERS, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 backlog=128, predictor_factory=EquipmentReliabilityPredictor):
+        """
+        Args:
+            socket_path: Unix socket path to listen on
+            workers: Number of forked worker processes sharing the model
+            max_concurrency: Requests handled at once per worker; more are answered 'busy'
+            backlog: Listen backlog of the socket
+            predictor_factory: Callable(model_path=...) returning the predictor to serve
+        """
+        self.socket_path = socket_path
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.backlog = backlog
+        self.holder = ModelHolder(
+            model_path=os.environ.get('MODEL_PATH', DEFAULT_MODEL_PATH),
+            factory=predictor_factory,
+            watch_interval=float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+        )
+        self.batcher = None
+        self.children = {}
+        self._stopping = False
+
+    def serve_forever(self):
+        """Load the model, fork the worker pool and supervise it until SIGTERM/SIGINT"""
+        authkey = _authkey()
+        print("Loading model for inference server...")
+        # Loaded before the fork so the workers share it; each worker's holder swaps
+        # in its own copy if the artifact changes
+        self.holder.preload()
+        if batching_enabled():
+            # Each forked worker starts its own batching thread on first use
+            self.batcher = MicroBatcher(
+                lambda: self.holder.current,
+                max_batch_size=_int_env('PREDICT_BATCH_MAX_SIZE', DEFAULT_MAX_BATCH_SIZE),
+                max_wait_ms=float(os.environ.get('PREDICT_BATCH_MAX_WAIT_MS', DEFAULT_MAX_WAIT_MS))
+            )
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = Listener(self.socket_path, family='AF_UNIX', backlog=self.backlog, authkey=authkey)
+        os.chmod(self.socket_path, 0o600)
+
+        # Move everything allocated so far (the model) out of the GC's reach so that
+        # collections in the children do not touch, and so copy, the shared pages
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for _ in range(self.workers):
+            self._spawn(listener)
+        print(f"Inference server listening on {self.socket_path} with {self.workers} worker(s)")
+
+        try:
+            while not self._stopping:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                except InterruptedError:
+                    continue
+                if pid in self.children and not self._stopping:
+                    print(f"Inference worker {pid} exited with status {status}, restarting")
+                    del self.children[pid]
+                    self._spawn(listener)
+        finally:
+            for pid in list(self.children):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            print("Inference server stopped")
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _spawn(self, listener):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                self._worker_loop(listener)
+            finally:
+                os._exit(0)
+        self.children[pid] = True
+
+    def _worker_loop(self, listener):
+        """Accept connections on the shared socket; one thread per in-flight request"""
+        slots = threading.BoundedSemaphore(self.max_concurrency)
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError as e:
+                if e.errno in (None, errno.EBADF, errno.EINVAL):
+                    # The listener ('listener is closed') or its socket is closed: nothing
+                    # will ever be accepted again
+                    return
+                print(f"Inference worker {os.getpid()} accept error: {e}")
+                continue
+            except Exception as e:
+                # Failed handshake of one client (EOFError, AuthenticationError)
+                print(f"Inference worker {os.getpid()} accept error: {e}")
+                continue
+
+            try:
+                op = conn.recv_bytes(MAX_OP_LENGTH).decode('utf-8') if conn.poll(HEADER_TIMEOUT) else None
+            except (EOFError, OSError, UnicodeDecodeError):
+                op = None
+            if op is None:
+                conn.close()
+                continue
+
+            if not slots.acquire(blocking=False):
+                # Back-pressure: tell the client to retry elsewhere/later instead of queueing.
+                # The client has not sent its payload yet, so there is nothing to read.
+                try:
+                    conn.send(('busy', f"worker {os.getpid()} at max concurrency"))
+                except (EOFError, OSError):
+                    pass
+                finally:
+                    conn.close()
+                continue
+
+            threading.Thread(target=self._handle, args=(conn, op, slots), daemon=True).start()
+
+    def _handle(self, conn, op, slots):
+        try:
+            conn.send(('ready', None))
+            payload = conn.recv()
+            conn.send(('ok', self.dispatch(op, payload)))
+        except EOFError:
+            pass
+        except Exception as e:
+            try:
+                conn.send(('error', str(e)))
+            except Exception:
+                pass
+        finally:
+            conn.close()
+            slots.release()
+
+    def dispatch(self, op, payload):
+        """Run one request against the served predictor"""
+        predictor = self.holder.current
+        if op == 'predict_single':
+            if self.batcher is not None:
+                return self.batcher.predict_single(payload)
+            return predictor.predict_single(payload)
+        if op == 'predict_batch':
+            return predictor.predict_batch(payload)
+        if op == 'predict_frame':
+            frame = predictor.predict_frame(pd.DataFrame(payload, columns=FEATURE_COLUMNS))
+            return {col: frame[col].to_numpy() for col in frame.columns}
+        if op == 'ping':
+            return {'pid': os.getpid(), 'model_version': predictor.model_version}
+        raise ValueError(f"Unknown inference operation: {op}")
+
+
+class RemotePredictor(EquipmentReliabilityPredictor):
+    """
+    Predictor backed by the inference server
+
+    Preprocessing and the model live in the server; file reading, criticality and
+    result writing are inherited from EquipmentReliabilityPredictor and run locally.
+    """
+
+    def __init__(self, socket_path, timeout=None, max_in_flight=None):
+        self.socket_path = socket_path
+        self._authkey = _authkey()
+        self.timeout = timeout if timeout is not None else float(os.environ.get('INFERENCE_TIMEOUT', DEFAULT_TIMEOUT))
+        self._in_flight = threading.BoundedSemaphore(
+            max_in_flight if max_in_flight is not None else _int_env('INFERENCE_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)
+        )
+        self.model = None
+        self.label_encoders = {}
+        self.vectorizer = None
+        self.target_columns = ["Fiabilité Intégrité", "Disponibilité", "Process Safety", "Criticité"]
+        self._model_version = None
+        self._version_checked = float('-inf')
+
+    def _call(self, op, payload):
+        deadline = time.monotonic() + self.timeout
+        if not self._in_flight.acquire(timeout=self.timeout):
+            raise InferenceBusyError("Too many in-flight inference requests in this process")
+        try:
+            attempt = 0
+            while True:
+                conn = Client(self.socket_path, family='AF_UNIX', authkey=self._authkey)
+                try:
+                    # The payload is only sent once the worker has a free slot
+                    conn.send_bytes(op.encode('utf-8'))
+                    status, result = self._receive(conn, deadline)
+                    if status == 'ready':
+                        conn.send(payload)
+                        status, result = self._receive(conn, deadline)
+                finally:
+                    conn.close()
+
+                if status == 'ok':
+                    return result
+                if status != 'busy':
+                    raise RuntimeError(f"Inference server error: {result}")
+
+                # Server is saturated: back off exponentially until the deadline
+                backoff = min(0.002 * (2 ** attempt), 0.05)
+                if time.monotonic() + backoff > deadline:
+                    raise InferenceBusyError(result)
+                time.sleep(backoff)
+                attempt += 1
+        finally:
+            self._in_flight.release()
+
+    def _receive(self, conn, deadline):
+        if not conn.poll(max(deadline - time.monotonic(), 0)):
+            raise TimeoutError(f"Inference server did not answer within {self.timeout}s")
+        return conn.recv()
+
+    def predict_single(self, input_dict):
+        return self._call('predict_single', input_dict)
+
+    def predict_batch(self, input_list):
+        if not input_list:
+            return []
+        return self._call('predict_batch', input_list)
+
+    def predict_frame(self, df, chunk_size=10000):
+        if len(df) == 0:
+            return pd.DataFrame(columns=self.target_columns, index=df.index)
+
+        parts = []
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size].reindex(columns=FEATURE_COLUMNS)
+            records = chunk.astype(object).where(chunk.notna(), None).values.tolist()
+            parts.append(pd.DataFrame(self._call('predict_frame', records)))
+        result = pd.concat(parts, ignore_index=True)
+        result.index = df.index
+        return result
+
+    @property
+    def model_version(self):
+        """Version served by the inference server (cached for a few seconds)"""
+        now = time.monotonic()
+        if now - self._version_checked > 5.0:
+            self._model_version = self._call('ping', None).get('model_version')
+            self._version_checked = now
+        return self._model_version
+
+    def validate_model(self):
+        self._call('ping', None)
+        return True
+
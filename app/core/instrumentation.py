@@ -0,0 +1,234 @@
+"""
+Per-request timing and SQL query instrumentation.
+
+For every request the hooks registered by register_instrumentation record:
+
+- wall time and CPU time (of the request thread)
+- the number and total time of SQL statements, from SQLAlchemy cursor events;
+  a statement executed more than N_PLUS_ONE_THRESHOLD times in one request is
+  flagged as a probable N+1 pattern
+- named spans (``with span('predict'):``) around predictor and embedding-service calls
+
+The totals are returned in a ``Server-Timing`` header and aggregated per
+endpoint in this process; GET /api/v1/_metrics serves the aggregates.
+
+Configuration (environment):
+
+    INSTRUMENTATION_ENABLED     'false' to disable the hooks (default: true)
+    N_PLUS_ONE_THRESHOLD        executions of one statement in a request flagged as N+1 (default: 10)
+"""
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+MAX_FLAGGED_STATEMENTS = 50
+
+
+def instrumentation_enabled():
+    return os.environ.get('INSTRUMENTATION_ENABLED', 'True').lower() in ('true', '1', 't')
+
+
+class RequestTrace:
+    """Measurements of the request being served, kept on flask.g"""
+
+    def __init__(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.statements = Counter()
+        self.spans = defaultdict(float)
+
+    def add_query(self, statement, duration):
+        self.query_count += 1
+        self.query_time += duration
+        self.statements[statement] += 1
+
+    def repeated_statements(self, threshold):
+        return {statement: count for statement, count in self.statements.items() if count > threshold}
+
+
+def current_trace():
+    """The RequestTrace of the current request, or None outside instrumented requests"""
+    if not has_request_context():
+        return None
+    return g.get('_request_trace')
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to the current request's span `name`"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans[name] += time.perf_counter() - start
+
+
+class EndpointMetrics:
+    """Per-endpoint aggregates for this process"""
+
+    def __init__(self, n_plus_one_threshold=DEFAULT_N_PLUS_ONE_THRESHOLD):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._flagged = {}
+        self.started_at = time.time()
+
+    def record(self, endpoint, status, trace, wall, cpu):
+        repeated = trace.repeated_statements(self.n_plus_one_threshold)
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    "requests": 0, "errors": 0, "wall_s": 0.0, "wall_max_s": 0.0, "cpu_s": 0.0,
+                    "queries": 0, "query_s": 0.0, "query_max": 0, "n_plus_one": 0, "spans_s": defaultdict(float)
+                }
+            stats["requests"] += 1
+            stats["errors"] += status >= 500
+            stats["wall_s"] += wall
+            stats["wall_max_s"] = max(stats["wall_max_s"], wall)
+            stats["cpu_s"] += cpu
+            stats["queries"] += trace.query_count
+            stats["query_s"] += trace.query_time
+            stats["query_max"] = max(stats["query_max"], trace.query_count)
+            stats["n_plus_one"] += bool(repeated)
+            for name, duration in trace.spans.items():
+                stats["spans_s"][name] += duration
+
+            for statement, count in repeated.items():
+                flagged = self._flagged.get((endpoint, statement))
+                if flagged is None:
+                    if len(self._flagged) >= MAX_FLAGGED_STATEMENTS:
+                        continue
+                    flagged = self._flagged[(endpoint, statement)] = {
+                        "endpoint": endpoint, "statement": statement, "requests": 0, "max_executions": 0
+                    }
+                flagged["requests"] += 1
+                flagged["max_executions"] = max(flagged["max_executions"], count)
+        return repeated
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self._endpoints.items():
+                n = stats["requests"]
+                endpoints[endpoint] = {
+                    "requests": n,
+                    "errors": stats["errors"],
+                    "wall_ms_avg": stats["wall_s"] / n * 1000.0,
+                    "wall_ms_max": stats["wall_max_s"] * 1000.0,
+                    "cpu_ms_avg": stats["cpu_s"] / n * 1000.0,
+                    "queries_avg": stats["queries"] / n,
+                    "queries_max": stats["query_max"],
+                    "query_ms_avg": stats["query_s"] / n * 1000.0,
+                    "n_plus_one_requests": stats["n_plus_one"],
+                    "spans_ms_avg": {name: total / n * 1000.0 for name, total in stats["spans_s"].items()}
+                }
+            flagged = sorted(self._flagged.values(), key=lambda f: f["max_executions"], reverse=True)
+        return {
+            "pid": os.getpid(),
+            "uptime_s": time.time() - self.started_at,
+            "n_plus_one_threshold": self.n_plus_one_threshold,
+            "endpoints": endpoints,
+            "n_plus_one": [dict(f) for f in flagged]
+        }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._flagged.clear()
+            self.started_at = time.time()
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_endpoint_metrics():
+    """The process-wide endpoint aggregates"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = EndpointMetrics(
+                    n_plus_one_threshold=int(os.environ.get('N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD))
+                )
+    return _metrics
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time lives on the statement's execution context, not on the pooled
+    # connection, so a statement that raises (no after_cursor_execute) leaves nothing behind
+    if current_trace() is not None and context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace()
+    start = getattr(context, '_query_start', None)
+    if trace is None or start is None:
+        return
+    trace.add_query(statement, time.perf_counter() - start)
+
+
+_engine_listeners_registered = False
+
+
+def _register_engine_listeners():
+    # Listening on the Engine class covers every engine (and bind); register once per process
+    global _engine_listeners_registered
+    if not _engine_listeners_registered:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _engine_listeners_registered = True
+
+
+def server_timing(trace, wall, cpu):
+    """Server-Timing header value for a finished request"""
+    entries = [
+        f"app;dur={wall * 1000.0:.2f}",
+        f"cpu;dur={cpu * 1000.0:.2f}",
+        f'db;dur={trace.query_time * 1000.0:.2f};desc="{trace.query_count} queries"'
+    ]
+    entries.extend(f"{name};dur={duration * 1000.0:.2f}" for name, duration in sorted(trace.spans.items()))
+    return ", ".join(entries)
+
+
+def register_instrumentation(app):
+    """Register the request hooks and SQL listeners"""
+    if not instrumentation_enabled():
+        return
+    _register_engine_listeners()
+
+    @app.before_request
+    def start_request_trace():
+        g._request_trace = RequestTrace()
+
+    @app.after_request
+    def finish_request_trace(response):
+        trace = current_trace()
+        if trace is None:
+            return response
+        wall = time.perf_counter() - trace.wall_start
+        cpu = time.thread_time() - trace.cpu_start
+        endpoint = f"{request.method} {request.url_rule.rule if request.url_rule else '<unmatched>'}"
+
+        repeated = get_endpoint_metrics().record(endpoint, response.status_code, trace, wall, cpu)
+        for statement, count in repeated.items():
+            app.logger.warning("Possible N+1 in %s: statement executed %d times: %s",
+                               endpoint, count, statement[:200])
+
+        response.headers['Server-Timing'] = server_timing(trace, wall, cpu)
+        return response
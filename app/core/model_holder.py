@@ -0,0 +1,245 @@
+"""
+Per-process owner of the loaded model, with hot reload.
+
+The holder keeps a reference to the current EquipmentReliabilityPredictor. A
+reload loads the new artifact next to the running one, validates it
+(validate_model plus golden inputs) and swaps the reference atomically; a
+failed reload keeps the current model. Requests that already called
+get_predictor() keep their reference, so the old model stays alive until
+they finish and is then garbage collected.
+
+Reloads always load the configured MODEL_PATH, so every process serves the
+same artifact. They are triggered by the admin endpoint (POST
+/api/v1/model/reload), which only reaches the process handling the request,
+or, with MODEL_WATCH_INTERVAL set, by a per-process thread that polls the
+artifact's mtime/size; with several workers, replace the artifact at
+MODEL_PATH and let the watchers pick it up.
+
+Configuration (environment):
+
+    MODEL_PATH               model artifact, joblib pickle or compiled directory
+                             (default: ml_models/multi_output_model.pkl)
+    MODEL_WATCH_INTERVAL     seconds between artifact checks, 0 disables watching (default: 0)
+    MODEL_GOLDEN_INPUTS      JSON file with a list of {"input": {...}, "expected": {...}, "tolerance": 0.5}
+                             checked before a model is swapped in (default: built-in sanity inputs)
+"""
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from app.core.predictor import EquipmentReliabilityPredictor, artifact_signature
+
+DEFAULT_MODEL_PATH = "ml_models/multi_output_model.pkl"
+DEFAULT_TOLERANCE = 0.5
+SCORE_COLUMNS = ["Fiabilité Intégrité", "Disponibilité", "Process Safety"]
+
+# Used when MODEL_GOLDEN_INPUTS is not set: predictions must be finite and classified
+DEFAULT_GOLDEN_INPUTS = [
+    {"input": {"Num_equipement": "unknown", "Systeme": "unknown", "Description": "fuite vanne"}},
+    {"input": {"Num_equipement": "unknown", "Systeme": "unknown", "Description": "vibration pompe roulement"}},
+]
+
+
+def load_golden_inputs():
+    path = os.environ.get('MODEL_GOLDEN_INPUTS')
+    if not path:
+        return DEFAULT_GOLDEN_INPUTS
+    with open(path) as f:
+        return json.load(f)
+
+
+class ModelReloadError(RuntimeError):
+    """Raised when a new model fails to load or validate"""
+
+
+class ModelHolder:
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, factory=EquipmentReliabilityPredictor,
+                 watch_interval=0.0, golden_inputs=None):
+        """
+        Args:
+            model_path: Artifact to load
+            factory: Callable(model_path=...) returning a predictor
+            watch_interval: Seconds between artifact checks (0 disables the watcher)
+            golden_inputs: List of {"input", "expected", "tolerance"} checked before swapping a model in
+        """
+        self.model_path = model_path
+        self.factory = factory
+        self.watch_interval = watch_interval
+        self.golden_inputs = golden_inputs if golden_inputs is not None else load_golden_inputs()
+
+        self._predictor = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher_pid = None
+        self.loaded_at = None
+        self.last_reload = None
+
+    @property
+    def current(self):
+        """The current predictor, loaded on first use"""
+        predictor = self.preload()
+        self._ensure_watcher()
+        return predictor
+
+    def preload(self):
+        """Load the model if needed, without starting the watcher (e.g. before forking)"""
+        if self._predictor is None:
+            with self._lock:
+                if self._predictor is None:
+                    signature = artifact_signature(self.model_path)
+                    self._predictor = self.factory(model_path=self.model_path)
+                    self._signature = signature
+                    self.loaded_at = datetime.utcnow()
+        return self._predictor
+
+    @property
+    def version(self):
+        return self._predictor.model_version if self._predictor is not None else None
+
+    def validate(self, predictor):
+        """validate_model plus golden inputs; raises ModelReloadError on failure"""
+        try:
+            predictor.validate_model()
+        except Exception as e:
+            raise ModelReloadError(str(e))
+
+        if not self.golden_inputs:
+            return
+        frame = predictor.predict_frame(pd.DataFrame([case["input"] for case in self.golden_inputs]))
+        for i, (case, row) in enumerate(zip(self.golden_inputs, frame.to_dict('records'))):
+            for col in SCORE_COLUMNS:
+                if not math.isfinite(row[col]):
+                    raise ModelReloadError(f"Golden input {i}: {col} is not finite ({row[col]})")
+            if row["Criticité"] is None:
+                raise ModelReloadError(f"Golden input {i}: no criticality level")
+
+            tolerance = case.get("tolerance", DEFAULT_TOLERANCE)
+            for col, expected in case.get("expected", {}).items():
+                if col in SCORE_COLUMNS and abs(row[col] - expected) > tolerance:
+                    raise ModelReloadError(
+                        f"Golden input {i}: {col} = {row[col]:.4f}, expected {expected} ± {tolerance}")
+                if col == "Criticité" and row[col] != expected:
+                    raise ModelReloadError(f"Golden input {i}: Criticité = {row[col]}, expected {expected}")
+
+    def reload(self, background=False):
+        """
+        Load, validate and swap in the artifact at model_path
+
+        Args:
+            background: Return immediately and reload in a thread
+
+        Returns:
+            dict: Reload status ('in_progress' when another reload is running)
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return {"status": "in_progress"}
+
+        if background:
+            threading.Thread(target=self._reload_locked, name="model-reload", daemon=True).start()
+            return {"status": "started", "model_path": self.model_path}
+        return self._reload_locked()
+
+    def _reload_locked(self):
+        path = self.model_path
+        started = time.perf_counter()
+        signature = None
+        try:
+            signature = artifact_signature(path)
+            predictor = self.factory(model_path=path)
+            self.validate(predictor)
+
+            previous = self.version
+            with self._lock:
+                # In-flight requests keep their reference to the previous predictor
+                self._predictor = predictor
+                self._signature = signature
+                self.loaded_at = datetime.utcnow()
+            self.last_reload = {
+                "status": "success",
+                "model_path": path,
+                "previous_version": previous,
+                "version": predictor.model_version,
+                "duration_s": time.perf_counter() - started,
+                "at": self.loaded_at.isoformat()
+            }
+            print(f"Model reloaded from {path}: {previous} -> {predictor.model_version}")
+        except Exception as e:
+            # Keep serving the current model; remember the signature so a broken
+            # artifact is not reloaded again on every check
+            if signature is not None:
+                self._signature = signature
+            self.last_reload = {
+                "status": "failed",
+                "model_path": path,
+                "error": str(e),
+                "duration_s": time.perf_counter() - started,
+                "at": datetime.utcnow().isoformat()
+            }
+            print(f"Model reload from {path} failed, keeping version {self.version}: {e}")
+        finally:
+            self._reload_lock.release()
+        return self.last_reload
+
+    def check_for_update(self):
+        """Reload when the artifact changed on disk; returns the reload status or None"""
+        try:
+            signature = artifact_signature(self.model_path)
+        except OSError:
+            # Artifact is being replaced
+            return None
+        if self._predictor is None or signature == self._signature:
+            return None
+        return self.reload()
+
+    def _ensure_watcher(self):
+        # Threads do not survive a fork, so each process runs its own watcher
+        if not self.watch_interval or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, name="model-watcher", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            try:
+                self.check_for_update()
+            except Exception as e:
+                print(f"Model watcher error: {e}")
+
+    def status(self):
+        return {
+            "model_path": self.model_path,
+            "version": self.version,
+            "loaded": self._predictor is not None,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "watch_interval": self.watch_interval,
+            "last_reload": self.last_reload,
+            "text_features": (self._predictor.text_featurizer.stats()
+                              if self._predictor is not None and self._predictor.vectorizer is not None else None)
+        }
+
+
+_holder = None
+_holder_lock = threading.Lock()
+
+
+def get_model_holder():
+    """The process-wide model holder"""
+    global _holder
+    if _holder is None:
+        with _holder_lock:
+            if _holder is None:
+                _holder = ModelHolder(
+                    model_path=os.environ.get('MODEL_PATH', DEFAULT_MODEL_PATH),
+                    watch_interval=float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+                )
+    return _holder
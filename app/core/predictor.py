@@ -1,8 +1,15 @@
+import os
+import json
+import hashlib
+import threading
 import joblib
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.preprocessing import LabelEncoder
 from sklearn.feature_extraction.text import CountVectorizer
+from app.core.criticality import get_policy
+from app.core.text_features import build_text_featurizer
 
 
 class EquipmentReliabilityPredictor:
@@ -19,18 +26,26 @@ class EquipmentReliabilityPredictor:
         self.model = None
         self.label_encoders = {}
         self.vectorizer = None
+        self._text_featurizer = None
+        # Artifact version (from the training artifact, else a hash of the model file)
+        self.model_version = None
         # Expected outputs: Fiabilité Intégrité, Disponibilité, Process Safety, Criticité
         self.target_columns = ["Fiabilité Intégrité", "Disponibilité", "Process Safety", "Criticité"]
         
         self._load_model_and_preprocessors()
+        if self.model_version is None:
+            self.model_version = artifact_fingerprint(self.model_path)
         self.validate_model()  # Validate model after loading
     
     def _load_model_and_preprocessors(self):
         """Load the model and fit the preprocessors"""
         try:
             print(f"Loading model from: {self.model_path}")
-            # Load model
-            loaded_obj = joblib.load(self.model_path)
+            # Load model (compiled array-backed forest directory or joblib pickle)
+            if CompiledForest.is_compiled(self.model_path):
+                loaded_obj = CompiledForest.load_with_preprocessors(self.model_path)
+            else:
+                loaded_obj = joblib.load(self.model_path)
             print(f"Loaded object type: {type(loaded_obj)}")
             
             # Check if loaded object is the actual model or a wrapper
@@ -42,6 +57,7 @@ class EquipmentReliabilityPredictor:
                 self.model = loaded_obj['model']
                 self.label_encoders = loaded_obj.get('label_encoders', {})
                 self.vectorizer = loaded_obj.get('vectorizer', None)
+                self.model_version = loaded_obj.get('version')
                 print("Model and preprocessors loaded from saved dictionary")
                 print(f"Available label encoders: {list(self.label_encoders.keys())}")
                 print(f"Vectorizer available: {self.vectorizer is not None}")
@@ -96,7 +112,9 @@ class EquipmentReliabilityPredictor:
             
             if text_desc_col:
                 print(f"Fitting vectorizer for text description column: {text_desc_col}")
-                self.vectorizer = CountVectorizer(max_features=100, stop_words='english')
+                # Vocabulary size follows the model: everything after the 3 categorical features
+                max_features = getattr(self.model, 'n_features_in_', 103) - 3
+                self.vectorizer = CountVectorizer(max_features=max_features, stop_words='english')
                 self.vectorizer.fit(df[text_desc_col].astype(str))
                 print("Vectorizer fitted successfully")
             else:
@@ -119,7 +137,7 @@ class EquipmentReliabilityPredictor:
             input_dict: Dictionary with keys: "Num_equipement", "Systeme", "Description"
             
         Returns:
-            numpy array: Preprocessed feature vector with 103 features
+            scipy.sparse CSR matrix: Preprocessed feature vector, 3 categorical + vocabulary-size text features
         """
         row = input_dict.copy()
         
@@ -150,29 +168,132 @@ class EquipmentReliabilityPredictor:
                 print(f"Warning: No encoder for {col}, using 0")
                 categorical_features.append(0)
         
-        # Vectorize the Description field for text features
+        # Vectorize the Description field for text features (kept sparse: most terms are absent)
         desc = str(row.get("Description", "unknown"))
         if self.vectorizer is not None:
-            text_features = self.vectorizer.transform([desc]).toarray()
+            text_features = self.text_featurizer.transform([desc])
         else:
             # Fallback if vectorizer not available
-            text_features = np.zeros((1, 100))
+            text_features = sp.csr_matrix((1, self._n_text_features()))
         
-        # Compose feature vector: [Num_equipement, Systeme, Description de l'équipement] + Description_vector (100)
-        # Total: 3 categorical + 100 text = 103 features
-        categorical_features = np.array([categorical_features])
-        X = np.concatenate([categorical_features, text_features], axis=1)
+        # Compose feature vector: [Num_equipement, Systeme, Description de l'équipement] + Description_vector
+        # Total: 3 categorical + vocabulary-size text features (103 for the original model)
+        categorical_features = np.array([categorical_features], dtype=float)
+        X = sp.hstack([sp.csr_matrix(categorical_features), text_features], format='csr')
         
         print(f"Feature vector shape: {X.shape}")
         print(f"Categorical features count: {len(categorical_features[0])}")
         print(f"Categorical features: {categorical_features}")
         print(f"Text features shape: {text_features.shape}")
         
-        if X.shape[1] != 103:
-            print(f"Warning: Feature vector has {X.shape[1]} features, expected 103")
+        expected = getattr(self.model, 'n_features_in_', X.shape[1])
+        if X.shape[1] != expected:
+            print(f"Warning: Feature vector has {X.shape[1]} features, expected {expected}")
         
         return X
     
+    @property
+    def text_featurizer(self):
+        """Cached/fast equivalent of self.vectorizer.transform (see app/core/text_features.py)"""
+        if self._text_featurizer is None or self._text_featurizer.vectorizer is not self.vectorizer:
+            self._text_featurizer = build_text_featurizer(self.vectorizer)
+        return self._text_featurizer
+    
+    def _n_text_features(self):
+        """Number of bag-of-words features the model expects"""
+        if self.vectorizer is not None and hasattr(self.vectorizer, 'vocabulary_'):
+            return len(self.vectorizer.vocabulary_)
+        return getattr(self.model, 'n_features_in_', 103) - 3
+    
+    def _encoder_lookup(self, col):
+        """Cached {class: code} mapping for a label encoder, for vectorized encoding"""
+        if not hasattr(self, '_encoder_lookups'):
+            self._encoder_lookups = {}
+        if col not in self._encoder_lookups:
+            le = self.label_encoders[col]
+            self._encoder_lookups[col] = {cls: code for code, cls in enumerate(le.classes_)}
+        return self._encoder_lookups[col]
+    
+    def _preprocess_frame(self, df):
+        """
+        Preprocess a DataFrame into a feature matrix, column by column
+        
+        Expected columns: "Num_equipement", "Systeme", "Description" (missing columns are treated as "unknown")
+        Same features as _preprocess_input, but encoding and vectorization run once per column
+        instead of once per row.
+        
+        Args:
+            df: pandas DataFrame with one row per equipment
+            
+        Returns:
+            scipy.sparse CSR matrix: Feature matrix of shape (len(df), 3 + vocabulary size)
+        """
+        n_rows = len(df)
+        
+        def column_as_str(name):
+            if name in df.columns:
+                return df[name].fillna("unknown").astype(str)
+            return pd.Series(["unknown"] * n_rows, index=df.index)
+        
+        descriptions = column_as_str("Description")
+        sources = {
+            "Num_equipement": column_as_str("Num_equipement"),
+            "Systeme": column_as_str("Systeme"),
+            # Map API Description to model's Description de l'équipement categorical feature
+            "Description de l'équipement": descriptions,
+        }
+        
+        categorical_features = np.zeros((n_rows, 3))
+        for i, (col, values) in enumerate(sources.items()):
+            if col in self.label_encoders:
+                encoded = values.map(self._encoder_lookup(col))
+                unseen = int(encoded.isna().sum())
+                if unseen:
+                    print(f"Warning: {unseen} unseen value(s) for {col}, using fallback 0")
+                categorical_features[:, i] = encoded.fillna(0).to_numpy()
+            else:
+                print(f"Warning: No encoder for {col}, using 0")
+        
+        if self.vectorizer is not None:
+            text_features = self.text_featurizer.transform(descriptions)
+        else:
+            # Fallback if vectorizer not available
+            text_features = sp.csr_matrix((n_rows, self._n_text_features()))
+        
+        # Stays CSR all the way into the model: sklearn forests accept sparse input
+        return sp.hstack([sp.csr_matrix(categorical_features), text_features], format='csr')
+    
+    def predict_frame(self, df, chunk_size=10000):
+        """
+        Vectorized prediction over a DataFrame
+        
+        Args:
+            df: pandas DataFrame with "Num_equipement", "Systeme", "Description" columns
+            chunk_size: Maximum rows per model.predict call, bounds the feature matrix memory
+            
+        Returns:
+            pandas.DataFrame: One column per target (Fiabilité Intégrité, Disponibilité,
+            Process Safety, Criticité), indexed like df
+        """
+        if self.model is None:
+            raise ValueError("Model is not loaded")
+        
+        if len(df) == 0:
+            return pd.DataFrame(columns=self.target_columns, index=df.index)
+        
+        raw_predictions = []
+        for start in range(0, len(df), chunk_size):
+            X = self._preprocess_frame(df.iloc[start:start + chunk_size])
+            raw_predictions.append(np.asarray(self.model.predict(X))[:, :3])
+        raw = np.vstack(raw_predictions).astype(float)
+        
+        return pd.DataFrame({
+            "Fiabilité Intégrité": raw[:, 0],
+            "Disponibilité": raw[:, 1],
+            "Process Safety": raw[:, 2],
+            "Criticité": self.calculate_criticite_array(raw[:, 0], raw[:, 1], raw[:, 2])
+        }, index=df.index)
+    
     def predict_single(self, input_dict):
         """
         Predict for a single equipment reliability assessment
@@ -243,6 +364,20 @@ class EquipmentReliabilityPredictor:
         if not input_list:
             return []
         
+        try:
+            predictions = self.predict_frame(pd.DataFrame(input_list))
+            return [
+                {
+                    "Fiabilité Intégrité": float(row[0]),
+                    "Disponibilité": float(row[1]),
+                    "Process Safety": float(row[2]),
+                    "Criticité": row[3]
+                }
+                for row in predictions[self.target_columns].itertuples(index=False)
+            ]
+        except Exception as e:
+            print(f"Vectorized batch prediction failed, falling back to row by row: {str(e)}")
+        
         results = []
         for input_dict in input_list:
             try:
@@ -255,18 +390,19 @@ class EquipmentReliabilityPredictor:
                     "Fiabilité Intégrité": 0.5,
                     "Disponibilité": 0.5,
                     "Process Safety": 0.5,
-                    "Criticité": "Moyenne"
+                    "Criticité": self.calculate_criticite(0.5, 0.5, 0.5)
                 })
         
         return results
     
-    def predict_from_file(self, file_path, output_path=None):
+    def predict_from_file(self, file_path, output_path=None, chunk_size=10000):
         """
         Predict equipment reliability from CSV or Excel file
         
         Args:
             file_path: Path to input file (CSV or Excel)
-            output_path: Optional path to save results (if None, returns DataFrame)
+            output_path: Optional path to save results (CSV, Parquet or Excel)
+            chunk_size: Rows per prediction call and per output write
             
         Returns:
             pandas.DataFrame: DataFrame with original data and predictions
@@ -279,32 +415,58 @@ class EquipmentReliabilityPredictor:
         else:
             raise ValueError("File must be CSV or Excel format")
         
-        # Fill missing values
-        df_processed = df.fillna("unknown")
-        
-        # Convert to list of dictionaries
-        input_list = df_processed.to_dict('records')
-        
-        # Make predictions
-        predictions = self.predict_batch(input_list)
+        predictions = self.predict_frame(df, chunk_size=chunk_size)
         
         # Create results DataFrame
         results_df = df.copy()
         
         # Add prediction columns
-        for i, col in enumerate(self.target_columns):
-            results_df[f'{col}_predicted'] = predictions[:, i]
+        for col in self.target_columns:
+            results_df[f'{col}_predicted'] = predictions[col].to_numpy()
+        results_df['Criticité_score_predicted'] = get_policy().score(
+            predictions["Fiabilité Intégrité"].to_numpy(),
+            predictions["Disponibilité"].to_numpy(),
+            predictions["Process Safety"].to_numpy()
+        )
         
         # Save to file if output path provided
         if output_path:
-            if output_path.endswith('.csv'):
-                results_df.to_csv(output_path, index=False)
-            elif output_path.endswith(('.xlsx', '.xls')):
-                results_df.to_excel(output_path, index=False)
-            else:
-                raise ValueError("Output file must be CSV or Excel format")
+            self.write_results(results_df, output_path, chunk_size=chunk_size)
         
         return results_df
+    
+    @staticmethod
+    def write_results(results_df, output_path, chunk_size=10000):
+        """
+        Write a results DataFrame to CSV, Parquet or Excel
+        
+        CSV is appended chunk by chunk and Parquet is written one row group per chunk,
+        so large result sets are never serialized in a single pass.
+        
+        Args:
+            results_df: DataFrame to write
+            output_path: Destination path (.csv, .parquet or .xlsx/.xls)
+            chunk_size: Rows per written chunk / row group
+        """
+        if output_path.endswith('.csv'):
+            for start in range(0, max(len(results_df), 1), chunk_size):
+                results_df.iloc[start:start + chunk_size].to_csv(
+                    output_path,
+                    index=False,
+                    mode='w' if start == 0 else 'a',
+                    header=start == 0
+                )
+        elif output_path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(results_df, preserve_index=False)
+            with pq.ParquetWriter(output_path, table.schema) as writer:
+                for batch in table.to_batches(max_chunksize=chunk_size):
+                    writer.write_batch(batch)
+        elif output_path.endswith(('.xlsx', '.xls')):
+            results_df.to_excel(output_path, index=False)
+        else:
+            raise ValueError("Output file must be CSV, Parquet or Excel format")
 
     def validate_model(self):
         """Validate that the model is properly loaded and functional"""
@@ -316,7 +478,9 @@ class EquipmentReliabilityPredictor:
         
         # Test with dummy data
         try:
-            dummy_input = np.array([[0, 0, 0] + [0] * 100])  # 3 categorical + 100 text features
+            # 3 categorical + vocabulary-size text features (100 for the original model)
+            n_features = getattr(self.model, 'n_features_in_', 103)
+            dummy_input = np.zeros((1, n_features))
             test_pred = self.model.predict(dummy_input)
             print(f"Model validation successful. Output shape: {test_pred.shape}")
             return True
@@ -335,20 +499,255 @@ class EquipmentReliabilityPredictor:
         Returns:
             str: Criticité level (Faible, Moyenne, Élevée, Critique)
         """
-        # Simple criticality calculation based on averages and thresholds
-        avg_score = (fiabilite_integrite + disponibilite + process_safety) / 3
-        
-        if avg_score >= 0.8:
-            return "Faible"
-        elif avg_score >= 0.6:
-            return "Moyenne"
-        elif avg_score >= 0.4:
-            return "Élevée"
-        else:
-            return "Critique"
+        return get_policy().classify(fiabilite_integrite, disponibilite, process_safety)
+    
+    def calculate_criticite_array(self, fiabilite_integrite, disponibilite, process_safety):
+        """
+        Vectorized calculate_criticite over arrays of scores
+        
+        Returns:
+            numpy array: Criticité level per row
+        """
+        return get_policy().classify(
+            np.asarray(fiabilite_integrite, dtype=float),
+            np.asarray(disponibilite, dtype=float),
+            np.asarray(process_safety, dtype=float)
+        )
 
 
 # Keep backward compatibility
 class AnomalyPredictor(EquipmentReliabilityPredictor):
     """Backward compatibility alias"""
     pass
+
+
+class CompiledForest:
+    """
+    Array-backed evaluator for the trained random forest(s)
+    
+    Every tree of the model is flattened into contiguous arrays (feature, threshold,
+    left/right child, leaf value) and a batch is evaluated by walking all trees for
+    all rows at once with numpy fancy indexing. Works for MultiOutputRegressor of
+    forests (one output per forest) and for native multi-output forests.
+    
+    Leaves point to themselves, so a cursor that reached its leaf stays there and
+    the walk can run several levels between checks for finished cursors.
+    
+    A compiled model is saved as a directory of .npy files plus meta.json, and
+    loaded with mmap so worker processes share the pages through the page cache.
+    """
+    
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+    META_FILE = "meta.json"
+    PREPROCESSORS_FILE = "preprocessors.joblib"
+    LEVELS_PER_CHECK = 4
+    
+    def __init__(self, feature, threshold, left, right, value, roots, groups, n_features, n_outputs,
+                 row_chunk=2048):
+        """
+        Args:
+            feature, threshold, left, right: Per-node arrays over all trees (global node ids)
+            value: Leaf values, shape (total_nodes, outputs_per_tree)
+            roots: Global node id of each tree's root
+            groups: List of (tree_start, tree_end, output_start, output_end); trees of a group are averaged
+            n_features: Expected number of input features
+            n_outputs: Number of model outputs
+            row_chunk: Rows evaluated at once (bounds the trees x rows working set)
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.groups = [tuple(int(v) for v in group) for group in groups]
+        self.n_features_in_ = int(n_features)
+        self.n_outputs = int(n_outputs)
+        self.row_chunk = row_chunk
+    
+    @classmethod
+    def from_sklearn(cls, model, quantize=False):
+        """
+        Flatten a fitted MultiOutputRegressor / RandomForestRegressor
+        
+        Args:
+            model: Fitted sklearn model
+            quantize: Store thresholds and leaf values as float32 and features as int16
+        """
+        if hasattr(model, 'estimators_') and all(hasattr(e, 'estimators_') for e in model.estimators_):
+            # MultiOutputRegressor: one forest per output
+            forests = [(forest.estimators_, i, i + 1) for i, forest in enumerate(model.estimators_)]
+            n_outputs = len(model.estimators_)
+        elif hasattr(model, 'estimators_'):
+            n_outputs = model.n_outputs_
+            forests = [(model.estimators_, 0, n_outputs)]
+        else:
+            raise ValueError(f"Unsupported model type for compilation: {type(model)}")
+        
+        features, thresholds, lefts, rights, values, roots, groups = [], [], [], [], [], [], []
+        offset, tree_index = 0, 0
+        for trees, out_start, out_end in forests:
+            groups.append((tree_index, tree_index + len(trees), out_start, out_end))
+            for estimator in trees:
+                tree = estimator.tree_
+                node_ids = np.arange(tree.node_count) + offset
+                is_leaf = tree.children_left == -1
+                features.append(np.where(is_leaf, 0, tree.feature))
+                thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+                lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+                rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+                values.append(tree.value[:, :, 0])
+                roots.append(offset)
+                offset += tree.node_count
+                tree_index += 1
+        
+        float_type = np.float32 if quantize else np.float64
+        feature_type = np.int16 if quantize and model.n_features_in_ < np.iinfo(np.int16).max else np.intp
+        return cls(
+            feature=np.concatenate(features).astype(feature_type),
+            threshold=np.concatenate(thresholds).astype(float_type),
+            # Child ids stay intp so fancy indexing does not convert them on every level
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values).astype(float_type),
+            roots=np.asarray(roots, dtype=np.intp),
+            groups=groups,
+            n_features=model.n_features_in_,
+            n_outputs=n_outputs
+        )
+    
+    def predict(self, X):
+        """Predict a batch, same output as the sklearn model's predict"""
+        n_rows = X.shape[0]
+        output = np.empty((n_rows, self.n_outputs))
+        for start in range(0, n_rows, self.row_chunk):
+            chunk = X[start:start + self.row_chunk]
+            if sp.issparse(chunk):
+                chunk = chunk.toarray()
+            # sklearn evaluates trees on float32 inputs
+            output[start:start + self.row_chunk] = self._predict_chunk(np.asarray(chunk, dtype=np.float32))
+        return output
+    
+    def _predict_chunk(self, X):
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        flat_X = np.ascontiguousarray(X).ravel()
+        
+        # One cursor per (tree, row); row_offsets index the row's first feature in flat_X
+        nodes = np.repeat(self.roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows) * n_features, n_trees)
+        active = np.arange(nodes.size)
+        
+        while active.size:
+            current = nodes[active]
+            offsets = row_offsets[active]
+            for _ in range(self.LEVELS_PER_CHECK):
+                go_left = flat_X[offsets + self.feature[current]] <= self.threshold[current]
+                current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            # Keep only the cursors that have not reached a leaf yet
+            active = active[self.left[current] != current]
+        
+        leaf_values = self.value[nodes].reshape(n_trees, n_rows, -1)
+        output = np.empty((n_rows, self.n_outputs))
+        for tree_start, tree_end, out_start, out_end in self.groups:
+            output[:, out_start:out_end] = leaf_values[tree_start:tree_end].mean(axis=0)
+        return output
+    
+    def save(self, path, preprocessors=None):
+        """
+        Save to a directory of .npy arrays plus meta.json
+        
+        Args:
+            path: Output directory
+            preprocessors: Optional dict with 'label_encoders' and 'vectorizer' to store alongside
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, self.META_FILE), 'w') as f:
+            json.dump({
+                "format": "compiled-forest-v1",
+                "groups": self.groups,
+                "n_features": self.n_features_in_,
+                "n_outputs": self.n_outputs,
+                "n_trees": int(len(self.roots)),
+                "n_nodes": int(len(self.feature))
+            }, f, indent=2)
+        if preprocessors:
+            joblib.dump(preprocessors, os.path.join(path, self.PREPROCESSORS_FILE))
+    
+    @classmethod
+    def is_compiled(cls, path):
+        return os.path.isdir(path) and os.path.exists(os.path.join(path, cls.META_FILE))
+    
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, cls.META_FILE)) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+            for name in cls.ARRAYS
+        }
+        return cls(groups=meta["groups"], n_features=meta["n_features"], n_outputs=meta["n_outputs"], **arrays)
+    
+    @classmethod
+    def load_with_preprocessors(cls, path):
+        """Load the compiled model, as a {'model', 'label_encoders', 'vectorizer'} dict when preprocessors were saved"""
+        model = cls.load(path)
+        preprocessors_path = os.path.join(path, cls.PREPROCESSORS_FILE)
+        if os.path.exists(preprocessors_path):
+            return dict(joblib.load(preprocessors_path), model=model)
+        return model
+
+
+def artifact_signature(path):
+    """Cheap change marker for a model artifact: (mtime, size) of the file, or of every file of a compiled directory"""
+    if os.path.isdir(path):
+        return tuple(sorted(
+            (name, os.stat(os.path.join(path, name)).st_mtime_ns, os.stat(os.path.join(path, name)).st_size)
+            for name in os.listdir(path)
+        ))
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def artifact_fingerprint(path):
+    """Short content hash of a model artifact, used as its version when it does not carry one"""
+    digest = hashlib.sha256()
+    files = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+    for file_path in files:
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def get_predictor():
+    """
+    Get the process-wide predictor, loading it on first use
+    
+    Returns a RemotePredictor talking to the inference server when
+    INFERENCE_SERVER_SOCKET is set, otherwise the current model of the
+    process-wide ModelHolder (see app/core/model_holder.py), which loads
+    MODEL_PATH (a joblib pickle or a compiled model directory) and swaps in
+    new versions without a restart.
+    Callers should call get_predictor() per request rather than keep the result,
+    so reloaded models are picked up.
+    """
+    global _predictor
+    socket_path = os.environ.get('INFERENCE_SERVER_SOCKET')
+    if not socket_path:
+        from app.core.model_holder import get_model_holder
+        return get_model_holder().current
+    
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                from app.core.inference_server import RemotePredictor
+                _predictor = RemotePredictor(socket_path)
+    return _predictor
@@ -0,0 +1,262 @@
+"""
+On-demand profiling of production workers, for admins.
+
+- Per-request: send ``X-Profile: 1`` (or ``?_profile=1``) with an admin token
+  and the request is profiled with cProfile (``X-Profile: pyinstrument`` uses
+  pyinstrument when it is installed). The report is saved to PROFILE_DIR and
+  its name returned in the ``X-Profile-Report`` response header.
+- Sampling: POST /api/v1/_profiles/sampler starts a statistical sampler in the
+  worker that serves the call. A background thread records the stacks of
+  every other thread each interval for N seconds, then writes a collapsed-stack
+  report (flamegraph.pl / speedscope input) to PROFILE_DIR. Overhead scales
+  with the interval rather than with the number of calls.
+
+Reports are listed and downloaded through GET /api/v1/_profiles.
+
+Configuration (environment):
+
+    PROFILING_ENABLED       'false' to ignore profiling flags (default: true)
+    PROFILE_DIR             directory for reports (default: profiles)
+    PROFILE_MAX_SECONDS     longest sampling run (default: 300)
+"""
+import cProfile
+import io
+import math
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+DEFAULT_PROFILE_DIR = 'profiles'
+DEFAULT_MAX_SECONDS = 300
+DEFAULT_INTERVAL_MS = 10
+REPORT_EXTENSIONS = ('.prof', '.txt', '.html', '.collapsed')
+
+
+def profiling_enabled():
+    return os.environ.get('PROFILING_ENABLED', 'True').lower() in ('true', '1', 't')
+
+
+def profile_dir():
+    directory = os.environ.get('PROFILE_DIR', DEFAULT_PROFILE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def report_name(kind, label):
+    """Timestamped report file stem naming the profiled endpoint and worker"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_') or 'root'
+    return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{kind}-{slug}-{os.getpid()}"
+
+
+def list_reports():
+    """Reports in PROFILE_DIR, newest first"""
+    directory = profile_dir()
+    reports = []
+    for name in os.listdir(directory):
+        if not name.endswith(REPORT_EXTENSIONS):
+            continue
+        stat = os.stat(os.path.join(directory, name))
+        reports.append({
+            "name": name,
+            "kind": name.split('-')[1] if name.count('-') >= 3 else None,
+            "size_bytes": stat.st_size,
+            "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat()
+        })
+    return sorted(reports, key=lambda r: r["created_at"], reverse=True)
+
+
+def report_path(name):
+    """Path of a report, or None if the name is not a report in PROFILE_DIR"""
+    if os.path.basename(name) != name or not name.endswith(REPORT_EXTENSIONS):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.isfile(path) else None
+
+
+class RequestProfiler:
+    """Profiles the request thread between start() and stop()"""
+
+    def __init__(self, engine='cprofile'):
+        self.engine = engine
+        if engine == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+                self._profiler = Profiler()
+            except ImportError:
+                # Fall back to the standard library profiler
+                self.engine = 'cprofile'
+        if self.engine == 'cprofile':
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if self.engine == 'cprofile':
+            self._profiler.enable()
+        else:
+            self._profiler.start()
+
+    def stop(self):
+        if self.engine == 'cprofile':
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+
+    def save(self, label, elapsed):
+        """Write the report; returns the name of the main report file"""
+        stem = os.path.join(profile_dir(), report_name('request', label))
+        if self.engine == 'pyinstrument':
+            with open(f"{stem}.html", 'w') as f:
+                f.write(self._profiler.output_html())
+            return os.path.basename(f"{stem}.html")
+
+        # Binary stats for snakeviz/pstats, and a readable summary
+        self._profiler.dump_stats(f"{stem}.prof")
+        summary = io.StringIO()
+        summary.write(f"{label}: {elapsed * 1000.0:.1f} ms\n\n")
+        pstats.Stats(self._profiler, stream=summary).sort_stats('cumulative').print_stats(60)
+        with open(f"{stem}.txt", 'w') as f:
+            f.write(summary.getvalue())
+        return os.path.basename(f"{stem}.txt")
+
+
+def _requested_engine():
+    """Profiler engine asked for by the request, or None"""
+    flag = request.headers.get('X-Profile') or request.args.get('_profile')
+    if not flag or flag.lower() in ('0', 'false', 'no'):
+        return None
+    return 'pyinstrument' if flag.lower() == 'pyinstrument' else 'cprofile'
+
+
+def _is_admin():
+    from app.models.user import User
+
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        return False
+    if identity is None:
+        return False
+    user = User.query.get(int(identity))
+    return user is not None and user.role == 'admin'
+
+
+def register_profiling(app):
+    """Profile requests flagged by an admin"""
+    if not profiling_enabled():
+        return
+
+    @app.before_request
+    def start_request_profile():
+        engine = _requested_engine()
+        if engine is None or not _is_admin():
+            return
+        profiler = RequestProfiler(engine)
+        g._profile = (profiler, time.perf_counter())
+        profiler.start()
+
+    @app.after_request
+    def finish_request_profile(response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        profiler, start = profile
+        profiler.stop()
+        label = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        try:
+            response.headers['X-Profile-Report'] = profiler.save(label, time.perf_counter() - start)
+        except Exception as e:
+            app.logger.error("Could not save profile for %s: %s", label, e)
+        return response
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling every thread's stack of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.last_run = None
+
+    @property
+    def running(self):
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds, interval_ms=DEFAULT_INTERVAL_MS, label='worker'):
+        """
+        Sample for `seconds` in a background thread of this worker
+
+        Returns:
+            dict: Sampler status ('already_running' when a run is in progress)
+        """
+        max_seconds = float(os.environ.get('PROFILE_MAX_SECONDS', DEFAULT_MAX_SECONDS))
+        # NaN passes every comparison below (and get_json accepts it)
+        if not math.isfinite(seconds) or not math.isfinite(interval_ms):
+            raise ValueError("seconds and interval_ms must be finite numbers")
+        if seconds <= 0 or seconds > max_seconds:
+            raise ValueError(f"seconds must be between 0 and {max_seconds:g}")
+        if interval_ms < 1:
+            raise ValueError("interval_ms must be at least 1")
+        with self._lock:
+            if self.running:
+                return dict(self.status(), status="already_running")
+            self._thread = threading.Thread(target=self._run, args=(seconds, interval_ms / 1000.0, label),
+                                            name="sampling-profiler", daemon=True)
+            self._pid = os.getpid()
+            self.last_run = {"status": "running", "seconds": seconds, "interval_ms": interval_ms,
+                             "started_at": datetime.utcnow().isoformat()}
+            self._thread.start()
+        return self.status()
+
+    def _run(self, seconds, interval, label):
+        me = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+            time.sleep(interval)
+
+        try:
+            path = os.path.join(profile_dir(), report_name('sample', label) + '.collapsed')
+            with open(path, 'w') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            self.last_run.update(status="completed", report=os.path.basename(path), samples=samples,
+                                 distinct_stacks=len(stacks))
+        except Exception as e:
+            self.last_run.update(status="failed", error=str(e))
+
+    def status(self):
+        return {"pid": os.getpid(), "running": self.running, "last_run": self.last_run}
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampling_profiler():
+    """The process-wide sampling profiler"""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = SamplingProfiler()
+    return _sampler
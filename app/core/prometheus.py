@@ -0,0 +1,472 @@
+"""
+Prometheus metrics for the API, the predictor, the database pool and indexing.
+
+Metrics are served in the text exposition format at GET /metrics. Under
+gunicorn every worker is a separate process, so with PROMETHEUS_MULTIPROC_DIR
+set each process writes its values to its own memory-mapped file in that
+directory and /metrics sums the files of all workers: counters and histograms
+over every process that ever wrote (so worker restarts do not reset them),
+gauges over live processes only. A process that reuses the PID of a dead one
+first retires the dead process's file, so its gauges do not come back. The
+directory must be emptied when the server starts (clear_multiprocess_files(),
+called by the on_starting hook in gunicorn.conf.py), or counters of earlier
+runs are summed forever. Without PROMETHEUS_MULTIPROC_DIR values are kept in
+process memory.
+
+Configuration (environment):
+
+    PROMETHEUS_MULTIPROC_DIR    directory for the per-process files (default: in-memory, single process)
+    METRICS_TOKEN               bearer token required by /metrics (default: none, open)
+    METRICS_ENABLED             'false' to disable collection and /metrics (default: true)
+"""
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+from app.core.database import is_memory_sqlite
+from app.core.metrics import LATENCY_BUCKETS
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_HEADER = struct.Struct('i4x')
+_LENGTH = struct.Struct('i')
+_VALUE = struct.Struct('d')
+INITIAL_FILE_SIZE = 1 << 20
+
+
+def metrics_enabled():
+    return os.environ.get('METRICS_ENABLED', 'True').lower() in ('true', '1', 't')
+
+
+class MmapValues:
+    """
+    Append-only key -> float64 file, written by one process
+
+    Layout: a 4-byte used length (plus padding), then entries of a 4-byte key
+    length, the UTF-8 key padded to 8 bytes and an 8-byte value.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        exists = os.path.exists(path)
+        self._file = open(path, 'a+b')
+        if not exists or os.path.getsize(path) < INITIAL_FILE_SIZE:
+            self._file.truncate(INITIAL_FILE_SIZE)
+        self._capacity = os.path.getsize(path)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._offsets = {}
+        self._used = _LENGTH.unpack_from(self._map, 0)[0] or _HEADER.size
+        for key, _, offset in self._read_entries(self._map, self._used):
+            self._offsets[key] = offset
+
+    @staticmethod
+    def _read_entries(buffer, used):
+        position = _HEADER.size
+        while position < used:
+            length = _LENGTH.unpack_from(buffer, position)[0]
+            key_end = position + _LENGTH.size + length
+            key = bytes(buffer[position + _LENGTH.size:key_end]).decode('utf-8')
+            offset = key_end + (-key_end % 8)
+            yield key, _VALUE.unpack_from(buffer, offset)[0], offset
+            position = offset + _VALUE.size
+
+    @classmethod
+    def read(cls, path):
+        """(key, value) pairs of a file written by any process"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            return []
+        used = _LENGTH.unpack_from(data, 0)[0]
+        return [(key, value) for key, value, _ in cls._read_entries(data, used)]
+
+    def _grow(self, needed):
+        while self._capacity < needed:
+            self._capacity *= 2
+        self._map.close()
+        self._file.truncate(self._capacity)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+
+    def _offset(self, key):
+        offset = self._offsets.get(key)
+        if offset is None:
+            encoded = key.encode('utf-8')
+            key_end = self._used + _LENGTH.size + len(encoded)
+            offset = key_end + (-key_end % 8)
+            if offset + _VALUE.size > self._capacity:
+                self._grow(offset + _VALUE.size)
+            _LENGTH.pack_into(self._map, self._used, len(encoded))
+            self._map[self._used + _LENGTH.size:key_end] = encoded
+            _VALUE.pack_into(self._map, offset, 0.0)
+            self._used = offset + _VALUE.size
+            # Publish the entry only once it is fully written
+            _LENGTH.pack_into(self._map, 0, self._used)
+            self._offsets[key] = offset
+        return offset
+
+    def get(self, key):
+        return _VALUE.unpack_from(self._map, self._offset(key))[0]
+
+    def set(self, key, value):
+        _VALUE.pack_into(self._map, self._offset(key), value)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class ValueStore:
+    """Values of this process: in memory, or in this process's file under PROMETHEUS_MULTIPROC_DIR"""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pid = None
+        self._values = None
+
+    def _ensure(self):
+        # A forked worker writes its own file, starting from zero
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f"tams_{self._pid}.db")
+                if os.path.exists(path):
+                    # Left by a dead process with the same PID: keep its counters, not its gauges
+                    os.replace(path, os.path.join(self.directory, f"tams_dead_{self._pid}_{time.time_ns()}.db"))
+                self._values = MmapValues(path)
+            else:
+                self._values = {}
+
+    def inc(self, key, amount=1.0):
+        with self._lock:
+            self._ensure()
+            if self.directory:
+                self._values.set(key, self._values.get(key) + amount)
+            else:
+                self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key, value):
+        with self._lock:
+            self._ensure()
+            if self.directory:
+                self._values.set(key, value)
+            else:
+                self._values[key] = value
+
+    def collect(self):
+        """
+        Returns:
+            list: (key, value, pid) for every process (just this one without a directory);
+                pid is None for the retired files of dead processes
+        """
+        if not self.directory:
+            with self._lock:
+                return [(key, value, os.getpid()) for key, value in (self._values or {}).items()]
+        samples = []
+        for path in glob.glob(os.path.join(self.directory, 'tams_*.db')):
+            name = os.path.basename(path)[5:-3]
+            pid = None if name.startswith('dead_') else int(name)
+            samples.extend((key, value, pid) for key, value in MmapValues.read(path))
+        return samples
+
+
+def clear_multiprocess_files(directory=None):
+    """Delete the per-process files of earlier runs; call once before the workers start"""
+    directory = directory or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not directory:
+        return 0
+    paths = glob.glob(os.path.join(directory, 'tams_*.db'))
+    for path in paths:
+        os.unlink(path)
+    return len(paths)
+
+
+def _key(metric, sample, labels):
+    return json.dumps([metric, sample, sorted(labels.items())], separators=(',', ':'))
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return {name: str(value) for name, value in labels.items()}
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1.0, **labels):
+        self.registry.store.inc(_key(self.name, self.name + '_total', self._labels(labels)), amount)
+
+
+class Gauge(_Metric):
+    """Summed over live processes"""
+    type = 'gauge'
+
+    def inc(self, amount=1.0, **labels):
+        self.registry.store.inc(_key(self.name, self.name, self._labels(labels)), amount)
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        self.registry.store.set(_key(self.name, self.name, self._labels(labels)), value)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        bound = next((b for b in self.buckets if value <= b), math.inf)
+        store = self.registry.store
+        # Buckets are stored per bound and made cumulative at exposition
+        store.inc(_key(self.name, self.name + '_bucket', dict(labels, le=_format_bound(bound))))
+        store.inc(_key(self.name, self.name + '_sum', labels), value)
+        store.inc(_key(self.name, self.name + '_count', labels))
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == math.inf else repr(float(bound))
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Registry:
+    def __init__(self, directory=None):
+        self.store = ValueStore(directory)
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def exposition(self):
+        """All metrics in the Prometheus text format"""
+        totals = {}
+        alive = {}
+        for key, value, pid in self.store.collect():
+            metric, sample, labels = json.loads(key)
+            if metric not in self.metrics:
+                continue
+            if self.metrics[metric].type == 'gauge':
+                if pid is None:
+                    continue
+                if pid not in alive:
+                    alive[pid] = _pid_alive(pid)
+                if not alive[pid]:
+                    continue
+            series = (sample, tuple(tuple(pair) for pair in labels))
+            totals.setdefault(metric, {})
+            totals[metric][series] = totals[metric].get(series, 0.0) + value
+
+        lines = []
+        for name in sorted(self.metrics):
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            samples = totals.get(name, {})
+            if metric.type == 'histogram':
+                samples = _cumulative_buckets(metric, samples)
+            for (sample, labels), value in sorted(samples.items()):
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{sample}{{{label_text}}} {_format_value(value)}" if label_text
+                             else f"{sample} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _cumulative_buckets(metric, samples):
+    """Turn per-bound bucket counts into cumulative `le` buckets, including empty ones"""
+    result = {}
+    series_labels = {labels for (sample, labels) in samples if sample == metric.name + '_count'}
+    for labels in series_labels:
+        running = 0.0
+        for bound in metric.buckets + (math.inf,):
+            le = _format_bound(bound)
+            bucket_labels = tuple(sorted(labels + (('le', le),)))
+            running += samples.get((metric.name + '_bucket', bucket_labels), 0.0)
+            result[(metric.name + '_bucket', bucket_labels)] = running
+        for suffix in ('_sum', '_count'):
+            result[(metric.name + suffix, labels)] = samples.get((metric.name + suffix, labels), 0.0)
+    return result
+
+
+registry = Registry(os.environ.get('PROMETHEUS_MULTIPROC_DIR') or None)
+
+http_requests = Counter(registry, 'tams_http_requests', 'HTTP requests by endpoint and status',
+                        ('method', 'endpoint', 'status'))
+http_request_duration = Histogram(registry, 'tams_http_request_duration_seconds',
+                                  'HTTP request latency by endpoint', ('method', 'endpoint'))
+predictions = Counter(registry, 'tams_predictions', 'Rows predicted', ('source',))
+prediction_batch_size = Histogram(registry, 'tams_prediction_batch_size', 'Rows per prediction call',
+                                  ('source',), buckets=BATCH_SIZE_BUCKETS)
+prediction_duration = Histogram(registry, 'tams_prediction_duration_seconds', 'Prediction call latency',
+                                ('source',))
+text_feature_cache = Counter(registry, 'tams_text_feature_cache_lookups',
+                             'Description featurization cache lookups', ('result',))
+import_rows = Counter(registry, 'tams_import_rows', 'Rows processed by the anomaly import', ('result',))
+import_duration = Histogram(registry, 'tams_import_duration_seconds', 'Anomaly import request duration',
+                            buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+pool_checkout_wait = Histogram(registry, 'tams_db_pool_checkout_wait_seconds',
+                               'Time spent waiting for a database connection from the pool')
+pool_checked_out = Gauge(registry, 'tams_db_pool_checked_out', 'Database connections checked out of the pool')
+pool_capacity = Gauge(registry, 'tams_db_pool_capacity', 'Pool size plus overflow of the database pools')
+pool_timeouts = Counter(registry, 'tams_db_pool_checkout_timeouts',
+                        'Checkouts that gave up waiting for a database connection (pool exhausted)')
+embedding_duration = Histogram(registry, 'tams_embedding_request_duration_seconds',
+                               'Embedding service call latency', ('operation',))
+embedding_errors = Counter(registry, 'tams_embedding_errors', 'Failed embedding service calls', ('operation',))
+
+
+def observe_prediction(source, rows, duration):
+    if not metrics_enabled():
+        return
+    predictions.inc(rows, source=source)
+    prediction_batch_size.observe(rows, source=source)
+    prediction_duration.observe(duration, source=source)
+
+
+def observe_import(successful, failed, duration):
+    if not metrics_enabled():
+        return
+    import_rows.inc(successful, result='success')
+    import_rows.inc(failed, result='failed')
+    import_duration.observe(duration)
+
+
+def observe_text_cache(hits, misses):
+    if not metrics_enabled():
+        return
+    if hits:
+        text_feature_cache.inc(hits, result='hit')
+    if misses:
+        text_feature_cache.inc(misses, result='miss')
+
+
+def observe_embedding(operation, duration, failed):
+    if not metrics_enabled():
+        return
+    embedding_duration.observe(duration, operation=operation)
+    if failed:
+        embedding_errors.inc(operation=operation)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waited for a connection, and exhaustion timeouts"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if metrics_enabled():
+            pool_capacity.inc(self.size() + max(self._max_overflow, 0))
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            if metrics_enabled():
+                pool_timeouts.inc()
+            raise
+        finally:
+            if metrics_enabled():
+                pool_checkout_wait.observe(time.perf_counter() - start)
+
+    def recreate(self):
+        # dispose() replaces the pool; the new one counts its own capacity
+        if metrics_enabled():
+            pool_capacity.dec(self.size() + max(self._max_overflow, 0))
+        return super().recreate()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_checked_out.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    pool_checked_out.dec()
+
+
+def register_metrics(app):
+    """
+    Record request metrics, time pool checkouts and serve GET /metrics
+
+    Must run before db.init_app, which creates the engines from SQLALCHEMY_ENGINE_OPTIONS.
+    """
+    if not metrics_enabled():
+        return
+
+    if not is_memory_sqlite(app.config.get('SQLALCHEMY_DATABASE_URI', '')):
+        # In-memory SQLite uses a single static connection, with no pool to wait on
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).setdefault('poolclass', TimedQueuePool)
+    for bind in app.config.get('SQLALCHEMY_BINDS', {}).values():
+        # Binds do not inherit SQLALCHEMY_ENGINE_OPTIONS
+        if isinstance(bind, dict) and not is_memory_sqlite(str(bind.get('url', ''))):
+            bind.setdefault('poolclass', TimedQueuePool)
+    if not event.contains(Pool, 'checkout', _on_checkout):
+        event.listen(Pool, 'checkout', _on_checkout)
+        event.listen(Pool, 'checkin', _on_checkin)
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('_metrics_start', None)
+        if start is None or request.endpoint == 'prometheus_metrics':
+            return response
+        endpoint = request.url_rule.rule if request.url_rule else '<unmatched>'
+        http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+        http_request_duration.observe(time.perf_counter() - start, method=request.method, endpoint=endpoint)
+        return response
+
+    @app.route('/metrics', endpoint='prometheus_metrics')
+    def prometheus_metrics():
+        token = os.environ.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            return Response("Unauthorized\n", status=401, content_type='text/plain')
+        return Response(registry.exposition(), content_type=CONTENT_TYPE)
@@ -0,0 +1,236 @@
+"""
+Incremental maintenance of the anomaly_rollups table.
+
+The dashboard charts read pre-aggregated counts keyed by (year, month,
+service, systeme, status, criticality bucket) instead of grouping the whole
+anomalies table, so their cost depends on the number of keys, not of
+anomalies.
+
+- ORM writes: an after_flush listener computes the net count change per key
+  of the anomalies inserted, updated (when a key column changed) or deleted
+  in the flush and applies them with one upsert (count = count + delta) per
+  key, in the flush's transaction.
+- Core bulk writes (synthetic data, set-based updates) call rollup_deltas()
+  and apply_deltas() themselves.
+- refresh_rollups() (``flask refresh-rollups``) rebuilds the table with a
+  single INSERT ... SELECT ... GROUP BY: once after upgrading, after changing
+  the criticality policy thresholds, or periodically from cron to correct any
+  drift from writes made outside the application. It records the thresholds
+  it used in anomaly_rollup_state.
+- The dashboard endpoints are wrapped in @current_rollups: the first request
+  of each process checks that the rollups are not empty while anomalies exist
+  and were built with the current thresholds, and otherwise rebuilds them once
+  (with a logged warning) instead of serving zeros or wrong buckets.
+
+Upserts are applied in key order so that concurrent transactions lock rollup
+rows in the same order.
+"""
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import case, delete, event, extract, func, insert, inspect, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.criticality import get_policy
+from app.core.database import serialized_writes
+from app.models import db, Anomaly
+from app.models.rollup import AnomalyRollup, AnomalyRollupState, NO_LEVEL, NO_SERVICE
+
+KEY_COLUMNS = ('year', 'month', 'service', 'systeme', 'status', 'criticality_bucket')
+KEY_ATTRIBUTES = ('date_detection', 'service', 'systeme', 'status', 'criticality_level',
+                  'user_criticality_level', 'use_user_scores')
+
+
+def criticality_bucket(score, policy=None):
+    if score is None:
+        return NO_LEVEL
+    return int((policy or get_policy()).level_index([score])[0])
+
+
+def rollup_key(values, policy=None):
+    """Rollup key of an anomaly given as a mapping of KEY_ATTRIBUTES"""
+    detected = values['date_detection']
+    if isinstance(detected, str):
+        detected = datetime.fromisoformat(detected)
+    score = values['user_criticality_level'] if values.get('use_user_scores') else values['criticality_level']
+    return (detected.year, detected.month, values['service'] or NO_SERVICE, values['systeme'],
+            values['status'] or 'open', criticality_bucket(score, policy))
+
+
+def rollup_deltas(rows, sign=1, policy=None):
+    """Count change per key for inserting (sign=1) or deleting (sign=-1) anomaly rows"""
+    policy = policy or get_policy()
+    deltas = Counter()
+    for row in rows:
+        deltas[rollup_key(row, policy)] += sign
+    return deltas
+
+
+def apply_deltas(connection, deltas):
+    """Add each delta to the count of its key, creating missing keys"""
+    rows = [dict(zip(KEY_COLUMNS, key), count=delta) for key, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    table = AnomalyRollup.__table__
+    dialect = connection.dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=list(KEY_COLUMNS),
+                                          set_={'count': table.c.count + stmt.excluded['count']})
+        connection.execute(stmt, rows)
+    elif dialect == 'mysql':
+        stmt = mysql.insert(table)
+        connection.execute(stmt.on_duplicate_key_update(count=table.c.count + stmt.inserted['count']), rows)
+    else:
+        # No portable upsert: update, then insert the keys that did not exist
+        for row in rows:
+            key = [table.c[column] == row[column] for column in KEY_COLUMNS]
+            if connection.execute(update(table).where(*key).values(count=table.c.count + row['count'])).rowcount == 0:
+                connection.execute(insert(table), row)
+
+
+def _attribute_values(state, old):
+    """KEY_ATTRIBUTES of an instance, before (old=True) or after the pending changes"""
+    values = {}
+    for name in KEY_ATTRIBUTES:
+        attribute = state.attrs[name]
+        history = attribute.history
+        values[name] = history.deleted[0] if old and history.deleted else attribute.value
+    return values
+
+
+def _after_flush(session, flush_context):
+    policy = None
+    deltas = Counter()
+    for instance in session.new:
+        if isinstance(instance, Anomaly):
+            policy = policy or get_policy()
+            deltas[rollup_key(_attribute_values(inspect(instance), old=False), policy)] += 1
+    for instance in session.dirty:
+        if isinstance(instance, Anomaly) and session.is_modified(instance):
+            policy = policy or get_policy()
+            state = inspect(instance)
+            before = rollup_key(_attribute_values(state, old=True), policy)
+            after = rollup_key(_attribute_values(state, old=False), policy)
+            if before != after:
+                deltas[before] -= 1
+                deltas[after] += 1
+    for instance in session.deleted:
+        if isinstance(instance, Anomaly):
+            policy = policy or get_policy()
+            deltas[rollup_key(_attribute_values(inspect(instance), old=True), policy)] -= 1
+
+    if any(deltas.values()):
+        apply_deltas(session.connection(bind_arguments={'mapper': AnomalyRollup}), deltas)
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+def register_rollup_listeners():
+    """Keep the rollups in step with ORM writes of every session; registers once per process"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        # Assigning an expired key attribute (e.g. after a commit) must load the previous
+        # value, or the flush could not tell which rollup key the anomaly leaves
+        for name in KEY_ATTRIBUTES:
+            event.listen(getattr(Anomaly, name), 'set', _load_previous_value, active_history=True, retval=True)
+
+
+def refresh_rollups(connection, policy=None):
+    """
+    Rebuild the rollups from the anomalies table
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    policy = policy or get_policy()
+    active = case((Anomaly.use_user_scores == True, Anomaly.user_criticality_level),
+                  else_=Anomaly.criticality_level)
+    year = extract('year', Anomaly.date_detection)
+    month = extract('month', Anomaly.date_detection)
+    service = func.coalesce(Anomaly.service, NO_SERVICE)
+    bucket = case((active.is_(None), NO_LEVEL), else_=policy.sql_level_index(active))
+
+    query = select(year, month, service, Anomaly.systeme, Anomaly.status, bucket, func.count(Anomaly.id))\
+        .group_by(year, month, service, Anomaly.systeme, Anomaly.status, bucket)
+
+    table = AnomalyRollup.__table__
+    connection.execute(delete(table))
+    connection.execute(insert(table).from_select(list(KEY_COLUMNS) + ['count'], query))
+    _record_state(connection, policy)
+    return connection.execute(select(func.count()).select_from(table)).scalar()
+
+
+def thresholds_signature(policy=None):
+    """The criticality thresholds the buckets depend on, as stored in anomaly_rollup_state"""
+    return ','.join(repr(float(t)) for t in (policy or get_policy()).thresholds)
+
+
+def _record_state(connection, policy=None):
+    state = AnomalyRollupState.__table__
+    connection.execute(delete(state))
+    connection.execute(insert(state).values(id=1, thresholds=thresholds_signature(policy),
+                                            refreshed_at=datetime.utcnow()))
+
+
+def stale_reason(connection, policy=None):
+    """Why the rollups cannot be served as they are, or None when they can"""
+    recorded = connection.execute(select(AnomalyRollupState.thresholds).where(AnomalyRollupState.id == 1)).scalar()
+    if recorded is not None and recorded != thresholds_signature(policy):
+        return f"built with criticality thresholds {recorded}, the policy now uses {thresholds_signature(policy)}"
+    if connection.execute(select(AnomalyRollup.id).limit(1)).first() is None \
+            and connection.execute(select(Anomaly.id).limit(1)).first() is not None:
+        return "the rollup table is empty but anomalies exist"
+    return None
+
+
+_verified = set()
+_verify_lock = threading.Lock()
+
+
+def ensure_rollups(engine, policy=None):
+    """
+    Rebuild the rollups if they are stale; checked once per process, engine and thresholds
+
+    Returns:
+        str: Why the rollups were rebuilt, or None
+    """
+    key = (engine.url.render_as_string(hide_password=True), thresholds_signature(policy))
+    if key in _verified:
+        return None
+    with _verify_lock:
+        if key in _verified:
+            return None
+        # Databases upgraded without `flask refresh-rollups --create-tables` lack the tables
+        AnomalyRollup.__table__.create(engine, checkfirst=True)
+        AnomalyRollupState.__table__.create(engine, checkfirst=True)
+        with serialized_writes(engine), engine.begin() as connection:
+            reason = stale_reason(connection, policy)
+            if reason is not None:
+                refresh_rollups(connection, policy)
+            elif connection.execute(select(AnomalyRollupState.id)).first() is None:
+                # Maintained incrementally since they were created with the current thresholds
+                _record_state(connection, policy)
+        _verified.add(key)
+        return reason
+
+
+def current_rollups(f):
+    """Decorator for endpoints reading the rollups: rebuilds stale rollups before the first read"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            reason = ensure_rollups(db.engine)
+            if reason is not None:
+                current_app.logger.warning(f"Dashboard rollups were stale ({reason}); rebuilt them")
+        except Exception as e:
+            current_app.logger.error(f"Could not check the dashboard rollups: {e}")
+        return f(*args, **kwargs)
+    return decorated
@@ -0,0 +1,228 @@
+"""
+Shadow evaluation of a candidate model on live prediction traffic.
+
+When SHADOW_MODEL_PATH is set, a sampled fraction of predict_single /
+predict_batch calls is replayed against the shadow model in a background
+thread pool, after the primary prediction has been returned to the caller.
+Latencies are comparable: both models are timed there with the same
+predict_frame call on the sampled rows (the primary model is re-run for it).
+Per-target divergence (mean and max absolute difference), criticality
+agreement and the latency of both models are written to the
+shadow_prediction_metrics table and summarized by GET /api/v1/model/shadow.
+
+Configuration (environment):
+
+    SHADOW_MODEL_PATH       candidate model artifact; enables shadowing
+    SHADOW_SAMPLE_RATE      fraction of calls replayed (default: 0.1)
+    SHADOW_WORKERS          background threads (default: 1)
+    SHADOW_MAX_PENDING      queued evaluations before samples are dropped (default: 100)
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from flask import current_app, has_app_context
+
+from app.core.instrumentation import span
+from app.core.predictor import EquipmentReliabilityPredictor
+from app.core.prometheus import observe_prediction
+from app.models import db
+from app.models.shadow import ShadowPredictionMetric
+
+SCORE_COLUMNS = ["Fiabilité Intégrité", "Disponibilité", "Process Safety"]
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_WORKERS = 1
+DEFAULT_MAX_PENDING = 100
+
+
+class ShadowEvaluator:
+    def __init__(self, model_path, sample_rate=DEFAULT_SAMPLE_RATE, workers=DEFAULT_WORKERS,
+                 max_pending=DEFAULT_MAX_PENDING, factory=EquipmentReliabilityPredictor):
+        """
+        Args:
+            model_path: Shadow model artifact, loaded in the background on first use
+            sample_rate: Fraction of calls replayed against the shadow model
+            workers: Background threads running the shadow model
+            max_pending: Evaluations queued before new samples are dropped
+            factory: Callable(model_path=...) returning the shadow predictor
+        """
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.workers = workers
+        self.max_pending = max_pending
+        self.factory = factory
+
+        self._predictor = None
+        self._load_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.pending = 0
+        self.sampled = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def _ensure_executor(self):
+        # Thread pools do not survive a fork, so create one per process
+        if self._pid != os.getpid():
+            with self._executor_lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix="shadow-model")
+                    self._pid = os.getpid()
+                    self.pending = 0
+        return self._executor
+
+    @property
+    def predictor(self):
+        if self._predictor is None:
+            with self._load_lock:
+                if self._predictor is None:
+                    self._predictor = self.factory(model_path=self.model_path)
+        return self._predictor
+
+    def observe(self, source, inputs, predictions, primary):
+        """
+        Sample a primary prediction for shadow evaluation; never blocks or raises
+
+        Args:
+            source: 'single' or 'batch'
+            inputs: List of input dictionaries
+            predictions: List of primary prediction dictionaries, aligned with inputs
+            primary: Predictor that made the primary predictions
+        """
+        if not inputs or random.random() >= self.sample_rate:
+            return
+        app = current_app._get_current_object() if has_app_context() else None
+        if app is None:
+            return
+
+        executor = self._ensure_executor()
+        with self._counter_lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return
+            self.pending += 1
+            self.sampled += 1
+
+        executor.submit(self._evaluate, app, source, list(inputs), list(predictions), primary)
+
+    @staticmethod
+    def _timed_predict_frame(predictor, frame):
+        start = time.perf_counter()
+        result = predictor.predict_frame(frame)
+        return result, time.perf_counter() - start
+
+    def _evaluate(self, app, source, inputs, predictions, primary_predictor):
+        try:
+            predictor = self.predictor
+            frame = pd.DataFrame(inputs)
+            # Time both models with the same call on the same rows; the request's own latency
+            # also covers queueing, micro-batching and logging
+            _, primary_latency = self._timed_predict_frame(primary_predictor, frame)
+            shadow, shadow_latency = self._timed_predict_frame(predictor, frame)
+
+            primary = pd.DataFrame(predictions)
+            diffs = {col: np.abs(primary[col].to_numpy(dtype=float) - shadow[col].to_numpy(dtype=float))
+                     for col in SCORE_COLUMNS}
+            agreement = float(np.mean(primary["Criticité"].to_numpy() == shadow["Criticité"].to_numpy()))
+
+            with app.app_context():
+                db.session.add(ShadowPredictionMetric(
+                    source=source,
+                    rows=len(inputs),
+                    primary_version=primary_predictor.model_version,
+                    shadow_version=predictor.model_version,
+                    primary_latency_ms=primary_latency * 1000.0,
+                    shadow_latency_ms=shadow_latency * 1000.0,
+                    fiabilite_integrite_diff=float(diffs["Fiabilité Intégrité"].mean()),
+                    disponibilite_diff=float(diffs["Disponibilité"].mean()),
+                    process_safety_diff=float(diffs["Process Safety"].mean()),
+                    max_abs_diff=float(max(diff.max() for diff in diffs.values())),
+                    criticality_agreement=agreement
+                ))
+                db.session.commit()
+        except Exception as e:
+            with self._counter_lock:
+                self.errors += 1
+            print(f"Shadow evaluation failed: {str(e)}")
+        finally:
+            with self._counter_lock:
+                self.pending -= 1
+
+    def stats(self):
+        return {
+            "model_path": self.model_path,
+            "model_version": self._predictor.model_version if self._predictor is not None else None,
+            "sample_rate": self.sample_rate,
+            "pending": self.pending,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
+
+
+def shadow_enabled():
+    return bool(os.environ.get('SHADOW_MODEL_PATH'))
+
+
+_evaluator = None
+_evaluator_lock = threading.Lock()
+
+
+def get_shadow_evaluator():
+    """The process-wide shadow evaluator, or None when SHADOW_MODEL_PATH is not set"""
+    global _evaluator
+    if not shadow_enabled():
+        return None
+    if _evaluator is None:
+        with _evaluator_lock:
+            if _evaluator is None:
+                _evaluator = ShadowEvaluator(
+                    os.environ['SHADOW_MODEL_PATH'],
+                    sample_rate=float(os.environ.get('SHADOW_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)),
+                    workers=int(os.environ.get('SHADOW_WORKERS', DEFAULT_WORKERS)),
+                    max_pending=int(os.environ.get('SHADOW_MAX_PENDING', DEFAULT_MAX_PENDING))
+                )
+    return _evaluator
+
+
+def shadowed(source, inputs, predict):
+    """
+    Run the primary prediction and hand a sample of it to the shadow model
+
+    Args:
+        source: 'single' or 'batch'
+        inputs: List of input dictionaries
+        predict: Zero-argument callable running the primary prediction and returning
+            (prediction, predictor that made it); the prediction is a dictionary for
+            'single', a list of them for 'batch'
+
+    Returns:
+        tuple: The primary prediction, unchanged, and the predictor that made it
+    """
+    start = time.perf_counter()
+    with span('predict'):
+        result, predictor = predict()
+    latency = time.perf_counter() - start
+    observe_prediction(source, len(inputs), latency)
+    evaluator = get_shadow_evaluator()
+    if evaluator is not None:
+        predictions = result if isinstance(result, list) else [result]
+        evaluator.observe(source, inputs, predictions, predictor)
+    return result, predictor
+
+
+def shadowed_predict_single(predictor, input_dict):
+    """predictor.predict_single, sampled for shadow evaluation"""
+    return shadowed('single', [input_dict], lambda: (predictor.predict_single(input_dict), predictor))[0]
+
+
+def shadowed_predict_batch(predictor, input_list):
+    """predictor.predict_batch, sampled for shadow evaluation"""
+    return shadowed('batch', input_list, lambda: (predictor.predict_batch(input_list), predictor))[0]
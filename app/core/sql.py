@@ -0,0 +1,127 @@
+"""
+Dialect-portable SQL expressions.
+
+Each construct compiles to the native date arithmetic or truncation of the
+database in use (SQLite, PostgreSQL, MySQL), so queries stay in SQL and can
+use indexes instead of pulling rows into Python.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+SECONDS_PER_DAY = 86400.0
+
+
+class days_between(FunctionElement):
+    """Fractional days from the `start` to the `end` timestamp: days_between(end, start)"""
+    type = Float()
+    inherit_cache = True
+    name = 'days_between'
+
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return (f"(EXTRACT(EPOCH FROM ({compiler.process(end, **kw)} - {compiler.process(start, **kw)}))"
+            f" / {SECONDS_PER_DAY})")
+
+
+@compiles(days_between, 'sqlite')
+def _days_between_sqlite(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return f"(julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)}))"
+
+
+@compiles(days_between, 'mysql')
+def _days_between_mysql(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return (f"(TIMESTAMPDIFF(SECOND, {compiler.process(start, **kw)}, {compiler.process(end, **kw)})"
+            f" / {SECONDS_PER_DAY})")
+
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter')
+
+
+class date_bucket(FunctionElement):
+    """
+    Start of the day, week (Monday), month or quarter of a timestamp: date_bucket('month', column)
+
+    PostgreSQL returns a timestamp, SQLite and MySQL a date string or date; normalize
+    the values with as_date().
+    """
+    inherit_cache = True
+    name = 'date_bucket'
+    # The granularity changes the SQL, so it is part of the statement cache key
+    _traverse_internals = FunctionElement._traverse_internals + [('granularity', InternalTraversal.dp_string)]
+
+    def __init__(self, granularity, column, **kwargs):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity {granularity!r}, expected one of {', '.join(GRANULARITIES)}")
+        self.granularity = granularity
+        super().__init__(column, **kwargs)
+
+
+@compiles(date_bucket)
+def _date_bucket_default(element, compiler, **kw):
+    column = compiler.process(list(element.clauses)[0], **kw)
+    return f"date_trunc('{element.granularity}', {column})"
+
+
+@compiles(date_bucket, 'sqlite')
+def _date_bucket_sqlite(element, compiler, **kw):
+    column = compiler.process(list(element.clauses)[0], **kw)
+    if element.granularity == 'day':
+        return f"date({column})"
+    if element.granularity == 'week':
+        # strftime('%w') is 0 for Sunday; weeks start on Monday as in date_trunc
+        return f"date({column}, '-' || ((CAST(strftime('%w', {column}) AS INTEGER) + 6) % 7) || ' days')"
+    if element.granularity == 'month':
+        return f"strftime('%Y-%m-01', {column})"
+    return (f"printf('%s-%02d-01', strftime('%Y', {column}), "
+            f"((CAST(strftime('%m', {column}) AS INTEGER) - 1) / 3) * 3 + 1)")
+
+
+@compiles(date_bucket, 'mysql')
+def _date_bucket_mysql(element, compiler, **kw):
+    column = compiler.process(list(element.clauses)[0], **kw)
+    if element.granularity == 'day':
+        return f"DATE({column})"
+    if element.granularity == 'week':
+        return f"DATE_SUB(DATE({column}), INTERVAL WEEKDAY({column}) DAY)"
+    if element.granularity == 'month':
+        return f"DATE_FORMAT({column}, '%%Y-%%m-01')"
+    return f"(MAKEDATE(YEAR({column}), 1) + INTERVAL (QUARTER({column}) - 1) QUARTER)"
+
+
+def as_date(value):
+    """date of a date_bucket() result"""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def truncate_date(value, granularity):
+    """Python counterpart of date_bucket()"""
+    value = value.date() if isinstance(value, datetime) else value
+    if granularity == 'day':
+        return value
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    return value.replace(month=(value.month - 1) // 3 * 3 + 1, day=1)
+
+
+def next_period(start, granularity):
+    """Start of the period after the one starting at `start`"""
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    months = start.year * 12 + start.month - 1 + (1 if granularity == 'month' else 3)
+    return date(months // 12, months % 12 + 1, 1)
@@ -0,0 +1,425 @@
+"""
+Synthetic anomalies, maintenance windows, action plans and action items for
+load testing at production scale.
+
+Rows are generated with numpy in chunks and written with one executemany
+insert per table per chunk. Chunks are independent (ids are derived from the
+row position, not from the database), so they are generated and written in
+parallel worker processes, each with its own connection. Each chunk adds its
+counts to the dashboard rollups and the status history of its anomalies
+(open -> in_progress -> resolved/closed) in the same transaction. SQLite serializes the
+writes but the workers still generate in parallel; an in-memory SQLite
+database is filled from the calling process.
+
+Distributions:
+
+- equipment: Zipf-like, a few hundred pieces of equipment account for most anomalies;
+  each piece of equipment belongs to one system, each system to one service
+- descriptions: defect / component / location / qualifier drawn from a maintenance
+  vocabulary with Zipf-weighted terms
+- detection dates: spread over ``years`` with volume growing towards the present
+- status: older anomalies are more likely resolved or closed
+- scores: gamma distributed, with a small share of user overrides
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, func, select, text
+
+from app.models import Anomaly, AnomalyStatusEvent, MaintenanceWindow, ActionPlan, ActionItem
+from app.core.rollups import apply_deltas, rollup_deltas
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_EQUIPMENT = 5000
+DEFAULT_SYSTEMS = 40
+DEFAULT_PLAN_RATIO = 0.3
+DEFAULT_ITEMS_PER_PLAN = 3.0
+DEFAULT_YEARS = 3
+
+DEFECTS = ["fuite", "vibration", "surchauffe", "bruit anormal", "corrosion", "fissure", "usure",
+           "blocage", "défaut isolement", "perte de pression", "encrassement", "desserrage",
+           "alarme intempestive", "déréglage", "colmatage", "court-circuit"]
+COMPONENTS = ["vanne", "pompe", "moteur", "roulement", "joint", "garniture mécanique", "échangeur",
+              "ventilateur", "courroie", "capteur", "transmetteur", "disjoncteur", "câble", "bride",
+              "soupape", "réducteur", "accouplement", "filtre", "clapet", "compresseur"]
+LOCATIONS = ["côté refoulement", "côté aspiration", "palier avant", "palier arrière", "ligne vapeur",
+             "circuit huile", "circuit eau de refroidissement", "armoire électrique", "skid", "collecteur"]
+QUALIFIERS = ["", "", "", "intermittent", "récurrent", "à surveiller", "constaté en ronde",
+              "après redémarrage", "depuis arrêt"]
+SERVICES = ["Mécanique", "Électrique", "Instrumentation", "Contrôle", "Production", "Chaudière", "Turbine"]
+SECTIONS = ["34MC", "34EL", "34CT", "34MM", "34MD"]
+ORIGINS = ["inspection", "maintenance", "operation", "audit"]
+ORIGIN_WEIGHTS = [0.4, 0.3, 0.25, 0.05]
+WINDOW_TYPES = ["planned", "routine", "emergency"]
+WINDOW_TYPE_WEIGHTS = [0.5, 0.35, 0.15]
+ACTIONS = ["Remplacer", "Resserrer", "Nettoyer", "Contrôler", "Graisser", "Réaligner", "Calibrer",
+           "Souder", "Inspecter", "Remettre en état"]
+PRIORITIES = ["low", "medium", "high", "critical"]
+RESOURCES = ["Équipe mécanique", "Équipe électrique", "Équipe instrumentation", "Atelier central"]
+CONTRACTORS = [None, None, None, "Sous-traitant A", "Sous-traitant B"]
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+def _zipf_weights(n, exponent=1.1):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _choice(rng, values, size, p=None):
+    return [values[i] for i in rng.choice(len(values), size=size, p=p)]
+
+
+def _descriptions(rng, n):
+    defects = _choice(rng, DEFECTS, n, _zipf_weights(len(DEFECTS)))
+    components = _choice(rng, COMPONENTS, n, _zipf_weights(len(COMPONENTS)))
+    locations = _choice(rng, LOCATIONS, n)
+    qualifiers = _choice(rng, QUALIFIERS, n)
+    return [f"{defect} {component} {location} {qualifier}".rstrip()
+            for defect, component, location, qualifier
+            in zip(defects, components, locations, qualifiers)]
+
+
+def _datetimes(epoch, seconds):
+    """Python datetimes for an array of seconds since epoch"""
+    return (np.datetime64(epoch, 's') + np.asarray(seconds, dtype=np.int64).astype('timedelta64[s]')).tolist()
+
+
+class DatasetSpec:
+    """Sizes and distribution parameters shared by every chunk"""
+
+    def __init__(self, anomalies, windows=None, plan_ratio=DEFAULT_PLAN_RATIO,
+                 items_per_plan=DEFAULT_ITEMS_PER_PLAN, equipment=DEFAULT_EQUIPMENT,
+                 systems=DEFAULT_SYSTEMS, years=DEFAULT_YEARS, seed=0, now=None):
+        self.anomalies = anomalies
+        self.windows = windows if windows is not None else max(1, anomalies // 1000)
+        self.plan_ratio = plan_ratio
+        self.items_per_plan = items_per_plan
+        self.equipment = equipment
+        self.systems = systems
+        self.years = years
+        self.seed = seed
+        self.now = (now or datetime.utcnow()).replace(microsecond=0)
+        self.start = self.now - timedelta(days=365 * years)
+
+        # First ids, set from the current table contents before writing
+        self.anomaly_id_start = 1
+        self.window_id_start = 1
+        self.plan_id_start = 1
+        self.user_ids = [None]
+
+    def equipment_tables(self):
+        """Per-equipment system and per-system service, identical in every worker"""
+        rng = np.random.default_rng(self.seed)
+        equipment_system = rng.integers(0, self.systems, size=self.equipment)
+        system_service = rng.integers(0, len(SERVICES), size=self.systems)
+        return equipment_system, system_service
+
+
+def window_rows(spec):
+    rng = np.random.default_rng([spec.seed, 1])
+    n = spec.windows
+    span = (spec.now - spec.start).total_seconds() + 180 * SECONDS_PER_DAY
+    starts = rng.uniform(0, span, size=n).astype(np.int64)
+    durations = rng.integers(1, 15, size=n)
+    ends = starts + durations * SECONDS_PER_DAY
+    now = int((spec.now - spec.start).total_seconds())
+
+    status = np.where(ends < now, 'completed', np.where(starts <= now, 'in_progress', 'scheduled'))
+    cancelled = rng.random(n) < 0.05
+    status = np.where(cancelled & (status != 'in_progress'), 'cancelled', status).tolist()
+
+    start_dates, end_dates = _datetimes(spec.start, starts), _datetimes(spec.start, ends)
+    created = _datetimes(spec.start, np.maximum(starts - rng.integers(1, 60, size=n) * SECONDS_PER_DAY, 0))
+    types = _choice(rng, WINDOW_TYPES, n, WINDOW_TYPE_WEIGHTS)
+    users = _choice(rng, spec.user_ids, n)
+    durations = durations.tolist()
+    return [
+        {
+            "id": spec.window_id_start + i,
+            "type": types[i],
+            "duration_days": durations[i],
+            "start_date": start_dates[i],
+            "end_date": end_dates[i],
+            "description": f"Arrêt {types[i]} {start_dates[i]:%Y-%m}",
+            "status": status[i],
+            "created_by_user_id": users[i],
+            "created_at": created[i],
+            "updated_at": created[i]
+        }
+        for i in range(n)
+    ]
+
+
+def chunk_rows(spec, offset, n):
+    """
+    Anomalies offset..offset+n with their action plans and action items
+
+    Returns:
+        tuple: (anomaly rows, action plan rows, action item rows)
+    """
+    rng = np.random.default_rng([spec.seed, 2, offset])
+    equipment_system, system_service = spec.equipment_tables()
+
+    # Equipment popularity follows a Zipf-like law
+    equipment = rng.choice(spec.equipment, size=n, p=_zipf_weights(spec.equipment))
+    systems = equipment_system[equipment]
+    services = system_service[systems].tolist()
+    equipment, systems = equipment.tolist(), systems.tolist()
+
+    # Volume grows towards the present
+    span = int((spec.now - spec.start).total_seconds())
+    detected = (np.sqrt(rng.random(n)) * span).astype(np.int64)
+    age_days = (span - detected) / SECONDS_PER_DAY
+
+    # Older anomalies are more likely to be resolved or closed
+    done = rng.random(n) < 1.0 - np.exp(-age_days / 45.0)
+    closed = done & (age_days > 90) & (rng.random(n) < 0.7)
+    in_progress = ~done & (rng.random(n) < 0.35)
+    status = np.where(closed, 'closed', np.where(done, 'resolved',
+                      np.where(in_progress, 'in_progress', 'open'))).tolist()
+    resolution = np.minimum(rng.lognormal(np.log(15 * SECONDS_PER_DAY), 0.8, size=n).astype(np.int64),
+                            span - detected)
+    created = detected + rng.integers(0, 2 * 3600, size=n)
+    updated = np.where(done, np.maximum(detected + resolution, created), created)
+
+    scores = np.round(np.clip(rng.gamma(2.0, 0.8, size=(n, 3)), 0, 5), 2)
+    criticality = scores.sum(axis=1)
+    override = rng.random(n) < 0.05
+    user_scores = np.round(np.clip(scores + rng.normal(0, 0.5, size=(n, 3)), 0, 5), 2)
+    user_criticality = user_scores.sum(axis=1)
+    fiabilite, disponibilite, process_safety = scores.T.tolist()
+    user_fiabilite, user_disponibilite, user_process_safety = user_scores.T.tolist()
+    criticality, user_criticality, override = criticality.tolist(), user_criticality.tolist(), override.tolist()
+
+    has_window = (rng.random(n) < 0.2).tolist()
+    windows = (spec.window_id_start + rng.integers(0, spec.windows, size=n)).tolist()
+    approved = (np.array(status) != 'open') | (rng.random(n) < 0.3)
+    approved = approved.tolist()
+
+    descriptions = _descriptions(rng, n)
+    sections = _choice(rng, SECTIONS, n)
+    origins = _choice(rng, ORIGINS, n, ORIGIN_WEIGHTS)
+    users = _choice(rng, spec.user_ids, n)
+    detected_at, created_at, updated_at = (_datetimes(spec.start, detected), _datetimes(spec.start, created),
+                                           _datetimes(spec.start, updated))
+
+    anomalies = []
+    for i in range(n):
+        anomaly_id = spec.anomaly_id_start + offset + i
+        description = descriptions[i]
+        anomalies.append({
+            "id": anomaly_id,
+            "title": f"{description[:60]} - EQ-{equipment[i]:05d}",
+            "description": description,
+            "num_equipement": f"EQ-{equipment[i]:05d}",
+            "systeme": f"SYS-{systems[i]:03d}",
+            "service": SERVICES[services[i]],
+            "status": status[i],
+            "origin_source": origins[i],
+            "date_detection": detected_at[i],
+            "description_equipement": f"Équipement {equipment[i]:05d}",
+            "section_proprietaire": sections[i],
+            "fiabilite_score": fiabilite[i],
+            "integrite_score": fiabilite[i],
+            "disponibilite_score": disponibilite[i],
+            "process_safety_score": process_safety[i],
+            "criticality_level": criticality[i],
+            "user_fiabilite_score": user_fiabilite[i] if override[i] else None,
+            "user_integrite_score": user_fiabilite[i] if override[i] else None,
+            "user_disponibilite_score": user_disponibilite[i] if override[i] else None,
+            "user_process_safety_score": user_process_safety[i] if override[i] else None,
+            "user_criticality_level": user_criticality[i] if override[i] else None,
+            "use_user_scores": override[i],
+            "maintenance_window_id": windows[i] if has_window[i] else None,
+            "is_approved": approved[i],
+            "approved_at": updated_at[i] if approved[i] else None,
+            "created_by_user_id": users[i],
+            "created_at": created_at[i],
+            "updated_at": updated_at[i]
+        })
+
+    plans, items = _plan_rows(spec, rng, offset, n, status, created_at, users)
+    return anomalies, plans, items
+
+
+def _plan_rows(spec, rng, offset, n, status, created_at, users):
+    """Action plans for a share of the chunk's anomalies, and their items"""
+    positions = np.flatnonzero(rng.random(n) < spec.plan_ratio).tolist()
+    if not positions:
+        return [], []
+    plan_status = {'open': 'draft', 'in_progress': 'in_progress', 'resolved': 'completed', 'closed': 'completed'}
+    item_status = {'draft': 'pending', 'approved': 'pending', 'in_progress': 'in_progress', 'completed': 'completed'}
+
+    m = len(positions)
+    item_counts = np.maximum(1, rng.poisson(spec.items_per_plan, size=m))
+    needs_outage = (rng.random(m) < 0.4).tolist()
+    priorities = _choice(rng, PRIORITIES, m, [0.3, 0.4, 0.2, 0.1])
+    hours = np.round(rng.gamma(2.0, 4.0, size=int(item_counts.sum())), 1).tolist()
+    actions = _choice(rng, ACTIONS, len(hours))
+    components = _choice(rng, COMPONENTS, len(hours))
+    resources = _choice(rng, RESOURCES, len(hours))
+    contractors = _choice(rng, CONTRACTORS, len(hours))
+    parts = (rng.random(len(hours)) < 0.8).tolist()
+    item_counts = item_counts.tolist()
+
+    plans, items = [], []
+    k = 0
+    for j, i in enumerate(positions):
+        # Plan ids follow the anomaly position, so chunks never collide
+        plan_id = spec.plan_id_start + offset + i
+        state = plan_status[status[i]]
+        if state == 'draft' and needs_outage[j]:
+            state = 'approved'
+        plan_hours = hours[k:k + item_counts[j]]
+        plans.append({
+            "id": plan_id,
+            "anomaly_id": spec.anomaly_id_start + offset + i,
+            "needs_outage": needs_outage[j],
+            "outage_type": "planned" if needs_outage[j] else None,
+            "outage_duration": int(sum(plan_hours)) + 1 if needs_outage[j] else None,
+            "total_duration_hours": round(sum(plan_hours), 1),
+            "total_duration_days": round(sum(plan_hours) / 8.0, 2),
+            "priority": priorities[j],
+            "status": state,
+            "created_by_user_id": users[i],
+            "created_at": created_at[i],
+            "updated_at": created_at[i]
+        })
+        for _ in range(item_counts[j]):
+            items.append({
+                "action_plan_id": plan_id,
+                "action": f"{actions[k]} {components[k]}",
+                "responsable": resources[k],
+                "pdrs_disponible": parts[k],
+                "ressources_internes": resources[k],
+                "ressources_externes": contractors[k],
+                "statut": item_status[state],
+                "duree_heures": hours[k],
+                "duree_jours": round(hours[k] / 8.0, 2),
+                "created_by_user_id": users[i],
+                "created_at": created_at[i],
+                "updated_at": created_at[i]
+            })
+            k += 1
+    return plans, items
+
+
+def status_event_rows(anomalies):
+    """Status history leading to each anomaly's status: work starts at creation, ends at the last update"""
+    events = []
+    for anomaly in anomalies:
+        if anomaly["status"] == 'open':
+            continue
+        events.append({"anomaly_id": anomaly["id"], "from_status": 'open', "to_status": 'in_progress',
+                       "user_id": anomaly["created_by_user_id"], "created_at": anomaly["created_at"]})
+        if anomaly["status"] != 'in_progress':
+            events.append({"anomaly_id": anomaly["id"], "from_status": 'in_progress', "to_status": anomaly["status"],
+                           "user_id": anomaly["created_by_user_id"], "created_at": anomaly["updated_at"]})
+    return events
+
+
+def write_chunk(connection, spec, offset, n):
+    """Generate and insert one chunk; returns the row counts per table"""
+    anomalies, plans, items = chunk_rows(spec, offset, n)
+    connection.execute(Anomaly.__table__.insert(), anomalies)
+    apply_deltas(connection, rollup_deltas(anomalies))
+    events = status_event_rows(anomalies)
+    if events:
+        connection.execute(AnomalyStatusEvent.__table__.insert(), events)
+    if plans:
+        connection.execute(ActionPlan.__table__.insert(), plans)
+        connection.execute(ActionItem.__table__.insert(), items)
+    return {"anomalies": len(anomalies), "status_events": len(events), "action_plans": len(plans),
+            "action_items": len(items)}
+
+
+_worker_engine = None
+
+
+def _worker_write_chunk(url, spec, offset, n):
+    global _worker_engine
+    if _worker_engine is None:
+        # One engine per worker process; SQLite writers wait for each other
+        connect_args = {"timeout": 600} if url.startswith("sqlite") else {}
+        _worker_engine = create_engine(url, connect_args=connect_args)
+    with _worker_engine.begin() as connection:
+        return write_chunk(connection, spec, offset, n)
+
+
+def is_in_memory(engine):
+    return engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:')
+
+
+def _prepare(engine, spec):
+    """Continue the ids after the existing rows and pick creators among existing users"""
+    from app.models import User
+
+    with engine.connect() as connection:
+        max_id = lambda table: connection.execute(select(func.max(table.c.id))).scalar() or 0
+        spec.anomaly_id_start = max_id(Anomaly.__table__) + 1
+        spec.window_id_start = max_id(MaintenanceWindow.__table__) + 1
+        spec.plan_id_start = max_id(ActionPlan.__table__) + 1
+        user_ids = connection.execute(select(User.__table__.c.id).limit(1000)).scalars().all()
+    spec.user_ids = user_ids or [None]
+
+
+def _reset_sequences(engine):
+    """PostgreSQL sequences do not see explicitly inserted ids"""
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as connection:
+        for table in ('anomalies', 'maintenance_windows', 'action_plans', 'action_items'):
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+            ))
+
+
+def generate_dataset(engine, spec, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, progress=None):
+    """
+    Write spec.windows maintenance windows and spec.anomalies anomalies with
+    their action plans and items
+
+    Args:
+        engine: SQLAlchemy engine of the target database
+        spec: DatasetSpec
+        chunk_size: Anomalies per chunk (one transaction per chunk)
+        workers: Parallel writer processes (default: CPU count; 1 for in-memory SQLite)
+        progress: Optional callable(rows_written_so_far) called after each chunk
+
+    Returns:
+        dict: Row counts per table
+    """
+    _prepare(engine, spec)
+    counts = {"maintenance_windows": spec.windows, "anomalies": 0, "status_events": 0, "action_plans": 0,
+              "action_items": 0}
+    with engine.begin() as connection:
+        connection.execute(MaintenanceWindow.__table__.insert(), window_rows(spec))
+
+    chunks = [(offset, min(chunk_size, spec.anomalies - offset))
+              for offset in range(0, spec.anomalies, chunk_size)]
+
+    def add(chunk_counts):
+        for table, count in chunk_counts.items():
+            counts[table] += count
+        if progress:
+            progress(counts)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1 or is_in_memory(engine):
+        for offset, n in chunks:
+            with engine.begin() as connection:
+                add(write_chunk(connection, spec, offset, n))
+    else:
+        url = engine.url.render_as_string(hide_password=False)
+        engine.dispose()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_worker_write_chunk, url, spec, offset, n) for offset, n in chunks]
+            for future in futures:
+                add(future.result())
+
+    _reset_sequences(engine)
+    return counts
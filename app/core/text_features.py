@@ -0,0 +1,184 @@
+"""
+Cached, fast bag-of-words featurization for the fitted CountVectorizer.
+
+The same descriptions come back across imports, re-predictions and batch
+calls. TextFeaturizer keeps a bounded LRU cache from the hash of the
+normalized description to its sparse term-count row, and computes misses
+with a direct tokenizer: the vectorizer's own preprocessor and token
+pattern, then a dict lookup in the fitted vocabulary. For word unigrams this
+gives exactly the features of vectorizer.transform (stop words are never in
+the vocabulary, so dropping unknown tokens also drops them); any other
+vectorizer configuration falls back to vectorizer.transform for misses.
+
+Configuration (environment):
+
+    TEXT_FEATURE_CACHE_SIZE     cached descriptions per model, 0 disables the cache (default: 50000)
+    TEXT_FAST_TOKENIZER         'false' to always use vectorizer.transform (default: true)
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from itertools import chain
+
+import numpy as np
+import scipy.sparse as sp
+
+from app.core.prometheus import observe_text_cache
+
+DEFAULT_CACHE_SIZE = 50000
+
+
+class TextFeaturizer:
+    def __init__(self, vectorizer, cache_size=DEFAULT_CACHE_SIZE, fast=True):
+        """
+        Args:
+            vectorizer: Fitted CountVectorizer
+            cache_size: Maximum cached descriptions (0 disables the cache)
+            fast: Use the direct tokenizer when the vectorizer configuration allows it
+        """
+        self.vectorizer = vectorizer
+        self.cache_size = cache_size
+        self.vocabulary = vectorizer.vocabulary_
+        self.n_features = len(self.vocabulary)
+        self.dtype = vectorizer.dtype
+        self.fast = fast and self.supports_fast_path(vectorizer)
+
+        self._preprocess = vectorizer.build_preprocessor()
+        self._token_pattern = re.compile(vectorizer.token_pattern) if self.fast else None
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def supports_fast_path(vectorizer):
+        """True when the direct tokenizer reproduces vectorizer.transform exactly"""
+        return (
+            vectorizer.analyzer == 'word'
+            and tuple(vectorizer.ngram_range) == (1, 1)
+            and vectorizer.tokenizer is None
+            and vectorizer.token_pattern is not None
+            and re.compile(vectorizer.token_pattern).groups <= 1
+            and hasattr(vectorizer, 'vocabulary_')
+        )
+
+    def _normalize(self, text):
+        # Lowercasing/accent stripping as configured on the vectorizer
+        return self._preprocess(text) if self.fast else text
+
+    @staticmethod
+    def _key(normalized):
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+    def _count_matrix(self, normalized):
+        """Term-count CSR matrix of normalized descriptions, tokenized directly against the vocabulary"""
+        vocabulary = self.vocabulary
+        findall = self._token_pattern.findall
+        columns = []
+        indptr = [0]
+        for text in normalized:
+            columns.extend([vocabulary[token] for token in findall(text) if token in vocabulary])
+            indptr.append(len(columns))
+        matrix = sp.csr_matrix(
+            (np.ones(len(columns), dtype=self.dtype), np.asarray(columns, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(normalized), self.n_features)
+        )
+        # Repeated terms become one entry holding their count, with sorted indices
+        matrix.sum_duplicates()
+        if self.vectorizer.binary:
+            matrix.data[:] = 1
+        return matrix
+
+    def _compute(self, texts, normalized):
+        """Term-count rows, as (indices, counts) tuples for the cache"""
+        if self.fast:
+            matrix = self._count_matrix(normalized)
+        else:
+            matrix = self.vectorizer.transform(texts).tocsr()
+            matrix.sort_indices()
+        indptr = matrix.indptr.tolist()
+        indices = matrix.indices.tolist()
+        data = matrix.data.tolist()
+        return [
+            (tuple(indices[indptr[i]:indptr[i + 1]]), tuple(data[indptr[i]:indptr[i + 1]]))
+            for i in range(matrix.shape[0])
+        ]
+
+    def transform(self, texts):
+        """
+        Same output as vectorizer.transform(texts)
+
+        Args:
+            texts: Iterable of description strings
+
+        Returns:
+            scipy.sparse CSR matrix of shape (len(texts), vocabulary size)
+        """
+        texts = [str(text) for text in texts]
+        normalized = [self._normalize(text) for text in texts]
+        if not self.cache_size:
+            with self._lock:
+                self.misses += len(texts)
+            observe_text_cache(0, len(texts))
+            if self.fast:
+                return self._count_matrix(normalized)
+            return self.vectorizer.transform(texts).tocsr()
+        keys = [self._key(text) for text in normalized]
+
+        rows = {}
+        with self._lock:
+            for key in set(keys):
+                row = self._cache.get(key)
+                if row is not None:
+                    self._cache.move_to_end(key)
+                    rows[key] = row
+
+        # Each distinct missing description is featurized once per call
+        missing = {}
+        for i, key in enumerate(keys):
+            if key not in rows and key not in missing:
+                missing[key] = i
+        if missing:
+            positions = list(missing.values())
+            computed = self._compute([texts[i] for i in positions], [normalized[i] for i in positions])
+            for key, row in zip(missing, computed):
+                rows[key] = row
+
+        with self._lock:
+            for key in missing:
+                self._cache[key] = rows[key]
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+        observe_text_cache(len(texts) - len(missing), len(missing))
+
+        ordered = [rows[key] for key in keys]
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row[0]) for row in ordered])
+        indices = np.fromiter(chain.from_iterable(row[0] for row in ordered), dtype=np.int32, count=indptr[-1])
+        data = np.fromiter(chain.from_iterable(row[1] for row in ordered), dtype=self.dtype, count=indptr[-1])
+        return sp.csr_matrix((data, indices, indptr), shape=(len(texts), self.n_features))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "fast_tokenizer": self.fast,
+            "cache_size": self.cache_size,
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else None
+        }
+
+
+def build_text_featurizer(vectorizer):
+    """TextFeaturizer for a fitted vectorizer, configured from the environment"""
+    return TextFeaturizer(
+        vectorizer,
+        cache_size=int(os.environ.get('TEXT_FEATURE_CACHE_SIZE', DEFAULT_CACHE_SIZE)),
+        fast=os.environ.get('TEXT_FAST_TOKENIZER', 'True').lower() in ('true', '1', 't')
+    )
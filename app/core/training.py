@@ -0,0 +1,266 @@
+"""
+Training pipeline for the multi-output reliability model.
+
+Shared by the ``flask train-model`` command and ``ml_models/model.py``:
+
+- the preprocessed feature matrix (sparse CSR) and fitted preprocessors are cached
+  on disk, keyed on a hash of the training data and the feature settings, so a
+  retrain on unchanged data skips preprocessing;
+- forests train with ``n_jobs=-1`` and k-fold evaluation runs the folds in parallel;
+- the output is a single versioned artifact holding the model, the fitted label
+  encoders and the vectorizer vocabulary, which EquipmentReliabilityPredictor loads
+  without reading the Excel file.
+
+Features match EquipmentReliabilityPredictor: label-encoded Num_equipement, Systeme
+and "Description de l'équipement", followed by the bag-of-words of Description.
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold, train_test_split
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.preprocessing import LabelEncoder
+
+CATEGORICAL_COLUMNS = ["Num_equipement", "Systeme", "Description de l'équipement"]
+TEXT_COLUMN = "Description"
+TARGET_COLUMNS = ["Fiabilité Intégrité", "Disponibilté", "Process Safety", "Criticité"]
+DROPPED_COLUMNS = ["Date de détéction de l'anomalie", "Section propriétaire"]
+DEFAULT_MAX_FEATURES = 100
+ARTIFACT_FORMAT = "tams-model-v1"
+BENCHMARK_BATCH_SIZES = (1, 100, 10000)
+RANDOM_STATE = 1337
+
+
+def load_training_data(path):
+    """Read the training data from CSV or Excel, dropping unused columns"""
+    if path.endswith('.csv'):
+        df = pd.read_csv(path)
+    else:
+        df = pd.read_excel(path)
+    df = df.drop(columns=DROPPED_COLUMNS, errors="ignore")
+    return df.fillna("unknown")
+
+
+def data_hash(df, max_features=DEFAULT_MAX_FEATURES):
+    """Stable hash of the training data and feature settings, used as the cache key"""
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(json.dumps({"columns": list(df.columns), "max_features": max_features}).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def build_features(df, max_features=DEFAULT_MAX_FEATURES):
+    """
+    Fit the preprocessors and build the feature matrix
+
+    Returns:
+        tuple: (X as CSR matrix, y as numpy array, label_encoders, vectorizer)
+    """
+    label_encoders = {}
+    codes = []
+    for col in CATEGORICAL_COLUMNS:
+        le = LabelEncoder()
+        codes.append(le.fit_transform(df[col].astype(str)))
+        label_encoders[col] = le
+
+    vectorizer = CountVectorizer(max_features=max_features, stop_words='english')
+    text_features = vectorizer.fit_transform(df[TEXT_COLUMN].astype(str))
+
+    X = sp.hstack([sp.csr_matrix(np.column_stack(codes).astype(float)), text_features], format='csr')
+    y = df[TARGET_COLUMNS].to_numpy(dtype=float)
+    return X, y, label_encoders, vectorizer
+
+
+def cached_features(df, cache_dir, max_features=DEFAULT_MAX_FEATURES):
+    """
+    build_features with an on-disk cache keyed on data_hash
+
+    Returns:
+        tuple: (X, y, label_encoders, vectorizer, key)
+    """
+    key = data_hash(df, max_features)
+    matrix_path = os.path.join(cache_dir, f"features-{key}.npz")
+    target_path = os.path.join(cache_dir, f"targets-{key}.npy")
+    preprocessors_path = os.path.join(cache_dir, f"preprocessors-{key}.joblib")
+
+    if all(os.path.exists(p) for p in (matrix_path, target_path, preprocessors_path)):
+        print(f"Using cached feature matrix {matrix_path}")
+        preprocessors = joblib.load(preprocessors_path)
+        return (sp.load_npz(matrix_path), np.load(target_path),
+                preprocessors['label_encoders'], preprocessors['vectorizer'], key)
+
+    X, y, label_encoders, vectorizer = build_features(df, max_features)
+    os.makedirs(cache_dir, exist_ok=True)
+    sp.save_npz(matrix_path, X)
+    np.save(target_path, y)
+    joblib.dump({'label_encoders': label_encoders, 'vectorizer': vectorizer}, preprocessors_path)
+    print(f"Cached feature matrix {matrix_path}")
+    return X, y, label_encoders, vectorizer, key
+
+
+def build_model(forest="multioutput", n_estimators=100, max_depth=None, min_samples_leaf=1,
+                max_leaf_nodes=None, n_jobs=-1, random_state=RANDOM_STATE):
+    """
+    Args:
+        forest: 'multioutput' for one forest per target (MultiOutputRegressor),
+            'native' for one multi-output forest sharing its trees across the targets
+    """
+    regressor = RandomForestRegressor(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        min_samples_leaf=min_samples_leaf,
+        max_leaf_nodes=max_leaf_nodes,
+        n_jobs=n_jobs,
+        random_state=random_state
+    )
+    if forest == "native":
+        # RandomForestRegressor handles a 2D target natively: each tree predicts all targets
+        return regressor
+    if forest != "multioutput":
+        raise ValueError(f"Unknown forest type: {forest}")
+    return MultiOutputRegressor(regressor)
+
+
+def _fold_mse(model_params, X, y, train_index, test_index):
+    model = build_model(**model_params)
+    model.fit(X[train_index], y[train_index])
+    return mean_squared_error(y[test_index], model.predict(X[test_index]), multioutput='raw_values')
+
+
+def cross_validate(X, y, model_params, folds=5, n_jobs=-1):
+    """
+    K-fold MSE per target, folds trained in parallel
+
+    Returns:
+        dict: {"folds", "mse_mean": {target: mse}, "mse_std": {target: std}}
+    """
+    # Parallelism is across folds, so each fold's forest trains single-threaded
+    fold_params = dict(model_params, n_jobs=1)
+    splits = KFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE).split(X)
+    scores = np.array(Parallel(n_jobs=n_jobs)(
+        delayed(_fold_mse)(fold_params, X, y, train_index, test_index)
+        for train_index, test_index in splits
+    ))
+    return {
+        "folds": folds,
+        "mse_mean": dict(zip(TARGET_COLUMNS, scores.mean(axis=0).tolist())),
+        "mse_std": dict(zip(TARGET_COLUMNS, scores.std(axis=0).tolist()))
+    }
+
+
+def predict_latency(model, X, batch_size, repeats=5):
+    """Median predict time in seconds for a batch of batch_size rows sampled from X"""
+    rows = np.random.default_rng(0).integers(0, X.shape[0], size=batch_size)
+    batch = X[rows]
+    model.predict(batch)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(batch)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def benchmark_model(artifact_path, X_test, y_test):
+    """Artifact size, load time, predict latency per batch size and MSE per target"""
+    start = time.perf_counter()
+    model = joblib.load(artifact_path)['model']
+    load_time = time.perf_counter() - start
+
+    mse_scores = mean_squared_error(y_test, model.predict(X_test), multioutput='raw_values')
+
+    return {
+        "model_size_mb": os.path.getsize(artifact_path) / 1e6,
+        "load_time_s": load_time,
+        "predict_latency_s": {
+            str(batch_size): predict_latency(model, X_test, batch_size)
+            for batch_size in BENCHMARK_BATCH_SIZES
+        },
+        "mse": dict(zip(TARGET_COLUMNS, mse_scores.tolist()))
+    }
+
+
+def save_artifact(path, model, label_encoders, vectorizer, metadata):
+    """Write the model and its preprocessors as one versioned joblib artifact"""
+    artifact = dict(metadata, format=ARTIFACT_FORMAT, model=model,
+                    label_encoders=label_encoders, vectorizer=vectorizer)
+    # Write next to the target and rename, so a running process never reads a partial file
+    tmp_path = f"{path}.tmp"
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+    return artifact
+
+
+def train(data_path, output_path, cache_dir, model_params, max_features=DEFAULT_MAX_FEATURES,
+          folds=0, test_size=0.2):
+    """
+    Run the whole pipeline: features (cached), optional k-fold evaluation,
+    fit on the training split, save the artifact and benchmark it
+
+    Returns:
+        dict: Training report (version, data hash, params, timings, cv and benchmark results)
+    """
+    df = load_training_data(data_path)
+    print(f"Training data: {len(df)} rows from {data_path}")
+
+    start = time.perf_counter()
+    X, y, label_encoders, vectorizer, key = cached_features(df, cache_dir, max_features)
+    feature_time = time.perf_counter() - start
+
+    report = {
+        "version": f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{key[:8]}",
+        "data_hash": key,
+        "rows": int(X.shape[0]),
+        "n_features": int(X.shape[1]),
+        "params": dict(model_params, max_features=max_features),
+        "feature_time_s": feature_time
+    }
+
+    if folds and folds > 1:
+        start = time.perf_counter()
+        report["cross_validation"] = cross_validate(X, y, model_params, folds=folds,
+                                                    n_jobs=model_params.get('n_jobs', -1))
+        report["cross_validation"]["time_s"] = time.perf_counter() - start
+
+    train_index, test_index = train_test_split(np.arange(X.shape[0]), test_size=test_size,
+                                               random_state=RANDOM_STATE)
+    model = build_model(**model_params)
+    start = time.perf_counter()
+    model.fit(X[train_index], y[train_index])
+    report["train_time_s"] = time.perf_counter() - start
+
+    save_artifact(output_path, model, label_encoders, vectorizer, {
+        "version": report["version"],
+        "trained_at": datetime.utcnow().isoformat(),
+        "data_hash": key,
+        "params": report["params"],
+        "target_columns": TARGET_COLUMNS
+    })
+    report["benchmark"] = benchmark_model(output_path, X[test_index], y[test_index])
+    return report
+
+
+def print_report(report):
+    print(f"Model version: {report['version']} ({report['rows']} rows, {report['n_features']} features)")
+    if "cross_validation" in report:
+        cv = report["cross_validation"]
+        for col in TARGET_COLUMNS:
+            print(f"{col} {cv['folds']}-fold MSE: {cv['mse_mean'][col]:.4f} ± {cv['mse_std'][col]:.4f}")
+    benchmark = report["benchmark"]
+    for col, mse in benchmark["mse"].items():
+        print(f"{col} MSE: {mse:.4f}")
+    print(f"Model size: {benchmark['model_size_mb']:.1f} MB, load time: {benchmark['load_time_s']:.2f}s, "
+          f"train time: {report['train_time_s']:.1f}s")
+    for batch_size, latency in benchmark["predict_latency_s"].items():
+        print(f"Predict latency (batch {batch_size}): {latency * 1000:.2f} ms")
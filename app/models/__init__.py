@@ -4,7 +4,9 @@ Database models package initialization
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 
-db = SQLAlchemy()
+from app.core.database import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 
 # Import models to make them available when importing from app.models
@@ -12,4 +14,7 @@ from app.models.user import User
 from app.models.anomaly import Anomaly
 from app.models.maintenance import MaintenanceWindow
 from app.models.action_plan import ActionPlan, ActionItem
+from app.models.shadow import ShadowPredictionMetric
+from app.models.rollup import AnomalyRollup, AnomalyRollupState
+from app.models.status_event import AnomalyStatusEvent
 from app.models.database import user_db
@@ -1,5 +1,6 @@
 # anomaly.py - Anomaly model
 from app.models import db
+from app.core.criticality import get_policy
 from datetime import datetime
 
 class Anomaly(db.Model):
@@ -19,7 +20,7 @@ class Anomaly(db.Model):
     origin_source = db.Column(db.String(50), nullable=True)  # inspection, maintenance, operation, etc.
     
     # Original fields for compatibility
-    date_detection = db.Column(db.DateTime, nullable=False)
+    date_detection = db.Column(db.DateTime, nullable=False, index=True)
     description_equipement = db.Column(db.String(255), nullable=False)
     section_proprietaire = db.Column(db.String(10), nullable=False)
     
@@ -137,14 +138,14 @@ class Anomaly(db.Model):
             self.fiabilite_score = float(predictions.get('Fiabilité Intégrité', 0))
             self.disponibilite_score = float(predictions.get('Disponibilité', 0))
             self.process_safety_score = float(predictions.get('Process Safety', 0))
-            # Criticality is the sum of all three scores
-            self.criticality_level = self.fiabilite_score + self.disponibilite_score + self.process_safety_score
+            # Criticality score from the shared criticality policy
+            self.criticality_level = get_policy().score(self.fiabilite_score, self.disponibilite_score, self.process_safety_score)
         else:
             # Legacy array format
             self.fiabilite_score = float(predictions[0])
             self.disponibilite_score = float(predictions[1])
             self.process_safety_score = float(predictions[2])
-            self.criticality_level = float(predictions[0]) + float(predictions[1]) + float(predictions[2])
+            self.criticality_level = get_policy().score(self.fiabilite_score, self.disponibilite_score, self.process_safety_score)
         
         self.updated_at = datetime.utcnow()
         # Reset approval when predictions are updated
@@ -176,7 +177,9 @@ class Anomaly(db.Model):
         else:
             # Recalculate criticality if not provided
             if all(x is not None for x in [self.user_fiabilite_score, self.user_disponibilite_score, self.user_process_safety_score]):
-                self.user_criticality_level = self.user_fiabilite_score + self.user_disponibilite_score + self.user_process_safety_score
+                self.user_criticality_level = get_policy().score(
+                    self.user_fiabilite_score, self.user_disponibilite_score, self.user_process_safety_score
+                )
         
         # Mark to use user scores and approve
         self.use_user_scores = True
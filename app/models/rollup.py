@@ -0,0 +1,42 @@
+# rollup.py - Pre-aggregated anomaly counts for the dashboard
+from app.models import db
+
+# Key values standing for "none", so the key columns can be part of a unique constraint
+NO_SERVICE = ''
+NO_LEVEL = -1
+
+
+class AnomalyRollup(db.Model):
+    """
+    Number of anomalies per (year, month, service, systeme, status, criticality bucket)
+
+    Maintained by app.core.rollups on every flush; `flask refresh-rollups` rebuilds it.
+    Months are those of date_detection and buckets are criticality policy level indexes.
+    """
+    __tablename__ = 'anomaly_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('year', 'month', 'service', 'systeme', 'status', 'criticality_bucket',
+                            name='uq_anomaly_rollups_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    service = db.Column(db.String(100), nullable=False, default=NO_SERVICE, index=True)
+    systeme = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    criticality_bucket = db.Column(db.Integer, nullable=False, default=NO_LEVEL)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AnomalyRollupState(db.Model):
+    """
+    Criticality thresholds the rollups were last rebuilt with (a single row)
+
+    Buckets computed with other thresholds are stale; see app.core.rollups.ensure_rollups.
+    """
+    __tablename__ = 'anomaly_rollup_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    thresholds = db.Column(db.String(200), nullable=False)
+    refreshed_at = db.Column(db.DateTime, nullable=True)
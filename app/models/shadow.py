@@ -0,0 +1,71 @@
+# shadow.py - Shadow model evaluation metrics
+from app.models import db
+from datetime import datetime
+
+
+class ShadowPredictionMetric(db.Model):
+    __tablename__ = 'shadow_prediction_metrics'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    source = db.Column(db.String(20), nullable=False)  # single, batch
+    rows = db.Column(db.Integer, nullable=False)
+    primary_version = db.Column(db.String(64), nullable=True)
+    shadow_version = db.Column(db.String(64), nullable=True, index=True)
+    
+    # Latency of each model's predict_frame on the same inputs, timed back to back
+    primary_latency_ms = db.Column(db.Float, nullable=False)
+    shadow_latency_ms = db.Column(db.Float, nullable=False)
+    
+    # Mean absolute difference per target over the rows
+    fiabilite_integrite_diff = db.Column(db.Float, nullable=False)
+    disponibilite_diff = db.Column(db.Float, nullable=False)
+    process_safety_diff = db.Column(db.Float, nullable=False)
+    max_abs_diff = db.Column(db.Float, nullable=False)
+    
+    # Fraction of rows with the same criticality level
+    criticality_agreement = db.Column(db.Float, nullable=False)
+    
+    @staticmethod
+    def summary(since=None):
+        """Aggregates per (primary_version, shadow_version), weighting per-call means by row count"""
+        m = ShadowPredictionMetric
+        query = db.session.query(
+            m.primary_version,
+            m.shadow_version,
+            db.func.count(m.id),
+            db.func.sum(m.rows),
+            db.func.sum(m.fiabilite_integrite_diff * m.rows),
+            db.func.sum(m.disponibilite_diff * m.rows),
+            db.func.sum(m.process_safety_diff * m.rows),
+            db.func.max(m.max_abs_diff),
+            db.func.sum(m.criticality_agreement * m.rows),
+            db.func.avg(m.primary_latency_ms),
+            db.func.avg(m.shadow_latency_ms),
+            db.func.min(m.created_at),
+            db.func.max(m.created_at)
+        )
+        if since is not None:
+            query = query.filter(m.created_at >= since)
+        
+        results = []
+        for (primary_version, shadow_version, calls, rows, fi, dispo, ps, max_diff, agreement,
+             primary_ms, shadow_ms, first, last) in query.group_by(m.primary_version, m.shadow_version):
+            results.append({
+                'primary_version': primary_version,
+                'shadow_version': shadow_version,
+                'calls': calls,
+                'rows': rows,
+                'mean_abs_diff': {
+                    'Fiabilité Intégrité': fi / rows,
+                    'Disponibilité': dispo / rows,
+                    'Process Safety': ps / rows
+                },
+                'max_abs_diff': max_diff,
+                'criticality_agreement': agreement / rows,
+                'avg_primary_latency_ms': primary_ms,
+                'avg_shadow_latency_ms': shadow_ms,
+                'first_seen': first.isoformat() if first else None,
+                'last_seen': last.isoformat() if last else None
+            })
+        return results
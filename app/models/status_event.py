@@ -0,0 +1,76 @@
+# status_event.py - Append-only history of anomaly status changes
+from app.models import db
+from app.core.sql import days_between
+from datetime import datetime
+
+UNRESOLVED_STATUSES = ('open', 'in_progress')
+RESOLVED_STATUSES = ('resolved', 'closed')
+
+
+class AnomalyStatusEvent(db.Model):
+    __tablename__ = 'anomaly_status_events'
+    __table_args__ = (
+        db.Index('ix_anomaly_status_events_anomaly_created', 'anomaly_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    anomaly_id = db.Column(db.Integer, db.ForeignKey('anomalies.id', ondelete='CASCADE'), nullable=False)
+    from_status = db.Column(db.String(20), nullable=True)
+    to_status = db.Column(db.String(20), nullable=False)
+    comments = db.Column(db.Text, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    user = db.relationship('User', foreign_keys=[user_id])
+    # Deleting an anomaly deletes its history from the ORM too: SQLite does not enforce
+    # ON DELETE CASCADE, and a reused anomaly id must not inherit old events
+    anomaly = db.relationship('Anomaly', backref=db.backref('status_events', cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'anomaly_id': self.anomaly_id,
+            'from_status': self.from_status,
+            'to_status': self.to_status,
+            'comments': self.comments,
+            'user_id': self.user_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    @staticmethod
+    def insert_many(rows):
+        """Append events given as dicts of column values with one executemany INSERT"""
+        if rows:
+            db.session.execute(AnomalyStatusEvent.__table__.insert(), rows)
+
+    @staticmethod
+    def resolution_times():
+        """Subquery of the last resolution (unresolved -> resolved/closed) time per anomaly"""
+        e = AnomalyStatusEvent
+        return db.session.query(
+            e.anomaly_id.label('anomaly_id'),
+            db.func.max(e.created_at).label('resolved_at')
+        ).filter(
+            e.from_status.in_(UNRESOLVED_STATUSES),
+            e.to_status.in_(RESOLVED_STATUSES)
+        ).group_by(e.anomaly_id).subquery()
+
+    @staticmethod
+    def average_resolution_days():
+        """
+        Mean days from creation to resolution of the anomalies currently resolved or closed
+
+        Anomalies resolved before the status history existed have no events; their
+        last update stands in for the resolution time.
+        """
+        from app.models.anomaly import Anomaly
+
+        resolved = AnomalyStatusEvent.resolution_times()
+        resolved_at = db.func.coalesce(resolved.c.resolved_at, Anomaly.updated_at)
+        return db.session.query(
+            db.func.avg(days_between(resolved_at, Anomaly.created_at))
+        ).outerjoin(
+            resolved, resolved.c.anomaly_id == Anomaly.id
+        ).filter(
+            Anomaly.status.in_(RESOLVED_STATUSES)
+        ).scalar()
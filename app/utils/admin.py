@@ -0,0 +1,15 @@
+from functools import wraps
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models.user import User
+
+
+def admin_required(fn):
+    """Require a valid JWT belonging to a user with the 'admin' role"""
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        user = User.query.get(int(get_jwt_identity()))
+        if user is None or user.role != 'admin':
+            return {"error": "Admin privileges required"}, 403
+        return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,14 @@
+"""
+Performance benchmarks for TAMS.
+
+Run with ``python -m benchmarks.run``; each run writes a JSON file to
+``benchmarks/results/`` named after the git commit, so regressions show up by
+comparing two result files (``--compare``).
+
+Suites:
+
+- predictor: cold model load, predict_single latency, predict_batch at 1/100/10000 rows
+- import: POST /api/v1/import/anomalies throughput on in-memory SQLite, with the
+  embedding service stubbed out
+- dashboard: latency of the dashboard endpoints over synthetic anomalies (1M by default)
+"""
@@ -0,0 +1,46 @@
+"""
+Dashboard latency over a large synthetic anomalies table.
+"""
+import time
+
+from app.core.synthetic import DatasetSpec, generate_dataset
+from benchmarks.harness import make_app, measure
+
+ENDPOINTS = {
+    "dashboard.metrics": "/api/v1/dashboard/metrics",
+    "dashboard.anomalies_by_month": "/api/v1/dashboard/charts/anomalies-by-month",
+    "dashboard.anomalies_by_service": "/api/v1/dashboard/charts/anomalies-by-service",
+    "dashboard.anomalies_by_criticality": "/api/v1/dashboard/charts/anomalies-by-criticality",
+    "dashboard.maintenance_windows": "/api/v1/dashboard/charts/maintenance-windows",
+}
+
+
+def populate(app, anomalies, seed=0):
+    """Synthetic anomalies, windows and action plans, as written by ``flask generate-data``"""
+    from app.models import db
+
+    with app.app_context():
+        return generate_dataset(db.engine, DatasetSpec(anomalies, seed=seed))
+
+
+def run(anomalies=1_000_000, repeat=10):
+    """
+    Returns:
+        dict: {benchmark name: statistics}
+    """
+    app, headers = make_app()
+    start = time.perf_counter()
+    counts = populate(app, anomalies)
+    print(f"Inserted {sum(counts.values())} synthetic rows in {time.perf_counter() - start:.1f}s")
+
+    client = app.test_client()
+    results = {}
+    for name, url in ENDPOINTS.items():
+        def call():
+            response = client.get(url, headers=headers)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} failed ({response.status_code}): {response.get_json()}")
+        stats = measure(call, repeat=repeat)
+        stats["anomalies"] = anomalies
+        results[name] = stats
+    return results
@@ -0,0 +1,84 @@
+"""
+Import endpoint throughput: POST /api/v1/import/anomalies on in-memory SQLite,
+with the embedding service replaced by an in-process stub.
+"""
+import io
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_predictor import synthetic_inputs
+from benchmarks.harness import make_app, summarize
+
+
+class StubEmbeddingService:
+    """Stands in for index_record/delete_record, optionally with a fixed per-call latency"""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def __call__(self, record):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+
+@contextmanager
+def stubbed_embedding_service(latency_ms=0.0):
+    from app.core import event_listeners
+
+    stub = StubEmbeddingService(latency_ms)
+    original = event_listeners.index_record, event_listeners.delete_record
+    event_listeners.index_record = event_listeners.delete_record = stub
+    try:
+        yield stub
+    finally:
+        event_listeners.index_record, event_listeners.delete_record = original
+
+
+def import_file(rows, seed=0):
+    """CSV upload with the columns the import endpoint requires"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(synthetic_inputs(rows, seed=seed))
+    df["Date de détéction de l'anomalie"] = (
+        pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24, size=rows), unit="h")
+    ).strftime("%Y-%m-%d %H:%M:%S")
+    df["Description de l'équipement"] = "equipement " + df["Num_equipement"]
+    df["Section propriétaire"] = rng.choice(["34MC", "34EL", "34CT", "34MM"], size=rows)
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def run(rows=1000, repeat=3, embedding_latency_ms=0.0):
+    """
+    Returns:
+        dict: {benchmark name: statistics}
+    """
+    from app.models import db, Anomaly
+
+    with stubbed_embedding_service(embedding_latency_ms) as stub:
+        app, headers = make_app()
+        client = app.test_client()
+        payload = import_file(rows)
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.post("/api/v1/import/anomalies", headers=headers,
+                                   data={"file": (io.BytesIO(payload), "anomalies.csv")},
+                                   content_type="multipart/form-data")
+            timings.append((time.perf_counter() - start) * 1000.0)
+            if response.status_code != 201:
+                raise RuntimeError(f"Import failed ({response.status_code}): {response.get_json()}")
+            with app.app_context():
+                db.session.execute(db.delete(Anomaly))
+                db.session.commit()
+
+    stats = summarize(timings)
+    stats["rows"] = rows
+    stats["rows_per_s"] = rows / (stats["median_ms"] / 1000.0)
+    stats["embedding_latency_ms"] = embedding_latency_ms
+    stats["embedding_calls"] = stub.calls
+    return {"import.anomalies": stats}
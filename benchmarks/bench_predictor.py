@@ -0,0 +1,75 @@
+"""
+Predictor benchmarks: cold load, predict_single latency and predict_batch latency.
+"""
+import itertools
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks.harness import REPO_ROOT, measure, summarize
+
+BATCH_SIZES = (1, 100, 10000)
+
+COLD_LOAD_SCRIPT = """
+import time
+start = time.perf_counter()
+from app.core.predictor import EquipmentReliabilityPredictor
+EquipmentReliabilityPredictor(model_path={model_path!r})
+print(time.perf_counter() - start)
+"""
+
+WORDS = ("fuite vanne pompe vibration roulement moteur surchauffe joint bruit pression débit fissure "
+         "corrosion ventilateur courroie échangeur capteur alarme défaut isolement").split()
+
+
+def synthetic_inputs(n, seed=0):
+    """Prediction inputs with varied equipment, systems and descriptions"""
+    rng = np.random.default_rng(seed)
+    equipment = rng.integers(0, 500, size=n)
+    systems = rng.integers(0, 20, size=n)
+    lengths = rng.integers(3, 9, size=n)
+    return [
+        {
+            "Num_equipement": f"EQ-{equipment[i]:04d}",
+            "Systeme": f"SYS-{systems[i]:02d}",
+            "Description": " ".join(rng.choice(WORDS, size=lengths[i]))
+        }
+        for i in range(n)
+    ]
+
+
+def cold_load(model_path, repeat=3):
+    """Import and model load time in a fresh interpreter"""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", COLD_LOAD_SCRIPT.format(model_path=model_path)],
+                                cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]) * 1000.0)
+    return summarize(timings)
+
+
+def run(model_path, repeat=20):
+    """
+    Returns:
+        dict: {benchmark name: statistics}
+    """
+    from app.core.predictor import EquipmentReliabilityPredictor
+
+    if not os.path.exists(model_path):
+        print(f"Skipping predictor benchmarks: no model at {model_path}")
+        return {}
+
+    results = {"predictor.cold_load": cold_load(model_path)}
+    predictor = EquipmentReliabilityPredictor(model_path=model_path)
+
+    samples = itertools.cycle(synthetic_inputs(1000, seed=1))
+    results["predictor.predict_single"] = measure(lambda: predictor.predict_single(next(samples)), repeat=repeat)
+
+    for batch_size in BATCH_SIZES:
+        batch = synthetic_inputs(batch_size, seed=batch_size)
+        stats = measure(lambda: predictor.predict_batch(batch), repeat=repeat if batch_size < 10000 else 5)
+        stats["rows_per_s"] = batch_size / (stats["median_ms"] / 1000.0)
+        results[f"predictor.predict_batch.{batch_size}"] = stats
+    return results
@@ -0,0 +1,120 @@
+"""
+Timing helpers and result files shared by the benchmark suites.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from flask_jwt_extended import create_access_token
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def measure(fn, repeat=20, warmup=1):
+    """
+    Time fn() repeat times after warmup calls
+
+    Returns:
+        dict: Latency statistics in milliseconds
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return summarize(timings)
+
+
+def summarize(timings_ms):
+    timings = np.asarray(timings_ms, dtype=float)
+    return {
+        "runs": int(timings.size),
+        "median_ms": float(np.median(timings)),
+        "mean_ms": float(timings.mean()),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "min_ms": float(timings.min()),
+        "max_ms": float(timings.max()),
+        "stdev_ms": float(statistics.stdev(timings)) if timings.size > 1 else 0.0
+    }
+
+
+def make_app(database_uri="sqlite://"):
+    """
+    App with an empty schema and a bearer token
+
+    Returns:
+        tuple: (app, headers)
+    """
+    from app import create_app
+    from app.models import db, User
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_uri, "TESTING": True})
+    with app.app_context():
+        db.create_all()
+        user = User(username="benchmark", email="benchmark@example.com", role="admin")
+        user.set_password("benchmark")
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+    return app, {"Authorization": f"Bearer {token}"}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, dirty
+
+
+def environment():
+    commit, dirty = git_commit()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def write_results(results, path=None):
+    """Write a run to path (default: results/<commit>.json) and return the path"""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        commit = results["environment"]["commit"]
+        suffix = "-dirty" if results["environment"]["dirty"] else ""
+        path = os.path.join(RESULTS_DIR, f"{commit}{suffix}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Median latency ratio (current / baseline) per benchmark present in both runs
+
+    Returns:
+        list: (name, baseline_ms, current_ms, ratio, regressed) tuples
+    """
+    rows = []
+    for name, stats in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if not base or "median_ms" not in base or "median_ms" not in stats:
+            continue
+        ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        rows.append((name, base["median_ms"], stats["median_ms"], ratio, ratio > 1 + threshold))
+    return rows
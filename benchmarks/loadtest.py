@@ -0,0 +1,263 @@
+"""
+HTTP load test against a running TAMS server (e.g. ``gunicorn run:app``).
+
+    python -m benchmarks.loadtest --host http://127.0.0.1:5000 --users 50 --duration 60
+    python -m benchmarks.loadtest --scenario dashboard:5 --scenario predict:1 --users 20
+
+Each virtual user logs in once, reuses its JWT for every request (logging in
+again on 401) and loops over one scenario picked by weight:
+
+- dashboard: polls the metrics and chart endpoints
+- grid: browses anomaly pages and opens anomalies
+- import: uploads a CSV file to the import endpoint
+- predict: fires a burst of concurrent /predict calls
+- status: moves a page of anomalies between statuses with the bulk status endpoint
+
+Latency percentiles (p50/p95/p99), throughput and error rates are reported per
+endpoint and optionally written as JSON. Uses aiohttp.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.bench_import import import_file
+from benchmarks.bench_predictor import synthetic_inputs
+from benchmarks.harness import environment
+
+DEFAULT_SCENARIOS = {"dashboard": 4, "grid": 4, "import": 1, "predict": 2, "status": 1}
+DASHBOARD_PATHS = [
+    "/api/v1/dashboard/metrics",
+    "/api/v1/dashboard/charts/anomalies-by-month",
+    "/api/v1/dashboard/charts/anomalies-by-service",
+    "/api/v1/dashboard/charts/anomalies-by-criticality",
+    "/api/v1/dashboard/charts/maintenance-windows",
+]
+STATUS_MOVES = [("open", "in_progress"), ("in_progress", "resolved"), ("resolved", "closed"), ("closed", "open")]
+
+
+def _require_aiohttp():
+    """Import aiohttp lazily so the benchmark package imports without it"""
+    try:
+        import aiohttp
+        return aiohttp
+    except ImportError:
+        raise RuntimeError("aiohttp is required for load testing. Install it with: pip install aiohttp")
+
+
+class Stats:
+    """Latencies and failures per endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, latency_ms, status):
+        self.latencies[name].append(latency_ms)
+        self.statuses[name][status] += 1
+        if status is None or status >= 400:
+            self.errors[name] += 1
+
+    def report(self, duration_s):
+        report = {}
+        for name in sorted(self.latencies):
+            latencies = np.asarray(self.latencies[name])
+            report[name] = {
+                "requests": int(latencies.size),
+                "rps": latencies.size / duration_s,
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+                "max_ms": float(latencies.max()),
+                "errors": self.errors[name],
+                "error_rate": self.errors[name] / latencies.size,
+                "status_codes": {str(code): count for code, count in self.statuses[name].items()}
+            }
+        return report
+
+
+class VirtualUser:
+    def __init__(self, session, host, credentials, stats, think_time):
+        self.session = session
+        self.host = host.rstrip('/')
+        self.credentials = credentials
+        self.stats = stats
+        self.think_time = think_time
+        self.token = None
+
+    async def login(self):
+        async with self.session.post(f"{self.host}/api/v1/auth/login", json=self.credentials) as response:
+            body = await response.json(content_type=None)
+            if response.status != 200:
+                raise RuntimeError(f"Login failed ({response.status}): {body}")
+            self.token = body["access_token"]
+
+    async def request(self, method, path, name=None, **kwargs):
+        """Timed request with the cached token; logs in again once on 401"""
+        name = f"{method} {name or path}"
+        for attempt in range(2):
+            if self.token is None:
+                await self.login()
+            headers = {"Authorization": f"Bearer {self.token}"}
+            start = time.perf_counter()
+            status, body = None, None
+            try:
+                async with self.session.request(method, f"{self.host}{path}", headers=headers, **kwargs) as response:
+                    status = response.status
+                    body = await response.json(content_type=None)
+            except Exception:
+                pass
+            if status == 401 and attempt == 0:
+                self.token = None
+                continue
+            self.stats.record(name, (time.perf_counter() - start) * 1000.0, status)
+            return status, body
+
+    async def think(self):
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.think_time)
+
+    async def dashboard(self):
+        for path in DASHBOARD_PATHS:
+            await self.request("GET", path)
+        await self.think()
+
+    async def grid(self):
+        status, body = await self.request("GET", f"/api/v1/anomalies?page={random.randint(1, 50)}&per_page=50",
+                                          name="/api/v1/anomalies?page")
+        anomalies = (body or {}).get("anomalies") or []
+        for anomaly in random.sample(anomalies, min(3, len(anomalies))):
+            await self.request("GET", f"/api/v1/anomalies/{anomaly['id']}", name="/api/v1/anomalies/<id>")
+            await self.think()
+
+    async def importer(self, rows):
+        aiohttp = _require_aiohttp()
+        form = aiohttp.FormData()
+        form.add_field("file", import_file(rows, seed=random.randrange(1 << 30)),
+                       filename="anomalies.csv", content_type="text/csv")
+        await self.request("POST", "/api/v1/import/anomalies", data=form)
+        await self.think()
+
+    async def predict(self, burst):
+        inputs = synthetic_inputs(burst, seed=random.randrange(1 << 30))
+        await asyncio.gather(*(self.request("POST", "/api/v1/predict", json=payload) for payload in inputs))
+        await self.think()
+
+    async def status(self, batch):
+        current, target = random.choice(STATUS_MOVES)
+        _, body = await self.request("GET", f"/api/v1/anomalies?page={random.randint(1, 20)}&per_page={batch}",
+                                     name="/api/v1/anomalies?page")
+        ids = [a["id"] for a in (body or {}).get("anomalies") or [] if a.get("status") == current]
+        if ids:
+            await self.request("PUT", "/api/v1/anomalies/bulk/status", json={"anomalies": ids, "status": target})
+        await self.think()
+
+
+async def run_user(user, scenarios, deadline, options):
+    names, weights = zip(*scenarios.items())
+    actions = {
+        "dashboard": user.dashboard,
+        "grid": user.grid,
+        "import": lambda: user.importer(options.import_rows),
+        "predict": lambda: user.predict(options.predict_burst),
+        "status": lambda: user.status(options.status_batch),
+    }
+    while time.monotonic() < deadline:
+        await actions[random.choices(names, weights)[0]]()
+
+
+async def run_load(options, scenarios):
+    aiohttp = _require_aiohttp()
+    stats = Stats()
+    credentials = {"username": options.username, "password": options.password}
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=options.timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        if options.register:
+            # Creating an existing user fails harmlessly
+            async with session.post(f"{options.host.rstrip('/')}/api/v1/auth/register",
+                                    json=dict(credentials, email=f"{options.username}@loadtest.local")):
+                pass
+
+        start = time.monotonic()
+        deadline = start + options.duration
+        tasks = []
+        for i in range(options.users):
+            user = VirtualUser(session, options.host, credentials, stats, options.think_time)
+            tasks.append(asyncio.create_task(run_user(user, scenarios, deadline, options)))
+            # Spread logins over the ramp-up period
+            if options.ramp_up:
+                await asyncio.sleep(options.ramp_up / options.users)
+        await asyncio.gather(*tasks)
+        return stats.report(time.monotonic() - start)
+
+
+def parse_scenarios(values):
+    if not values:
+        return dict(DEFAULT_SCENARIOS)
+    scenarios = {}
+    for value in values:
+        name, _, weight = value.partition(":")
+        if name not in DEFAULT_SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}, expected one of {', '.join(DEFAULT_SCENARIOS)}")
+        scenarios[name] = float(weight or 1)
+    return scenarios
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test a running TAMS server")
+    parser.add_argument("--host", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Seconds over which users start")
+    parser.add_argument("--scenario", action="append",
+                        help="name[:weight], may be repeated (default: "
+                             + ", ".join(f"{k}:{v}" for k, v in DEFAULT_SCENARIOS.items()) + ")")
+    parser.add_argument("--username", default="loadtest")
+    parser.add_argument("--password", default="loadtest")
+    parser.add_argument("--register", action="store_true", help="Register the user before starting")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between user actions (s)")
+    parser.add_argument("--import-rows", type=int, default=100, help="Rows per imported file")
+    parser.add_argument("--predict-burst", type=int, default=10, help="Concurrent /predict calls per burst")
+    parser.add_argument("--status-batch", type=int, default=50, help="Anomalies considered per bulk status call")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout (s)")
+    parser.add_argument("--output", default=None, help="Write the report to this JSON file")
+    return parser.parse_args()
+
+
+def print_report(report):
+    print(f"{'endpoint':55s} {'reqs':>7s} {'rps':>7s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'errors':>7s}")
+    for name, row in report.items():
+        print(f"{name:55s} {row['requests']:7d} {row['rps']:7.1f} {row['p50_ms']:7.1f}ms {row['p95_ms']:7.1f}ms "
+              f"{row['p99_ms']:7.1f}ms {row['error_rate']:6.1%}")
+    total = sum(row["requests"] for row in report.values())
+    errors = sum(row["errors"] for row in report.values())
+    print(f"Total: {total} requests, {errors} errors ({errors / total if total else 0:.1%})")
+
+
+def main():
+    options = parse_args()
+    scenarios = parse_scenarios(options.scenario)
+    report = asyncio.run(run_load(options, scenarios))
+    print_report(report)
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump({
+                "environment": environment(),
+                "parameters": dict(vars(options), scenario=scenarios),
+                "endpoints": report
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Run the benchmark suites and store the results as JSON.
+
+    python -m benchmarks.run                                  # all suites
+    python -m benchmarks.run --suite dashboard --anomalies 100000
+    python -m benchmarks.run --compare benchmarks/results/<baseline>.json
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import bench_dashboard, bench_import, bench_predictor
+from benchmarks.harness import compare, environment, write_results
+
+SUITES = ("predictor", "import", "dashboard")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the TAMS performance benchmarks")
+    parser.add_argument("--suite", action="append", choices=SUITES,
+                        help="Suite to run, may be repeated (default: all)")
+    parser.add_argument("--model", default=os.environ.get('MODEL_PATH', "ml_models/multi_output_model.pkl"),
+                        help="Model artifact used by the predictor and import suites")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per latency benchmark")
+    parser.add_argument("--import-rows", type=int, default=1000, help="Rows per imported file")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0,
+                        help="Simulated embedding service latency per indexed record")
+    parser.add_argument("--anomalies", type=int, default=1_000_000,
+                        help="Synthetic anomalies behind the dashboard benchmarks")
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative median slowdown reported as a regression")
+    return parser.parse_args()
+
+
+def print_results(benchmarks):
+    for name, stats in benchmarks.items():
+        extra = f", {stats['rows_per_s']:.0f} rows/s" if "rows_per_s" in stats else ""
+        print(f"{name:45s} median {stats['median_ms']:10.2f} ms  p95 {stats['p95_ms']:10.2f} ms{extra}")
+
+
+def main():
+    args = parse_args()
+    suites = args.suite or SUITES
+    # The import endpoint predicts through the process-wide model holder
+    os.environ['MODEL_PATH'] = args.model
+
+    benchmarks = {}
+    if "predictor" in suites:
+        benchmarks.update(bench_predictor.run(args.model, repeat=args.repeat))
+    if "import" in suites:
+        benchmarks.update(bench_import.run(rows=args.import_rows, repeat=max(1, args.repeat // 5),
+                                           embedding_latency_ms=args.embedding_latency_ms))
+    if "dashboard" in suites:
+        benchmarks.update(bench_dashboard.run(anomalies=args.anomalies, repeat=args.repeat))
+
+    results = {
+        "environment": environment(),
+        "parameters": vars(args),
+        "benchmarks": benchmarks
+    }
+    print_results(benchmarks)
+    print(f"Results written to {write_results(results, args.output)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline['environment']['commit']} ({args.compare}):")
+        regressions = 0
+        for name, base_ms, current_ms, ratio, regressed in compare(baseline, results, args.threshold):
+            regressions += regressed
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:45s} {base_ms:10.2f} -> {current_ms:10.2f} ms ({ratio:5.2f}x){flag}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+# gunicorn.conf.py - loaded by gunicorn when started from the project root
+
+
+def on_starting(server):
+    """Drop the Prometheus per-process files of earlier runs before any worker writes"""
+    from app.core.prometheus import clear_multiprocess_files
+
+    removed = clear_multiprocess_files()
+    if removed:
+        server.log.info("Removed %d Prometheus metric file(s) of earlier runs", removed)
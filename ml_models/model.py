@@ -1,41 +1,52 @@
-import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.multioutput import MultiOutputRegressor
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error
-import joblib
-
-df = pd.read_csv("Taqathon_data_01072025.csv")
-df = df.drop(columns=["Date de détéction de l'anomalie", "Section propriétaire"])
-df = df.fillna("unknown")
-
-label_encoders = {}
-for col in ["Num_equipement", "Systeme", "Description de l'équipement", "Section propriétaire"]:
-    le = LabelEncoder()
-    df[col] = le.fit_transform(df[col])
-    label_encoders[col] = le
-
-vectorizer = CountVectorizer(max_features=100)
-text_features = vectorizer.fit_transform(df["Description"]).toarray()
-
-X = np.concatenate([
-    df[["Systeme", "Description de l'équipement", "Section propriétaire"]].values,
-    text_features
-], axis=1)
-
-y = df[["Fiabilité Intégrité", "Disponibilté", "Process Safety", "Criticité"]]
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=1337)
-
-model = MultiOutputRegressor(RandomForestRegressor())
-model.fit(X_train, y_train)
-y_pred = model.predict(X_test)
-mse_scores = mean_squared_error(y_test, y_pred, multioutput='raw_values')
-
-for i, col in enumerate(y.columns):
-    print(f"{col} MSE: {mse_scores[i]:.4f}")
-
-joblib.dump(model, "multi_output_model.pkl")
\ No newline at end of file
+"""
+Train the multi-output reliability model.
+
+Kept for running from this directory (python model.py); the pipeline lives in
+app/core/training.py and is also available as `flask train-model`.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.training import train, print_report, DEFAULT_MAX_FEATURES
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the multi-output reliability model")
+    parser.add_argument("--data", default="Taqathon_data_01072025.csv")
+    parser.add_argument("--forest", choices=["multioutput", "native"], default="multioutput",
+                        help="'multioutput': one forest per target (MultiOutputRegressor); "
+                             "'native': one multi-output forest sharing its trees across the targets")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--min-samples-leaf", type=int, default=1)
+    parser.add_argument("--max-leaf-nodes", type=int, default=None)
+    parser.add_argument("--max-features", type=int, default=DEFAULT_MAX_FEATURES)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel jobs for training and prediction")
+    parser.add_argument("--folds", type=int, default=0, help="K-fold evaluation before training (0 to skip)")
+    parser.add_argument("--cache-dir", default=".cache")
+    parser.add_argument("--output", default="multi_output_model.pkl")
+    parser.add_argument("--report", default=None, help="Write the benchmark report to this JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    model_params = {
+        "forest": args.forest,
+        "n_estimators": args.n_estimators,
+        "max_depth": args.max_depth,
+        "min_samples_leaf": args.min_samples_leaf,
+        "max_leaf_nodes": args.max_leaf_nodes,
+        "n_jobs": args.n_jobs
+    }
+    report = train(args.data, args.output, args.cache_dir, model_params,
+                   max_features=args.max_features, folds=args.folds)
+    print_report(report)
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
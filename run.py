@@ -39,6 +39,7 @@ if __name__ == '__main__':
     print("    - PUT /api/v1/anomalies/<id>/predictions - Edit anomaly predictions")
     print("    - PUT /api/v1/anomalies/<id>/status - Update anomaly status with flow validation")
     print("    - PUT /api/v1/anomalies/bulk/status - Update multiple anomalies' statuses")
+    print("    - GET /api/v1/anomalies/<id>/timeline - Get anomaly status history")
     print("    - POST /api/v1/anomalies/batch - Create multiple anomalies")
     print("    - POST /api/v1/anomalies/upload - Upload CSV/Excel file")
     
@@ -67,15 +68,25 @@ if __name__ == '__main__':
     
     print("\n  Data Import (JWT required):")
     print("    - POST /api/v1/import/anomalies - Import anomalies from file")
+    print("    - GET /api/v1/export/anomalies - Export anomalies as Parquet or Arrow IPC")
     
     print("\n  Direct Predictions (JWT required):")
     print("    - GET/POST /api/v1/predict - Single equipment reliability prediction")
     print("    - POST /api/v1/predict-batch - Batch equipment reliability prediction")
     print("    - POST /api/v1/predict-file - File-based prediction")
+    print("    - GET /api/v1/predict/batching - Micro-batching statistics")
+    print("    - GET /api/v1/model - Loaded model version")
+    print("    - POST /api/v1/model/reload - Hot-reload the model (admin)")
+    print("    - GET /api/v1/model/shadow - Shadow model divergence summary")
+    
+    print("\n  Instrumentation (admin):")
+    print("    - GET/DELETE /api/v1/_metrics - Per-endpoint timing and SQL query aggregates")
+    print("    - GET /api/v1/_profiles - Saved profiling reports (GET /api/v1/_profiles/<name> to download)")
+    print("    - GET/POST /api/v1/_profiles/sampler - Sample this worker's stacks for N seconds")
     
     print("\nFeatures for ML prediction: Num_equipement, Systeme, Description")
     print("Predicted outputs: Fiabilité Intégrité, Disponibilité, Process Safety")
-    print("Criticality is calculated as sum of the three scores")
+    print("Criticality is the weighted sum of the three scores (see app/core/criticality.py)")
     
     print("\n🎯 Use the browsable API at http://localhost:5000/api-browser/ for easy testing!")
     
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import click
+import joblib
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.predictor import CompiledForest
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+@click.command('compile-model')
+@click.option('--source', default='ml_models/multi_output_model.pkl', show_default=True,
+              help='Trained joblib model (bare model or dict with model/label_encoders/vectorizer).')
+@click.option('--output', default='ml_models/multi_output_model.compiled', show_default=True,
+              help='Directory to write the compiled model to.')
+@click.option('--quantize', is_flag=True, help='Store thresholds/leaf values as float32 and features as int16.')
+@click.option('--check-rows', type=int, default=1000, show_default=True,
+              help='Random rows used to compare the compiled model with sklearn.')
+@click.option('--tolerance', type=float, default=1e-6, show_default=True,
+              help='Maximum absolute difference allowed against sklearn predictions.')
+def compile_model_command(source, output, quantize, check_rows, tolerance):
+    """
+    Compiles the random forest into flat numpy arrays evaluated with vectorized tree walks.
+    Point MODEL_PATH at the output directory to serve it.
+    """
+    start = time.perf_counter()
+    loaded = joblib.load(source)
+    source_load = time.perf_counter() - start
+
+    preprocessors = None
+    model = loaded
+    if isinstance(loaded, dict) and 'model' in loaded:
+        model = loaded['model']
+        # Encoders, vectorizer and metadata such as the version travel with the compiled model
+        preprocessors = {key: value for key, value in loaded.items() if key != 'model'}
+
+    compiled = CompiledForest.from_sklearn(model, quantize=quantize)
+    compiled.save(output, preprocessors=preprocessors)
+
+    start = time.perf_counter()
+    compiled = CompiledForest.load(output)
+    compiled_load = time.perf_counter() - start
+
+    # Compare against sklearn on inputs resembling the real features: small integer codes and term counts
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 3, size=(check_rows, compiled.n_features_in_)).astype(float)
+    X[:, :3] = rng.integers(0, 50, size=(check_rows, 3))
+
+    start = time.perf_counter()
+    expected = np.asarray(model.predict(X)).reshape(check_rows, -1)
+    sklearn_time = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = compiled.predict(X)
+    compiled_time = time.perf_counter() - start
+
+    max_diff = float(np.max(np.abs(expected - actual)))
+    click.echo(f"Trees: {len(compiled.roots)}, nodes: {len(compiled.feature)}, outputs: {compiled.n_outputs}")
+    click.echo(f"Size: {os.path.getsize(source) / 1e6:.1f} MB -> {_dir_size(output) / 1e6:.1f} MB")
+    click.echo(f"Load time: {source_load * 1000:.0f} ms -> {compiled_load * 1000:.0f} ms")
+    click.echo(f"Predict {check_rows} rows: {sklearn_time * 1000:.1f} ms -> {compiled_time * 1000:.1f} ms")
+    click.echo(f"Max absolute difference vs sklearn: {max_diff:.2e}")
+
+    if max_diff > tolerance:
+        raise click.ClickException(f"Compiled model differs from sklearn by {max_diff:.2e} (> {tolerance:g})")
+    click.echo(f"Compiled model written to {output}")
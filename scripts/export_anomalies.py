@@ -0,0 +1,63 @@
+import os
+import sys
+import click
+from flask.cli import with_appcontext
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.export import export_anomalies, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE
+
+
+@click.command('export-anomalies')
+@click.argument('output_path')
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default=None,
+              help='Output format (default: inferred from the file extension, else parquet).')
+@click.option('--columns', default=None, help='Comma-separated list of columns to export.')
+@click.option('--status', default=None, help='Filter by status (comma-separated for several).')
+@click.option('--service', default=None, help='Filter by service (comma-separated for several).')
+@click.option('--systeme', default=None, help='Filter by systeme (comma-separated for several).')
+@click.option('--date-from', default=None, help='Only anomalies detected on or after this ISO date.')
+@click.option('--date-to', default=None, help='Only anomalies detected before this ISO date.')
+@click.option('--min-criticality', type=float, default=None, help='Minimum active criticality.')
+@click.option('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Rows per row group / record batch.')
+@click.option('--compression', default='zstd', show_default=True,
+              help="Compression codec ('none' to disable).")
+@with_appcontext
+def export_anomalies_command(output_path, fmt, columns, status, service, systeme,
+                             date_from, date_to, min_criticality, chunk_size, compression):
+    """
+    Exports the anomalies table (with active scores, maintenance window and action plan summary)
+    to a Parquet or Arrow IPC file for offline analysis.
+    """
+    if fmt is None:
+        fmt = 'arrow' if output_path.endswith(('.arrow', '.feather', '.ipc')) else 'parquet'
+
+    filters = {
+        'status': status,
+        'service': service,
+        'systeme': systeme,
+        'date_from': date_from,
+        'date_to': date_to,
+        'min_criticality': min_criticality,
+    }
+    column_list = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+
+    click.echo(f"Exporting anomalies to {output_path} ({fmt})...")
+    try:
+        total = export_anomalies(
+            output_path,
+            fmt=fmt,
+            columns=column_list,
+            filters=filters,
+            chunk_size=chunk_size,
+            compression=None if compression.lower() == 'none' else compression
+        )
+        click.secho(f"Exported {total} anomalies to {output_path}", fg='green')
+    except (ValueError, RuntimeError) as e:
+        click.secho(f"Export failed: {e}", fg='red')
+        sys.exit(1)
+    except Exception as e:
+        click.secho(f"An unexpected error occurred during export: {e}", fg='red')
+        sys.exit(1)
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import click
+from flask.cli import with_appcontext
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import db
+from app.core.synthetic import (
+    DatasetSpec, generate_dataset, DEFAULT_CHUNK_SIZE, DEFAULT_EQUIPMENT, DEFAULT_SYSTEMS,
+    DEFAULT_PLAN_RATIO, DEFAULT_ITEMS_PER_PLAN, DEFAULT_YEARS
+)
+
+
+@click.command('generate-data')
+@click.option('--anomalies', type=int, required=True, help='Number of anomalies to generate.')
+@click.option('--windows', type=int, default=None, help='Maintenance windows (default: one per 1000 anomalies).')
+@click.option('--plan-ratio', type=float, default=DEFAULT_PLAN_RATIO, show_default=True,
+              help='Share of anomalies with an action plan.')
+@click.option('--items-per-plan', type=float, default=DEFAULT_ITEMS_PER_PLAN, show_default=True,
+              help='Mean action items per plan.')
+@click.option('--equipment', type=int, default=DEFAULT_EQUIPMENT, show_default=True,
+              help='Distinct pieces of equipment.')
+@click.option('--systems', type=int, default=DEFAULT_SYSTEMS, show_default=True, help='Distinct systems.')
+@click.option('--years', type=int, default=DEFAULT_YEARS, show_default=True,
+              help='Detection dates spread over this many years up to now.')
+@click.option('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Anomalies per insert transaction.')
+@click.option('--workers', type=int, default=None, help='Parallel writer processes (default: CPU count).')
+@click.option('--seed', type=int, default=0, show_default=True)
+@click.option('--create-tables', is_flag=True, help='Create missing tables first.')
+@with_appcontext
+def generate_data_command(anomalies, windows, plan_ratio, items_per_plan, equipment, systems, years,
+                          chunk_size, workers, seed, create_tables):
+    """
+    Fills the database with synthetic anomalies, maintenance windows, action plans and action items
+    for load testing. Rows are appended after the existing ones.
+    """
+    if create_tables:
+        db.create_all()
+
+    spec = DatasetSpec(anomalies, windows=windows, plan_ratio=plan_ratio, items_per_plan=items_per_plan,
+                       equipment=equipment, systems=systems, years=years, seed=seed)
+    start = time.perf_counter()
+
+    def progress(counts):
+        elapsed = time.perf_counter() - start
+        click.echo(f"  {counts['anomalies']}/{anomalies} anomalies "
+                   f"({counts['anomalies'] / elapsed:.0f}/s, {elapsed:.0f}s)")
+
+    click.echo(f"Generating {anomalies} anomalies and {spec.windows} maintenance windows...")
+    try:
+        counts = generate_dataset(db.engine, spec, chunk_size=chunk_size, workers=workers, progress=progress)
+    except Exception as e:
+        click.secho(f"Generation failed: {e}", fg='red')
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    summary = ", ".join(f"{count} {table}" for table, count in counts.items())
+    click.secho(f"Wrote {total} rows ({summary}) in {elapsed:.1f}s, {total / elapsed:.0f} rows/s", fg='green')
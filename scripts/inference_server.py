@@ -0,0 +1,27 @@
+import os
+import sys
+import click
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.inference_server import InferenceServer, DEFAULT_WORKERS, DEFAULT_MAX_CONCURRENCY
+
+
+@click.command('inference-server')
+@click.option('--socket', 'socket_path', default=lambda: os.environ.get('INFERENCE_SERVER_SOCKET', '/tmp/tams-inference.sock'),
+              show_default='$INFERENCE_SERVER_SOCKET or /tmp/tams-inference.sock', help='Unix socket to listen on.')
+@click.option('--workers', type=int, default=lambda: int(os.environ.get('INFERENCE_WORKERS', DEFAULT_WORKERS)),
+              show_default='$INFERENCE_WORKERS or 2', help='Worker processes sharing one model copy.')
+@click.option('--max-concurrency', type=int,
+              default=lambda: int(os.environ.get('INFERENCE_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)),
+              show_default='$INFERENCE_MAX_CONCURRENCY or 4', help='In-flight requests per worker before replying busy.')
+@click.option('--backlog', type=int, default=128, show_default=True, help='Listen backlog of the socket.')
+def inference_server_command(socket_path, workers, max_concurrency, backlog):
+    """
+    Runs the inference sidecar: loads the model once and serves predictions to all web workers
+    over a unix socket. Set INFERENCE_SERVER_SOCKET in the web workers' environment to use it.
+    """
+    click.echo(f"Starting inference server on {socket_path} ({workers} workers, max concurrency {max_concurrency})")
+    server = InferenceServer(socket_path, workers=workers, max_concurrency=max_concurrency, backlog=backlog)
+    server.serve_forever()
@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+import click
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.training import train, print_report, DEFAULT_MAX_FEATURES
+
+
+@click.command('train-model')
+@click.option('--data', 'data_path', default='ml_models/Taqathon_data_01072025.xlsx', show_default=True,
+              help='Training data (CSV or Excel).')
+@click.option('--output', default='ml_models/multi_output_model.pkl', show_default=True,
+              help='Artifact to write (model + label encoders + vectorizer).')
+@click.option('--cache-dir', default='ml_models/.cache', show_default=True,
+              help='Directory for cached feature matrices, keyed on the data hash.')
+@click.option('--forest', type=click.Choice(['multioutput', 'native']), default='multioutput', show_default=True,
+              help="One forest per target, or one multi-output forest sharing its trees.")
+@click.option('--n-estimators', type=int, default=100, show_default=True)
+@click.option('--max-depth', type=int, default=None)
+@click.option('--min-samples-leaf', type=int, default=1, show_default=True)
+@click.option('--max-leaf-nodes', type=int, default=None)
+@click.option('--max-features', type=int, default=DEFAULT_MAX_FEATURES, show_default=True,
+              help='Vocabulary size of the description bag-of-words.')
+@click.option('--n-jobs', type=int, default=-1, show_default=True, help='Parallel jobs for training and k-fold.')
+@click.option('--folds', type=int, default=0, show_default=True, help='K-fold evaluation before training (0 to skip).')
+@click.option('--report', default=None, help='Write the training report to this JSON file.')
+def train_model_command(data_path, output, cache_dir, forest, n_estimators, max_depth, min_samples_leaf,
+                        max_leaf_nodes, max_features, n_jobs, folds, report):
+    """
+    Trains the reliability model and writes a versioned artifact loadable by the predictor.
+    """
+    model_params = {
+        'forest': forest,
+        'n_estimators': n_estimators,
+        'max_depth': max_depth,
+        'min_samples_leaf': min_samples_leaf,
+        'max_leaf_nodes': max_leaf_nodes,
+        'n_jobs': n_jobs
+    }
+    result = train(data_path, output, cache_dir, model_params, max_features=max_features, folds=folds)
+    print_report(result)
+    click.echo(f"Model artifact written to {output}")
+
+    if report:
+        with open(report, 'w') as f:
+            json.dump(result, f, indent=2)